@@ -0,0 +1,138 @@
+"""Benchmark for read latency while uploads are committing
+
+Uses a file-backed SQLite database (like the Docker setup) and runs a handful
+of writer threads that keep uploading `sample.csv` while a reader thread
+repeatedly lists files. The run is repeated for each journal mode so the
+effect of WAL on reader latency (and on "database is locked" errors) can be
+compared directly.
+
+  Typical usage (from the repository root):
+
+  $ python -m benchmarks.concurrency --writers 4 --seconds 5
+
+"""
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from tests import testing_settings
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, os.pardir)
+SAMPLE = os.path.join(PROJECT_ROOT, "sample.csv")
+
+
+def make_config(workdir: str, journal_mode: str, synchronous: str):
+    """Builds a config object based on the test settings"""
+    config = {
+        key: getattr(testing_settings, key)
+        for key in dir(testing_settings)
+        if key.isupper()
+    }
+    config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+        SQLITE_JOURNAL_MODE=journal_mode,
+        SQLITE_SYNCHRONOUS=synchronous,
+        SQLITE_BUSY_TIMEOUT=5000,
+        LOG_TO_STDOUT=True,
+    )
+    return type("BenchConfig", (), config)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(journal_mode: str, synchronous: str, writers: int, seconds: float):
+    """Runs one scenario and returns (read latencies, uploads, errors)"""
+    from csv_poc.app import create_app
+    from csv_poc.extensions import db
+
+    with open(SAMPLE, "rb") as f:
+        payload = f.read()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(make_config(workdir, journal_mode, synchronous))
+        app.logger.disabled = True
+        with app.app_context():
+            db.create_all()
+
+        stop = threading.Event()
+        latencies, uploads, errors = [], [0], [0]
+        lock = threading.Lock()
+
+        def writer(n):
+            client = app.test_client()
+            i = 0
+            while not stop.is_set():
+                data = {"file": (io.BytesIO(payload), f"w{n}_{i}.csv")}
+                rv = client.post("/api/v1/files", data=data)
+                with lock:
+                    if rv.status_code == 201:
+                        uploads[0] += 1
+                    else:
+                        errors[0] += 1
+                i += 1
+
+        def reader():
+            client = app.test_client()
+            while not stop.is_set():
+                start = time.perf_counter()
+                rv = client.get("/api/v1/files")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if rv.status_code == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors[0] += 1
+
+        threads = [
+            threading.Thread(target=writer, args=(n,)) for n in range(writers)
+        ]
+        threads.append(threading.Thread(target=reader))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        with app.app_context():
+            db.engine.dispose()
+
+    return latencies, uploads[0], errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'journal':<18}{'reads':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"
+        f"{'uploads':>9}{'errors':>8}"
+    )
+    for journal_mode, synchronous in (("DELETE", "FULL"), ("WAL", "NORMAL")):
+        latencies, uploads, errors = run(
+            journal_mode, synchronous, args.writers, args.seconds
+        )
+        if not latencies:
+            latencies = [float("nan")]
+        print(
+            f"{journal_mode + '/' + synchronous:<18}{len(latencies):>7}"
+            f"{statistics.median(latencies) * 1000:>9.2f}"
+            f"{percentile(latencies, 95) * 1000:>9.2f}"
+            f"{max(latencies) * 1000:>9.2f}{uploads:>9}{errors:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
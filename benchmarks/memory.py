@@ -0,0 +1,128 @@
+"""Benchmark for the peak memory of `parse_columns` against file size
+
+Builds CSV files of increasing size out of `sample.csv` and parses each one
+in a brand new interpreter, so that every measurement starts from the same
+baseline. Peak RSS comes from `getrusage()` and is the number that gets a
+worker OOM-killed; the tracemalloc peak only counts Python allocations made
+while parsing. Results are printed as a table followed by a text plot of peak
+RSS against file size: flat means streaming, a slope means the file is held
+in memory.
+
+  Typical usage (from the repository root):
+
+  $ python -m benchmarks.memory --sizes 1,4,16,64
+
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, os.pardir)
+SAMPLE = os.path.join(PROJECT_ROOT, "sample.csv")
+PLOT_WIDTH = 50
+
+# executed inside the child interpreter, prints a JSON dict of measurements
+PROBE = """
+import json, resource, sys, tracemalloc
+from csv_poc.app import create_app
+from csv_poc.extensions import db
+from csv_poc.database.models import File
+from csv_poc.utils.file import parse_columns
+app = create_app()
+with app.app_context():
+    db.create_all()
+    file = File.create(name="memory.csv", path=sys.argv[1])
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    parsed = parse_columns(file_path=sys.argv[1], file_id=file.id)
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+print(json.dumps({
+    "rows": parsed.row_count,
+    "baseline_kib": baseline,
+    "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "traced_kib": traced // 1024,
+}))
+"""
+
+
+def build_csv(path: str, megabytes: float) -> int:
+    """Repeats the rows of `sample.csv` until the file is `megabytes` big"""
+    with open(SAMPLE, "rb") as fh:
+        header, *rows = fh.read().splitlines(keepends=True)
+    body = b"".join(rows)
+    target = int(megabytes * 1024 * 1024)
+    with open(path, "wb") as out:
+        out.write(header)
+        while out.tell() < target:
+            out.write(body)
+    return os.path.getsize(path)
+
+
+def run_once(path: str) -> dict:
+    """Parses one file in a subprocess and returns its measurements"""
+    env = dict(
+        os.environ,
+        DATABASE_URI="sqlite://",
+        LOG_TO_STDOUT="True",
+        FLASK_ENV="production",
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, path],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def plot(results: list) -> None:
+    """Prints one bar of peak RSS per file size"""
+    top = max(r["peak_rss_kib"] for r in results)
+    print(f"\npeak RSS (MiB) by file size, bar = {top / 1024:.1f} MiB max")
+    for r in results:
+        bar = "#" * max(1, round(PLOT_WIDTH * r["peak_rss_kib"] / top))
+        print(
+            f"{r['size'] / 1024 / 1024:>8.1f} MiB |{bar:<{PLOT_WIDTH}} "
+            f"{r['peak_rss_kib'] / 1024:.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="1,4,16,64",
+        help="Comma separated file sizes in MiB",
+    )
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="memory_") as directory:
+        print(
+            f"{'size MiB':>10}{'rows':>12}{'peak RSS MiB':>15}"
+            f"{'delta MiB':>12}{'traced MiB':>13}"
+        )
+        for megabytes in (float(s) for s in args.sizes.split(",")):
+            path = os.path.join(directory, f"{megabytes:g}.csv")
+            size = build_csv(path, megabytes)
+            result = dict(run_once(path), size=size)
+            os.remove(path)
+            results.append(result)
+            print(
+                f"{size / 1024 / 1024:>10.1f}{result['rows']:>12}"
+                f"{result['peak_rss_kib'] / 1024:>15.1f}"
+                f"{(result['peak_rss_kib'] - result['baseline_kib']) / 1024:>12.1f}"
+                f"{result['traced_kib'] / 1024:>13.1f}"
+            )
+    plot(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark for the read path: ORM instances against Core selects
+
+Fills a database with a page worth of files and one file with a very wide
+schema, then times the two read endpoints' queries and serialization both
+ways: the ORM path (`File.query.paginate()` / `File.get_by_id()` followed by
+`to_dict()`) and the Core path from `csv_poc.database.reads` that the DAO
+uses. The session is cleared before every ORM run so its identity map does
+not serve objects from the previous one. Both paths must produce the same
+dictionaries, which is checked before anything is timed.
+
+  Typical usage (from the repository root):
+
+  $ python -m benchmarks.reads --files 1000 --columns 5000
+
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("LOG_TO_STDOUT", "True")
+os.environ.setdefault("FLASK_ENV", "production")
+
+from sqlalchemy import insert  # noqa: E402
+
+from csv_poc.api.v1.files_dao import DETAIL_FIELDS  # noqa: E402
+from csv_poc.app import create_app  # noqa: E402
+from csv_poc.database.models import Column, File  # noqa: E402
+from csv_poc.database.reads import file_page, file_record  # noqa: E402
+from csv_poc.extensions import db  # noqa: E402
+
+
+def populate(files: int, columns: int) -> int:
+    """Inserts the files and returns the ID of the wide one"""
+    db.session.execute(
+        insert(File),
+        [
+            dict(name=f"file{n}.csv", path=f"/data/file{n}.csv")
+            for n in range(files)
+        ],
+    )
+    wide = File.create(name="wide.csv", path="/data/wide.csv")
+    db.session.execute(
+        insert(Column),
+        [
+            dict(
+                file_id=wide.id,
+                col_index=n,
+                col_name=f"column {n}",
+                col_type=("text", "number", "datetime")[n % 3],
+                null_count=n % 7,
+                min_value=str(n),
+                max_value=str(n * 2),
+            )
+            for n in range(columns)
+        ],
+    )
+    db.session.commit()
+    return wide.id
+
+
+def orm_page(per_page: int) -> list:
+    db.session.expunge_all()
+    query = File.query.paginate(page=1, per_page=per_page, error_out=False)
+    return [
+        file.to_dict(show=["row_count", "byte_size", "column_count"])
+        for file in query.items
+    ]
+
+
+def core_page(per_page: int) -> list:
+    return [record._asdict() for record in file_page(db.session, 1, per_page)]
+
+
+def orm_schema(file_id: int) -> dict:
+    db.session.expunge_all()
+    return db.session.get(File, file_id).to_dict(show=DETAIL_FIELDS)
+
+
+def core_schema(file_id: int) -> dict:
+    return file_record(db.session, file_id).to_dict()
+
+
+def median_ms(func, arg, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        wide_id = populate(args.files, args.columns)
+        assert orm_page(args.files) == core_page(args.files)
+        assert orm_schema(wide_id) == core_schema(wide_id)
+
+        print(
+            f"{'query':<28}{'ORM':>10}{'Core':>10}{'speed-up':>10}"
+            f"   (median of {args.runs}, ms)"
+        )
+        for label, orm, core, arg in (
+            (
+                f"list page ({args.files} files)",
+                orm_page,
+                core_page,
+                args.files,
+            ),
+            (
+                f"schema ({args.columns} columns)",
+                orm_schema,
+                core_schema,
+                wide_id,
+            ),
+        ):
+            orm_ms = median_ms(orm, arg, args.runs)
+            core_ms = median_ms(core, arg, args.runs)
+            print(
+                f"{label:<28}{orm_ms:>10.1f}{core_ms:>10.1f}"
+                f"{orm_ms / core_ms:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
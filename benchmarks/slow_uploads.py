@@ -0,0 +1,191 @@
+"""Load test: many slow uploads against a single server process
+
+Starts the API in a subprocess, either as a gunicorn sync worker (WSGI) or
+through uvicorn and `csv_poc.asgi` (asyncio), then opens N connections that
+each trickle a multipart upload over several seconds. While they are in
+flight a probe keeps requesting the file list, which shows whether the
+process can still serve metadata reads while it is holding the uploads.
+
+  Typical usage (from the repository root):
+
+  $ python -m benchmarks.slow_uploads --clients 50 --seconds 8
+
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, os.pardir)
+SAMPLE = os.path.join(PROJECT_ROOT, "sample.csv")
+BOUNDARY = "slowuploadboundary"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode: str, port: int) -> list:
+    if mode == "sync":
+        return [
+            sys.executable, "-m", "gunicorn", "-w", "1", "--threads", "1",
+            "-b", f"127.0.0.1:{port}", "--timeout", "120", "csv_poc.wsgi:app",
+        ]  # fmt: skip
+    return [
+        sys.executable, "-m", "uvicorn", "csv_poc.asgi:app",
+        "--port", str(port), "--log-level", "warning",
+    ]  # fmt: skip
+
+
+def upload_body(name: str) -> bytes:
+    with open(SAMPLE, "rb") as f:
+        content = f.read()
+    return (
+        (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+        ).encode()
+        + content
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+async def read_status(reader) -> int:
+    line = await reader.readline()
+    return int(line.split()[1]) if line else 0
+
+
+async def slow_upload(port: int, n: int, seconds: float, results: list):
+    body = upload_body(f"slow_{n}.csv")
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            (
+                "POST /api/v1/files HTTP/1.1\r\n"
+                f"Host: 127.0.0.1:{port}\r\n"
+                f"Content-Type: multipart/form-data; boundary={BOUNDARY}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+        )
+        steps = 20
+        step = max(1, len(body) // steps)
+        for i in range(0, len(body), step):
+            writer.write(body[i : i + step])
+            await writer.drain()
+            await asyncio.sleep(seconds / steps)
+        sent_at = time.perf_counter()
+        status = await asyncio.wait_for(read_status(reader), timeout=120)
+        results.append((status, time.perf_counter() - sent_at))
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        results.append((0, float("nan")))
+
+
+async def probe(port: int, stop: asyncio.Event, latencies: list, failures: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                (
+                    "GET /api/v1/files HTTP/1.1\r\n"
+                    f"Host: 127.0.0.1:{port}\r\nConnection: close\r\n\r\n"
+                ).encode()
+            )
+            status = await asyncio.wait_for(read_status(reader), timeout=2)
+            writer.close()
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures.append(status)
+        except (OSError, asyncio.TimeoutError):
+            failures.append("timeout")
+        await asyncio.sleep(0.1)
+
+
+async def scenario(port: int, clients: int, seconds: float):
+    results, latencies, failures = [], [], []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(port, stop, latencies, failures))
+    await asyncio.gather(
+        *(slow_upload(port, n, seconds, results) for n in range(clients))
+    )
+    stop.set()
+    await prober
+    return results, latencies, failures
+
+
+def wait_for_port(port: int, timeout: float = 20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def run(mode: str, clients: int, seconds: float):
+    workdir = tempfile.mkdtemp()
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        UPLOAD_FOLDER=os.path.join(workdir, "uploads"),
+        LOG_TO_STDOUT="True",
+        FLASK_ENV="production",
+    )
+    server = subprocess.Popen(
+        server_command(mode, port),
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        return asyncio.run(scenario(port, clients, seconds))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=8.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<6}{'uploads ok':>12}{'resp after body s':>19}"
+        f"{'probes ok':>11}{'probe p50 ms':>14}{'probe max ms':>14}"
+        f"{'probe fail':>12}"
+    )
+    for mode in ("sync", "async"):
+        results, latencies, failures = run(mode, args.clients, args.seconds)
+        ok = [elapsed for status, elapsed in results if status == 201]
+        print(
+            f"{mode:<6}{len(ok):>8}/{args.clients:<3}"
+            f"{statistics.median(ok) if ok else float('nan'):>19.2f}"
+            f"{len(latencies):>11}"
+            f"{statistics.median(latencies) * 1000 if latencies else float('nan'):>14.1f}"
+            f"{max(latencies) * 1000 if latencies else float('nan'):>14.1f}"
+            f"{len(failures):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
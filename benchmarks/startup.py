@@ -0,0 +1,90 @@
+"""Benchmark for application start-up time
+
+Measures, in a brand new interpreter each time, how long it takes to import
+the app factory, build the app and serve the first request. Every sample runs
+in its own subprocess so that nothing is already sitting in `sys.modules`.
+
+  Typical usage (from the repository root):
+
+  $ python -m benchmarks.startup --runs 10
+
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, os.pardir)
+
+# executed inside the child interpreter, prints a JSON dict of timings
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+from csv_poc.app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+with app.app_context():
+    from csv_poc.extensions import db
+    db.create_all()
+t3 = time.perf_counter()
+response = app.test_client().get("/api/v1/files")
+assert response.status_code == 200, response.status_code
+t4 = time.perf_counter()
+print(json.dumps({
+    "import": t1 - t0,
+    "create_app": t2 - t1,
+    "first_request": t4 - t3,
+    "total": (t2 - t0) + (t4 - t3),
+}))
+"""
+
+
+def run_once(lazy: bool) -> dict:
+    """Runs a single cold start in a subprocess and returns its timings"""
+    env = dict(
+        os.environ,
+        DATABASE_URI="sqlite://",
+        LOG_TO_STDOUT="True",
+        FLASK_ENV="production",
+        SERVER_NAME="localhost",
+        LAZY_STARTUP=str(lazy),
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'mode':<8}{'import':>10}{'create_app':>12}"
+        f"{'1st request':>13}{'total':>10}   (median of {args.runs}, ms)"
+    )
+    for lazy in (False, True):
+        samples = [run_once(lazy) for _ in range(args.runs)]
+        median = {
+            key: statistics.median(s[key] for s in samples) * 1000
+            for key in samples[0]
+        }
+        print(
+            f"{'lazy' if lazy else 'eager':<8}{median['import']:>10.1f}"
+            f"{median['create_app']:>12.1f}{median['first_request']:>13.1f}"
+            f"{median['total']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
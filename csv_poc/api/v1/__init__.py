@@ -7,9 +7,15 @@ from flask import Blueprint
 
 from flask_restx import Api
 
+from .columns_ns import ns as columns_ns
+from .debug_ns import ns as debug_ns
 from .files_ns import ns as files_ns
+from .uploads_ns import ns as uploads_ns
 
 api_v1 = Blueprint("api_v1", __name__, url_prefix="/api/v1")
 api = Api(api_v1, version="1.0", title="CSV PoC API")
 
 api.add_namespace(files_ns, path="/files")
+api.add_namespace(uploads_ns, path="/uploads")
+api.add_namespace(columns_ns, path="/columns")
+api.add_namespace(debug_ns, path="/debug")
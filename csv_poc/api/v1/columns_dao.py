@@ -0,0 +1,59 @@
+"""Data access library for the Columns API Namespace"""
+from flask import abort
+from http import HTTPStatus
+from typing import List
+
+from sqlalchemy.exc import OperationalError
+
+from csv_poc.database.reads import find_columns
+from csv_poc.extensions import db
+from csv_poc.utils.exc import DatabaseOpsException, InvalidMetadataException
+
+# wildcard that may end a column name pattern
+WILDCARD = "*"
+
+
+class ColumnDAO(object):
+    """DAO for searching columns across all files"""
+
+    @staticmethod
+    def search_columns(name: str, page: int = 1, per_page: int = 50) -> List:
+        """Finds the columns, in any file, with a matching name
+
+        `name` is either a column name or a prefix followed by `*`, e.g.
+        `invest*` matches "Investment" and "investor_id". Case is ignored.
+        Only prefix patterns are accepted: a leading or inner wildcard can
+        not use the index on the column names and would scan every column.
+
+        Args:
+            name: Column name or prefix pattern
+            page: One-based page number
+            per_page: Columns per page
+
+        Returns:
+            A list of column dictionaries, each with the ID and name of its
+            file, ordered by column name
+
+        Raises:
+            InvalidMetadataException: The pattern is empty or has a wildcard
+              anywhere but at the end
+            DatabaseOpsException: Error occurred while accessing the database
+        """
+        prefix = name.endswith(WILDCARD)
+        stem = name[:-1] if prefix else name
+        if not stem or WILDCARD in stem:
+            raise InvalidMetadataException(
+                message="`name` must be a column name or a prefix followed by "
+                f"`{WILDCARD}`, e.g. `invest{WILDCARD}`",
+                data=name,
+            )
+        if page < 1 or per_page < 1:
+            abort(HTTPStatus.NOT_FOUND)
+        try:
+            matches = find_columns(db.session, stem, page, per_page, prefix)
+        except OperationalError as oe:
+            raise DatabaseOpsException(
+                message="Error occurred while searching columns!",
+                data=str(oe),
+            )
+        return [match._asdict() for match in matches]
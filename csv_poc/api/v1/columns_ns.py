@@ -0,0 +1,93 @@
+"""API Namespace for finding columns across all CSV files"""
+from flask_restx import Resource, fields, Namespace
+from http import HTTPStatus
+from flask import current_app
+
+from csv_poc.utils.exc import DatabaseOpsException, InvalidMetadataException
+
+from .columns_dao import ColumnDAO
+from .files_ns import error_model
+
+ns = Namespace("columns", description="Column search across files")
+
+column_match_model = ns.model(
+    "ColumnMatch",
+    {
+        "file_id": fields.Integer(description="ID of the file"),
+        "file_name": fields.String(description="Name of the file"),
+        "col_index": fields.Integer(
+            description="Index/position of column in CSV file"
+        ),
+        "col_name": fields.String(description="Column name"),
+        "col_type": fields.String(
+            enum=["text", "number", "datetime"], description="Column type"
+        ),
+    },
+)
+
+search_parser = ns.parser()
+search_parser.add_argument(
+    "name",
+    type=str,
+    required=True,
+    location="args",
+    help="Column name, or a prefix followed by `*` (e.g. `invest*`). "
+    "Case is ignored",
+)
+search_parser.add_argument(
+    "per_page",
+    type=int,
+    default=50,
+    location="args",
+    help="Number of columns to return per page",
+)
+search_parser.add_argument(
+    "page",
+    type=int,
+    default=1,
+    location="args",
+    help="Which page of columns to return",
+)
+
+
+@ns.route("", endpoint="column_search")
+class ColumnSearchResource(Resource):
+    """Resource for finding the files that contain a column"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=column_match_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.INTERNAL_SERVER_ERROR.value,
+        HTTPStatus.INTERNAL_SERVER_ERROR.phrase,
+        model=error_model,
+    )
+    @ns.expect(search_parser)
+    def get(self):
+        """GET handler returning the matching columns of every file
+
+        The search is a range scan on the index over the lowercased column
+        names, so only prefix patterns are supported.
+        """
+        args = search_parser.parse_args()
+        try:
+            rv = ColumnDAO.search_columns(
+                args["name"], page=args["page"], per_page=args["per_page"]
+            )
+            return rv, HTTPStatus.OK
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+        except DatabaseOpsException as dbe:
+            current_app.logger.error(dbe.message)
+            return {
+                "message": dbe.message,
+                "data": dbe.data,
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
@@ -0,0 +1,69 @@
+"""API Namespace with diagnostics for operators"""
+from flask_restx import Resource, fields, Namespace
+from http import HTTPStatus
+from flask import current_app
+
+from csv_poc.utils.profiling import memory_profiles
+
+ns = Namespace("debug", description="Diagnostics")
+
+allocation_site_model = ns.model(
+    "AllocationSite",
+    {
+        "site": fields.String(description="file:line of the allocation"),
+        "size_diff": fields.Integer(
+            description="Bytes still allocated at the end, compared to the start"
+        ),
+        "count_diff": fields.Integer(description="Same, in number of blocks"),
+    },
+)
+
+memory_profile_model = ns.model(
+    "MemoryProfile",
+    {
+        "kind": fields.String(description="`request` or `phase`"),
+        "name": fields.String(description="Request line or phase name"),
+        "duration": fields.Float(description="Seconds"),
+        "peak_bytes": fields.Integer(
+            description="Highest memory use above the starting point"
+        ),
+        "retained_bytes": fields.Integer(
+            description="Memory still held at the end, above the starting point"
+        ),
+        "top": fields.List(fields.Nested(allocation_site_model)),
+    },
+)
+
+memory_parser = ns.parser()
+memory_parser.add_argument(
+    "limit",
+    type=int,
+    default=50,
+    location="args",
+    help="Number of most recent records to return",
+)
+
+
+@ns.route("/memory", endpoint="debug_memory")
+class MemoryProfileResource(Resource):
+    """Resource exposing the records of the memory profiler"""
+
+    @ns.response(
+        HTTPStatus.OK.value,
+        HTTPStatus.OK.phrase,
+        model=[memory_profile_model],
+    )
+    @ns.response(HTTPStatus.NOT_FOUND.value, HTTPStatus.NOT_FOUND.phrase)
+    @ns.expect(memory_parser)
+    def get(self):
+        """GET handler returning the most recent memory profiles
+
+        Only available when the app runs with `MEMORY_PROFILING=True`.
+        """
+        if not current_app.config.get("MEMORY_PROFILING", False):
+            return {
+                "message": "Memory profiling is disabled",
+                "data": None,
+            }, HTTPStatus.NOT_FOUND
+        args = memory_parser.parse_args()
+        return memory_profiles(limit=args["limit"]), HTTPStatus.OK
@@ -1,23 +1,89 @@
 """Data access library for Files API Namespace"""
-from typing import List
-from flask import current_app
+import random
+import threading
+from collections import Counter
+from typing import BinaryIO, Callable, List, Optional
+from flask import abort, current_app
+from http import HTTPStatus
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 import os
 from pathlib import Path
 
 from csv_poc.extensions import db
-from csv_poc.database.models import File
+from csv_poc.database.models import Column, File
+from csv_poc.database.reads import (
+    file_fingerprint,
+    file_page,
+    file_record,
+    file_records,
+    file_summaries,
+)
 from csv_poc.utils.exc import (
     InvalidFileTypeException,
+    InvalidMetadataException,
     DatabaseOpsException,
     FileNotFoundException,
     FilesystemException,
+    UnreadableFileException,
+)
+from csv_poc.utils.admission import ingest_gate
+from csv_poc.utils.dictionary import count_values, decode_rows, load_dictionary
+from csv_poc.utils.export import EXPORT_FORMATS, export_rows, project_rows
+from csv_poc.utils.file import (
+    append_rows,
+    finish_append,
+    hash_file,
+    locked_file,
+    parse_columns,
+    read_rows,
+    remove_stored,
+    rollback_append,
+    schema_fingerprint,
+)
+from csv_poc.utils.histogram import (
+    HISTOGRAM_METHODS,
+    HISTOGRAM_TYPES,
+    MAX_BINS,
+    histogram,
+)
+from csv_poc.utils.importer import discard_staged, install_staged
+from csv_poc.utils.join import JOIN_TYPES, JoinSide, hash_join
+from csv_poc.utils.preview import embed_preview, load_preview
+from csv_poc.utils.profiling import memory_phase
+from csv_poc.utils.result_cache import result_cache
+from csv_poc.utils.row_index import lookup_offsets
+from csv_poc.utils.sample import estimate_counts, load_sample
+from csv_poc.utils.search import search_rows
+from csv_poc.utils.sort_index import (
+    SORT_DIRECTIONS,
+    build_sort_index,
+    read_sort_index,
+    remove_sort_indexes,
 )
-from csv_poc.utils.file import parse_columns
+from csv_poc.utils.sql_table import run_query
+from csv_poc.utils.validation import background_validator, load_report
 
+from sqlalchemy import delete, insert
 from sqlalchemy.exc import OperationalError, IntegrityError
 
+# most file IDs a single list request may ask for
+MAX_BATCH_IDS = 1000
+# most rows a single page of file rows may hold
+MAX_PAGE_ROWS = 1000
+# most rows a single full-text search may return
+MAX_SEARCH_ROWS = 1000
+
+# fields of a file returned with its details, on top of `File.default_fields`
+DETAIL_FIELDS = [
+    "columns",
+    "path",
+    "row_count",
+    "byte_size",
+    "column_count",
+    "schema_fingerprint",
+]
+
 
 def allowed_file(filename):  # pragma: no cover
     return (
@@ -35,22 +101,65 @@ class FileDAO(object):
         """Retrieves a list of all files in the database.
 
         This method returns basic data (everything except the columns) on all
-        files stored in the database
+        files stored in the database. Rows are read with a Core select, no
+        ORM instances are created.
+
+        With `ids`, exactly those files are returned (in the given order, no
+        pagination) and with `include="columns"` every file comes with its
+        path and columns, as from `get_file()`. However many files are
+        requested, that takes one query for the files and one for all of
+        their columns.
+
+        `fingerprint`, or `schema_of` (a file ID), limits the pages to files
+        with that schema fingerprint, i.e. the same ordered column names and
+        types. The lookup uses the index on `files.schema_fingerprint`.
 
         Args:
-            **kwargs: A dictionary of pagination and sorting settings
+            **kwargs: A dictionary of pagination and sorting settings, plus
+              the optional `ids` (comma-separated file IDs), `include`,
+              `fingerprint` and `schema_of`
 
         Returns:
-            A list of File objects, without their `columns` property.
+            A list of file dictionaries
 
         Raises:
+            InvalidMetadataException: `ids` is malformed or too long, or
+              combined with a schema filter
+            FileNotFoundException: The `schema_of` file does not exist
             DatabaseOpsException: Error occurred while accessing the database
         """
-        try:
-            query = File.query.paginate(
-                per_page=kwargs.get("per_page"), page=kwargs.get("page")
+        ids = FileDAO._parse_ids(kwargs.get("ids"))
+        with_columns = kwargs.get("include") == "columns"
+        fingerprint = kwargs.get("fingerprint")
+        schema_of = kwargs.get("schema_of")
+        if ids is not None and (fingerprint or schema_of is not None):
+            raise InvalidMetadataException(
+                message="`ids` can not be combined with a schema filter",
+                data=None,
             )
-            files = [file.to_dict() for file in query.items]
+        per_page = kwargs.get("per_page") or 20
+        page = kwargs.get("page") or 1
+        if ids is None and (page < 1 or per_page < 1):
+            abort(HTTPStatus.NOT_FOUND)
+        try:
+            if schema_of is not None:
+                fingerprint = file_fingerprint(db.session, schema_of)
+                if fingerprint is None:
+                    return []
+            if ids is None:
+                records = file_page(db.session, page, per_page, fingerprint)
+                if not records and page != 1:
+                    abort(HTTPStatus.NOT_FOUND)
+                if with_columns:
+                    records = file_records(db.session, [r.id for r in records])
+            elif with_columns:
+                records = file_records(db.session, ids)
+            else:
+                records = file_summaries(db.session, ids)
+            if with_columns:
+                files = [record.to_dict() for record in records]
+            else:
+                files = [record._asdict() for record in records]
             if kwargs.get("sort_by") is not None:
                 _reverse = kwargs.get("sort_order") == "desc"
                 files.sort(
@@ -63,6 +172,33 @@ class FileDAO(object):
                 data=str(oe),
             )
 
+    @staticmethod
+    def _parse_ids(ids: str = None) -> Optional[List[int]]:
+        """Parses a comma-separated list of file IDs, dropping duplicates
+
+        Raises:
+            InvalidMetadataException: Not a list of integers, or more than
+              `MAX_BATCH_IDS` of them
+        """
+        if ids is None:
+            return None
+        try:
+            parsed = list(
+                dict.fromkeys(int(part) for part in ids.split(",") if part)
+            )
+        except ValueError:
+            raise InvalidMetadataException(
+                message="`ids` must be a comma-separated list of file IDs",
+                data=ids,
+            )
+        if len(parsed) > MAX_BATCH_IDS:
+            raise InvalidMetadataException(
+                message=f"At most {MAX_BATCH_IDS} file IDs can be requested "
+                "at once",
+                data=len(parsed),
+            )
+        return parsed
+
     @staticmethod
     def add_file(file_storage: FileStorage):
         """Logic for uploading a CSV file
@@ -93,60 +229,895 @@ class FileDAO(object):
                 data=None,
             )
         safe_filename = secure_filename(file_storage.filename)
-        file_path = os.path.join(
-            current_app.config["UPLOAD_FOLDER"], safe_filename
-        )
         current_app.logger.debug(
             f"Created safe filename {safe_filename} for uploaded document"
         )
+        return FileDAO.ingest_file(safe_filename, file_storage.save)
 
-        # attempt to save the file to the server
-        try:
-            # make sure the folder exists first
-            Path(current_app.config["UPLOAD_FOLDER"]).mkdir(
-                parents=True, exist_ok=True
-            )
+    @staticmethod
+    def ingest_file(safe_filename: str, save: Callable[[str], None]) -> dict:
+        """Stores a new file in the upload folder and analyzes its columns
 
-            current_app.logger.debug(
-                f"Saving file to folder {current_app.config['UPLOAD_FOLDER']}"
-            )
-            file_storage.save(file_path)
-            file = File.create(name=safe_filename, path=file_path)
+        Shared by single-request uploads and committed upload sessions. The
+        content is saved under a temporary name and only moved over
+        `safe_filename` once the file's row has been inserted, so an upload
+        that fails on the unique name never touches the stored file.
 
-            # this method creates Column instances and adds them to the database
-            # session, but does not commit them so we need to commit all columns
-            # once complete
-            parse_columns(file_path=file_path, file_id=file.id)
-            db.session.commit()
+        Args:
+            safe_filename: Validated, filesystem-safe name of the file
+            save: Called with a path to put the content there
 
-            return file.to_dict(show=["columns", "path"])
+        Returns:
+            Details for the new file
 
-        except IntegrityError as ie:
-            raise DatabaseOpsException(
-                message=f"File already exists", data=str(ie)
-            )
+        Raises:
+            DatabaseOpsException: A file with this name already exists
+            FilesystemException: The file could not be stored or read
+            IngestBusyException: Too many files are being ingested already
+            UnreadableFileException: A row does not match the header's width
+        """
+        file_path = os.path.join(
+            current_app.config["UPLOAD_FOLDER"], safe_filename
+        )
+        staging = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
 
-        except Exception as e:
-            raise FilesystemException(
-                message="Unknown error occurred while saving file to server",
-                data=str(e),
-            )
+        # wait for an ingest slot, or turn the request away when busy
+        with ingest_gate().slot():
+            # attempt to save the file to the server
+            try:
+                # make sure the folder exists first
+                Path(current_app.config["UPLOAD_FOLDER"]).mkdir(
+                    parents=True, exist_ok=True
+                )
+
+                current_app.logger.debug(
+                    "Saving file to folder "
+                    f"{current_app.config['UPLOAD_FOLDER']}"
+                )
+                with memory_phase("save"):
+                    save(staging)
+                    file = File.create(name=safe_filename, path=file_path)
+                    os.replace(staging, file_path)
+
+                # this method creates Column instances and adds them to the
+                # database session, but does not commit them so we need to
+                # commit all columns once complete
+                with memory_phase("parse_columns"):
+                    parsed = parse_columns(file_path=file_path, file_id=file.id)
+                file.update(
+                    commit=False,
+                    # unknown when the file could not be parsed
+                    row_count=parsed.row_count if parsed.columns else None,
+                    byte_size=os.path.getsize(file_path),
+                    column_count=len(parsed.columns),
+                    content_hash=hash_file(file_path),
+                    schema_fingerprint=schema_fingerprint(
+                        (column.col_name, column.col_type)
+                        for column in parsed.columns
+                    ),
+                )
+                with memory_phase("commit"):
+                    db.session.commit()
+                if parsed.columns:
+                    FileDAO._validate_later(file, parsed.columns)
+
+                with memory_phase("to_dict"):
+                    return file.to_dict(show=DETAIL_FIELDS)
+
+            except IntegrityError as ie:
+                raise DatabaseOpsException(
+                    message=f"File already exists", data=str(ie)
+                )
+
+            except UnreadableFileException:
+                # the row was inserted before the file was read, so it is
+                # removed again along with everything stored for it
+                db.session.rollback()
+                file.delete()
+                remove_stored(file_path)
+                raise
+
+            except Exception as e:
+                raise FilesystemException(
+                    message="Unknown error occurred while saving file to "
+                    "server",
+                    data=str(e),
+                )
+
+            finally:
+                if os.path.exists(staging):
+                    os.remove(staging)
 
     @staticmethod
     def get_file(file_id: int, **kwargs):
+        """Details of a file, including its columns
+
+        Read with two Core selects (see `csv_poc.database.reads`).
+        """
         current_app.logger.debug(f"Looking up file with ID {file_id}")
         try:
-            file = File.get_by_id(file_id)
+            file = file_record(db.session, file_id)
 
             if file is None:
                 raise FileNotFoundException(
                     message=f"File with ID {file_id} could not be found!",
                     data=None,
                 )
-            return file.to_dict(show=["columns", "path"])
+            return file.to_dict()
 
         except OperationalError as oe:
             raise DatabaseOpsException(
                 message=f"Error occurred while retrieving file with ID {file_id}!",
                 data=str(oe),
             )
+
+    @staticmethod
+    def get_file_with_preview(file_id: int) -> bytes:
+        """Serialized file details including the preview of the first rows
+
+        The preview was serialized at ingest and is spliced into the response
+        as-is, so the CSV file is not opened.
+
+        Args:
+            file_id: Primary key of the file
+
+        Returns:
+            The JSON document as bytes, with `preview` set to a list of row
+            objects (or null when the file has no preview)
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            DatabaseOpsException: The lookup failed
+        """
+        file = FileDAO.get_file(file_id)
+        return embed_preview(file, load_preview(file["path"]))
+
+    @staticmethod
+    def append_rows(file_id: int, data: BinaryIO):
+        """Appends CSV rows to an existing file
+
+        Only the new data is read; row count, row index and column statistics
+        are updated incrementally from what was stored at ingest (see
+        `csv_poc.utils.file.append_rows`). Cached results for the previous
+        content are dropped.
+
+        Args:
+            file_id: Primary key of the file to append to
+            data: Binary stream with the CSV rows. A leading header row that
+              matches the file's header is ignored.
+
+        Returns:
+            Details for the updated file
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            UnreadableFileException: The data does not match the file's layout
+            DatabaseOpsException: The metadata could not be saved. The stored
+              file is restored to its previous state in that case.
+        """
+        file = File.get_by_id(file_id)
+        if file is None:
+            raise FileNotFoundException(
+                message=f"File with ID {file_id} could not be found!",
+                data=None,
+            )
+
+        with locked_file(file.path):
+            # another request may have appended while we waited for the lock
+            db.session.refresh(file)
+            previous_hash = file.content_hash
+            result = append_rows(file, data)
+            try:
+                db.session.commit()
+            except OperationalError as oe:
+                db.session.rollback()
+                rollback_append(file.path, result)
+                raise DatabaseOpsException(
+                    message=f"Error occurred while appending to file {file_id}!",
+                    data=str(oe),
+                )
+            finish_append(result)
+        result_cache().invalidate(previous_hash)
+        remove_sort_indexes(file.path)
+        FileDAO._validate_later(file, file.columns)
+
+        current_app.logger.debug(
+            f"Appended {result.rows} rows to file {file_id}, "
+            f"now {file.row_count} rows"
+        )
+        return file.to_dict(show=DETAIL_FIELDS)
+
+    @staticmethod
+    def save_imports(results: list) -> dict:
+        """Saves a batch of directory-import results in a single transaction
+
+        New files are inserted, files whose content changed are replaced (their
+        columns are dropped and re-created) and unchanged files only get their
+        source modification time refreshed. Columns are written with one
+        executemany INSERT for the whole batch. The scanned files are only
+        moved into place once the transaction is committed, and thrown away
+        when it fails. Cached results for the previous content of replaced
+        files are dropped.
+
+        Args:
+            results: `ImportResult` tuples from `csv_poc.utils.importer`
+
+        Returns:
+            A dictionary counting "imported", "replaced" and "unchanged" files
+
+        Raises:
+            DatabaseOpsException: The batch could not be saved
+        """
+        counts = {"imported": 0, "replaced": 0, "unchanged": 0}
+        results = [r for r in results if r.status != "failed"]
+        if not results:
+            return counts
+
+        try:
+            names = [r.task.name for r in results]
+            existing = {
+                file.name: file
+                for file in File.query.filter(File.name.in_(names))
+            }
+
+            scanned, outdated = [], []
+            for result in results:
+                file = existing.get(result.task.name)
+                if result.status == "unchanged":
+                    file.source_mtime = result.mtime
+                    counts["unchanged"] += 1
+                    continue
+
+                values = dict(
+                    path=result.task.destination,
+                    row_count=result.row_count,
+                    byte_size=result.byte_size,
+                    column_count=len(result.header),
+                    content_hash=result.content_hash,
+                    source_mtime=result.mtime,
+                    schema_fingerprint=schema_fingerprint(
+                        (name, stats["col_type"])
+                        for name, stats in zip(result.header, result.stats)
+                    ),
+                )
+                if file is None:
+                    file = File(name=result.task.name, **values)
+                    db.session.add(file)
+                    counts["imported"] += 1
+                else:
+                    outdated.append(file.content_hash)
+                    file.update(commit=False, **values)
+                    counts["replaced"] += 1
+                scanned.append((file, result))
+
+            replaced = [file.id for file, _ in scanned if file.id is not None]
+            if replaced:
+                db.session.execute(
+                    delete(Column).where(Column.file_id.in_(replaced))
+                )
+            # assigns primary keys to the new files
+            db.session.flush()
+
+            column_rows = [
+                dict(col_index=idx, col_name=name, file_id=file.id, **stats)
+                for file, result in scanned
+                for idx, (name, stats) in enumerate(
+                    zip(result.header, result.stats)
+                )
+            ]
+            if column_rows:
+                db.session.execute(insert(Column), column_rows)
+            db.session.commit()
+        except (OperationalError, IntegrityError) as e:
+            db.session.rollback()
+            for result in results:
+                discard_staged(result)
+            raise DatabaseOpsException(
+                message="Error occurred while saving imported files!",
+                data=str(e),
+            )
+
+        for _, result in scanned:
+            install_staged(result)
+        for content_hash in outdated:
+            result_cache().invalidate(content_hash)
+        for file, _ in scanned:
+            remove_sort_indexes(file.path)
+        return counts
+
+    @staticmethod
+    def _validate_later(file: File, columns: List[Column]) -> None:
+        """Queues the background validation of every row of a file"""
+        background_validator().submit(
+            file.path,
+            [
+                (column.col_name, column.col_type)
+                for column in sorted(columns, key=lambda c: c.col_index)
+            ],
+            file.row_count,
+            file.content_hash,
+        )
+
+    @staticmethod
+    def get_validation(file_id: int) -> dict:
+        """Report of the background validation of a file's rows
+
+        Uploads and appends queue a validation of every row against the
+        column types (see `csv_poc.utils.validation`). Until it is done the
+        report only has a `status` of "pending". A missing or outdated report
+        (e.g. for files imported with `import-dir`) queues a new validation.
+
+        Returns:
+            The report, with a `status` of "complete", "failed" or "pending"
+
+        Raises:
+            FileNotFoundException: No file with this ID
+        """
+        file = FileDAO._lookup_file(file_id)
+        report = load_report(file.path)
+        if report is None or report["content_hash"] != file.content_hash:
+            FileDAO._validate_later(file, file.columns)
+            return {"status": "pending"}
+        return report
+
+    @staticmethod
+    def _lookup_file(file_id: int) -> File:
+        """Fetches a file or raises `FileNotFoundException`"""
+        file = File.get_by_id(file_id)
+        if file is None:
+            raise FileNotFoundException(
+                message=f"File with ID {file_id} could not be found!",
+                data=None,
+            )
+        return file
+
+    @staticmethod
+    def _project_columns(file: File, columns: str = None) -> List[Column]:
+        """Resolves a comma-separated list of column names
+
+        Args:
+            file: File the columns belong to
+            columns: Comma-separated column names, all columns when empty
+
+        Returns:
+            The matching Column instances, in the requested order
+
+        Raises:
+            InvalidMetadataException: A requested column does not exist
+        """
+        by_name = {column.col_name: column for column in file.columns}
+        if not columns:
+            return sorted(file.columns, key=lambda c: c.col_index)
+        names = [name.strip() for name in columns.split(",")]
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise InvalidMetadataException(
+                message=f"Unknown column(s) for file {file.id}",
+                data=unknown,
+            )
+        return [by_name[name] for name in names]
+
+    @staticmethod
+    def _parse_filter(file: File, where: str = None) -> Optional[tuple]:
+        """Resolves a `column=value` equality filter
+
+        Returns:
+            A `(col_index, value)` tuple, or None when `where` is empty
+
+        Raises:
+            InvalidMetadataException: The filter is malformed or names an
+              unknown column
+        """
+        if not where:
+            return None
+        name, sep, value = where.partition("=")
+        if not sep:
+            raise InvalidMetadataException(
+                message="Filters must look like `column=value`", data=where
+            )
+        (column,) = FileDAO._project_columns(file, name)
+        return column.col_index, value
+
+    @staticmethod
+    def export_file(
+        file_id: int, columns: str = None, fmt: str = "csv", where: str = None
+    ):
+        """Prepares a streaming export of a stored file
+
+        Only the requested columns are projected (and, for JSON formats,
+        converted) for each row. Nothing is read until the returned generator
+        is consumed, so the response can be streamed with constant memory.
+        When every projected and filtered column is dictionary-encoded the
+        rows are decoded from the codes and the CSV file is not read at all.
+        Filtered exports are kept in the result cache once streamed.
+
+        Args:
+            file_id: Primary key of the file
+            columns: Comma-separated column names, all columns when empty
+            fmt: "csv", "ndjson" or "json"
+            where: Optional `column=value` filter
+
+        Returns:
+            A tuple of `(body generator, mimetype, download filename)`
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: Unknown format or column, or an invalid
+              filter
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise InvalidMetadataException(
+                message=f"Unsupported export format {fmt}",
+                data=list(EXPORT_FORMATS),
+            )
+        file = FileDAO._lookup_file(file_id)
+        projected = FileDAO._project_columns(file, columns)
+        condition = FileDAO._parse_filter(file, where)
+        indices = [c.col_index for c in projected]
+        dictionary = load_dictionary(file.path, file.row_count)
+        needed = indices + ([condition[0]] if condition else [])
+        if dictionary and all(idx in dictionary.columns for idx in needed):
+            rows = decode_rows(file.path, dictionary, indices, where=condition)
+        else:
+            rows = project_rows(file.path, indices, where=condition)
+        body = export_rows(
+            fmt,
+            [c.col_name for c in projected],
+            [c.col_type for c in projected],
+            rows,
+        )
+        if condition is not None:
+            cache = result_cache()
+            key = cache.key(
+                [file.content_hash],
+                {
+                    "export": indices,
+                    "where": list(condition),
+                    "format": fmt,
+                },
+            )
+            body = cache.stream(key, body)
+        filename = f"{os.path.splitext(file.name)[0]}.{fmt}"
+        return body, EXPORT_FORMATS[fmt], filename
+
+    @staticmethod
+    def join_files(
+        file_id: int,
+        other_id: int,
+        on: str,
+        other_on: str = None,
+        how: str = "inner",
+        fmt: str = "ndjson",
+    ):
+        """Prepares a streaming hash join of two stored files
+
+        The output has every column of the first file followed by the
+        non-key columns of the second one; names that clash get a `_right`
+        suffix. The output is kept in the result cache once streamed.
+
+        Args:
+            file_id: Primary key of the left file
+            other_id: Primary key of the right file
+            on: Comma-separated key column names in the left file
+            other_on: Comma-separated key column names in the right file,
+              defaults to `on`
+            how: "inner" or "left"
+            fmt: "csv", "ndjson" or "json"
+
+        Returns:
+            A tuple of `(body generator, mimetype, download filename)`
+
+        Raises:
+            FileNotFoundException: One of the files does not exist
+            InvalidMetadataException: Unknown format, join type or column,
+              or a different number of key columns on each side
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise InvalidMetadataException(
+                message=f"Unsupported export format {fmt}",
+                data=list(EXPORT_FORMATS),
+            )
+        if how not in JOIN_TYPES:
+            raise InvalidMetadataException(
+                message=f"Unsupported join type {how}", data=list(JOIN_TYPES)
+            )
+        left = FileDAO._lookup_file(file_id)
+        right = FileDAO._lookup_file(other_id)
+        left_keys = FileDAO._project_columns(left, on)
+        right_keys = FileDAO._project_columns(right, other_on or on)
+        if not on or len(left_keys) != len(right_keys):
+            raise InvalidMetadataException(
+                message="Both files need the same number of key columns",
+                data=[c.col_name for c in left_keys + right_keys],
+            )
+
+        left_columns = sorted(left.columns, key=lambda c: c.col_index)
+        right_columns = [
+            column
+            for column in sorted(right.columns, key=lambda c: c.col_index)
+            if column not in right_keys
+        ]
+        left_names = {column.col_name for column in left_columns}
+        names = [column.col_name for column in left_columns] + [
+            f"{column.col_name}_right"
+            if column.col_name in left_names
+            else column.col_name
+            for column in right_columns
+        ]
+        types = [c.col_type for c in left_columns + right_columns]
+        right_indices = [column.col_index for column in right_columns]
+
+        pairs = hash_join(
+            JoinSide(
+                path=left.path,
+                key_indices=[c.col_index for c in left_keys],
+                width=len(left_columns),
+                byte_size=os.path.getsize(left.path),
+            ),
+            JoinSide(
+                path=right.path,
+                key_indices=[c.col_index for c in right_keys],
+                width=len(right.columns),
+                byte_size=os.path.getsize(right.path),
+            ),
+            how=how,
+            memory_budget=current_app.config["JOIN_MEMORY_BUDGET"],
+        )
+        rows = (
+            tuple(left_row) + tuple(right_row[idx] for idx in right_indices)
+            for left_row, right_row in pairs
+        )
+        cache = result_cache()
+        key = cache.key(
+            [left.content_hash, right.content_hash],
+            {
+                "join": [c.col_index for c in left_keys],
+                "on": [c.col_index for c in right_keys],
+                "how": how,
+                "format": fmt,
+            },
+        )
+        body = cache.stream(key, export_rows(fmt, names, types, rows))
+        filename = (
+            f"{os.path.splitext(left.name)[0]}_"
+            f"{os.path.splitext(right.name)[0]}.{fmt}"
+        )
+        return body, EXPORT_FORMATS[fmt], filename
+
+    @staticmethod
+    def count_values(
+        file_id: int, col_name: str, approximate: bool = False
+    ) -> dict:
+        """Counts the occurrences of each value of a column (a group-by count)
+
+        Dictionary-encoded columns are counted straight from their codes,
+        other columns by scanning the CSV file. With `approximate` the counts
+        are estimated from the file's row sample instead, each with the
+        half-width of its 95% confidence interval as `error`. Exact counts
+        are kept in the result cache.
+
+        Args:
+            file_id: Primary key of the file
+            col_name: Name of the column
+            approximate: Answer from the row sample
+
+        Returns:
+            A dictionary with the column name and the values, most frequent
+            first
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: Unknown column, or no usable sample
+              for an approximate answer
+        """
+        file = FileDAO._lookup_file(file_id)
+        (column,) = FileDAO._project_columns(file, col_name)
+        if approximate:
+            sample = FileDAO._load_sample(file)
+            return {
+                "column": column.col_name,
+                "approximate": True,
+                "sample_size": len(sample.rows),
+                "values": estimate_counts(sample, column.col_index),
+            }
+        dictionary = load_dictionary(file.path, file.row_count)
+        encoded = bool(dictionary) and column.col_index in dictionary.columns
+
+        def counted() -> dict:
+            if encoded:
+                counts = count_values(file.path, dictionary, column.col_index)
+            else:
+                counts = Counter(
+                    value
+                    for (value,) in project_rows(file.path, [column.col_index])
+                )
+            return {
+                "column": column.col_name,
+                "approximate": False,
+                "encoded": encoded,
+                "values": [
+                    {"value": value, "count": count}
+                    for value, count in counts.most_common()
+                ],
+            }
+
+        cache = result_cache()
+        return cache.get_or_compute(
+            cache.key(
+                [file.content_hash],
+                {"values": column.col_index, "encoded": encoded},
+            ),
+            counted,
+        )
+
+    @staticmethod
+    def column_histogram(
+        file_id: int, col_name: str, bins: int = 10, method: str = "equal"
+    ) -> dict:
+        """Histogram of a `number` or `datetime` column
+
+        Results are kept in the result cache.
+
+        Args:
+            file_id: Primary key of the file
+            col_name: Name of the column
+            bins: Number of bins, between 1 and `MAX_BINS`
+            method: "equal" for equal-width or "quantile" for equal-count bins
+
+        Returns:
+            A dictionary with the column name and its histogram
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: Unknown column, unsupported column type,
+              method or number of bins
+        """
+        if method not in HISTOGRAM_METHODS:
+            raise InvalidMetadataException(
+                message=f"Unsupported histogram method {method}",
+                data=list(HISTOGRAM_METHODS),
+            )
+        if not 1 <= bins <= MAX_BINS:
+            raise InvalidMetadataException(
+                message=f"Number of bins must be between 1 and {MAX_BINS}",
+                data=bins,
+            )
+        file = FileDAO._lookup_file(file_id)
+        (column,) = FileDAO._project_columns(file, col_name)
+        if column.col_type not in HISTOGRAM_TYPES:
+            raise InvalidMetadataException(
+                message=f"Histograms need a number or datetime column, "
+                f"{column.col_name} is {column.col_type}",
+                data=list(HISTOGRAM_TYPES),
+            )
+        cache = result_cache()
+        result = cache.get_or_compute(
+            cache.key(
+                [file.content_hash],
+                {
+                    "histogram": column.col_index,
+                    "type": column.col_type,
+                    "bins": bins,
+                    "method": method,
+                },
+            ),
+            lambda: histogram(
+                file.path,
+                column.col_index,
+                column.col_type,
+                bins=bins,
+                method=method,
+            ),
+        )
+        return dict(result, column=column.col_name)
+
+    @staticmethod
+    def _load_sample(file: File):
+        sample = load_sample(file.path, file.row_count)
+        if sample is None:
+            raise InvalidMetadataException(
+                message=f"File with ID {file.id} has no row sample", data=None
+            )
+        return sample
+
+    @staticmethod
+    def sample_file(file_id: int, n: int = 100) -> dict:
+        """Returns a uniform random sample of a file's rows
+
+        The rows are drawn from the sample stored at ingest, so the CSV file
+        itself is not read.
+
+        Args:
+            file_id: Primary key of the file
+            n: Number of rows, capped at the size of the stored sample
+
+        Returns:
+            A dictionary with the file's row count and the sampled rows in
+            file order
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: The file has no usable row sample
+        """
+        file = FileDAO._lookup_file(file_id)
+        sample = FileDAO._load_sample(file)
+        rows = sample.rows
+        if n < len(rows):
+            rows = sorted(random.sample(rows, max(n, 0)))
+        names = [
+            column.col_name
+            for column in sorted(file.columns, key=lambda c: c.col_index)
+        ]
+        return {
+            "row_count": sample.seen,
+            "rows": [
+                {"row": row_number, "values": dict(zip(names, values))}
+                for row_number, values in rows
+            ],
+        }
+
+    @staticmethod
+    def search_file(file_id: int, query: str, limit: int = 50) -> dict:
+        """Full-text search over the text columns of a file
+
+        Matching row numbers come from the file's FTS index; each row is then
+        read directly from the CSV file through the row offset index.
+
+        Args:
+            file_id: Primary key of the file
+            query: FTS5 query string
+            limit: Maximum number of rows returned, between 1 and
+              `MAX_SEARCH_ROWS`
+
+        Returns:
+            A dictionary with the query and the matching rows
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: Invalid query or limit, or no search
+              index
+        """
+        if not 1 <= limit <= MAX_SEARCH_ROWS:
+            raise InvalidMetadataException(
+                message=f"Search limit must be between 1 and "
+                f"{MAX_SEARCH_ROWS}",
+                data=limit,
+            )
+        file = FileDAO._lookup_file(file_id)
+        row_numbers = search_rows(file.path, query, limit=limit)
+        offsets = lookup_offsets(file.path, row_numbers)
+        names = [
+            column.col_name
+            for column in sorted(file.columns, key=lambda c: c.col_index)
+        ]
+        return {
+            "query": query,
+            "rows": [
+                {"row": row_number, "values": dict(zip(names, values))}
+                for row_number, values in zip(
+                    row_numbers, read_rows(file.path, offsets)
+                )
+            ],
+        }
+
+    @staticmethod
+    def query_file(
+        file_id: int, sql: str, params: list = None, limit: int = None
+    ) -> dict:
+        """Runs a read-only SQL query against the SQL table of a file
+
+        Files get an SQL table (`data`) at ingest when `SQL_TABLES` is
+        enabled, see `csv_poc.utils.sql_table`.
+
+        Args:
+            file_id: Primary key of the file
+            sql: A single SELECT statement
+            params: Values for the statement's `?` placeholders
+            limit: Maximum number of rows returned (default and upper bound:
+              `SQL_QUERY_MAX_ROWS`)
+
+        Returns:
+            A dictionary with the result's columns and rows
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: Invalid, disallowed or slow query, or
+              no SQL table
+        """
+        max_rows = current_app.config["SQL_QUERY_MAX_ROWS"]
+        limit = limit or max_rows
+        if not 0 < limit <= max_rows:
+            raise InvalidMetadataException(
+                message=f"Limit must be between 1 and {max_rows}", data=limit
+            )
+        file = FileDAO._lookup_file(file_id)
+        return run_query(
+            file.path,
+            sql,
+            params or (),
+            limit=limit,
+            timeout=current_app.config["SQL_QUERY_TIMEOUT"],
+        )
+
+    @staticmethod
+    def _parse_sort(file: File, sort: str) -> tuple:
+        """Splits `column` or `column:direction` into a column and direction"""
+        name, sep, direction = sort.rpartition(":")
+        if not sep or direction not in SORT_DIRECTIONS:
+            name, direction = sort, "asc"
+        (column,) = FileDAO._project_columns(file, name)
+        return column, direction == "desc"
+
+    @staticmethod
+    def get_rows(
+        file_id: int, sort: str = None, page: int = 1, per_page: int = 50
+    ) -> dict:
+        """Returns a page of a file's rows, optionally sorted by a column
+
+        The first request for an order sorts the whole file out of core and
+        stores the result as a permutation index (see
+        `csv_poc.utils.sort_index`); later requests read just their page of
+        it. Every row is then read straight from the CSV file through the
+        row offset index. Appending to the file drops its sort indexes.
+
+        Args:
+            file_id: Primary key of the file
+            sort: `column`, `column:asc` or `column:desc`, file order when
+              omitted
+            page: One-based page number
+            per_page: Rows per page, at most `MAX_PAGE_ROWS`
+
+        Returns:
+            A dictionary with the sort order, paging details and the rows
+
+        Raises:
+            FileNotFoundException: No file with the given ID
+            InvalidMetadataException: Unknown sort column or page size
+        """
+        if page < 1 or per_page < 1:
+            abort(HTTPStatus.NOT_FOUND)
+        if per_page > MAX_PAGE_ROWS:
+            raise InvalidMetadataException(
+                message=f"At most {MAX_PAGE_ROWS} rows fit on a page",
+                data=per_page,
+            )
+        file = FileDAO._lookup_file(file_id)
+        start, stop = (page - 1) * per_page, page * per_page
+        if sort:
+            column, descending = FileDAO._parse_sort(file, sort)
+            args = (file.path, column.col_index, descending, file.content_hash)
+            row_numbers = read_sort_index(*args, start, stop)
+            if row_numbers is None:
+                build_sort_index(
+                    file.path,
+                    column.col_index,
+                    column.col_type,
+                    descending,
+                    file.content_hash,
+                    file.row_count,
+                    memory_budget=current_app.config["SORT_MEMORY_BUDGET"],
+                )
+                row_numbers = read_sort_index(*args, start, stop)
+            sort = f"{column.col_name}:{SORT_DIRECTIONS[descending]}"
+        else:
+            row_numbers = range(start, min(stop, file.row_count))
+        if not row_numbers and page != 1:
+            abort(HTTPStatus.NOT_FOUND)
+
+        offsets = lookup_offsets(file.path, row_numbers)
+        names = [
+            column.col_name
+            for column in sorted(file.columns, key=lambda c: c.col_index)
+        ]
+        return {
+            "sort": sort,
+            "page": page,
+            "per_page": per_page,
+            "row_count": file.row_count,
+            "rows": [
+                {"row": row_number, "values": dict(zip(names, values))}
+                for row_number, values in zip(
+                    row_numbers, read_rows(file.path, offsets)
+                )
+            ],
+        }
@@ -1,7 +1,7 @@
 """API Namespace for handling CSV files"""
-from flask_restx import Resource, fields, Namespace
+from flask_restx import Resource, fields, inputs, Namespace
 from http import HTTPStatus
-from flask import current_app, request
+from flask import Response, current_app, request, stream_with_context
 from werkzeug.datastructures import FileStorage
 
 from csv_poc.utils.exc import (
@@ -10,6 +10,7 @@ from csv_poc.utils.exc import (
     UnreadableFileException,
     DatabaseOpsException,
     FileNotFoundException,
+    IngestBusyException,
     CsvPocException,
 )
 
@@ -31,9 +32,18 @@ get_column_model = ns.model(
         "col_type": fields.String(
             enum=["text", "number", "datetime"], description="Column type"
         ),
+        "null_count": fields.Integer(description="Number of empty values"),
+        "min_value": fields.String(description="Smallest value in the column"),
+        "max_value": fields.String(description="Largest value in the column"),
     },
 )
 
+file_size_fields = {
+    "row_count": fields.Integer(description="Number of data rows"),
+    "byte_size": fields.Integer(description="Size of the file in bytes"),
+    "column_count": fields.Integer(description="Number of columns"),
+}
+
 get_file_list_model = ns.model(
     "GetFileListModel",
     {
@@ -41,6 +51,7 @@ get_file_list_model = ns.model(
             description="Primary key for files object", readonly=True
         ),
         "name": fields.String(description="Name of the file"),
+        **file_size_fields,
     },
 )
 
@@ -52,6 +63,10 @@ get_file_model = ns.model(
         ),
         "name": fields.String(description="Name of the file"),
         "path": fields.String(description="Path to file on disk"),
+        **file_size_fields,
+        "schema_fingerprint": fields.String(
+            description="SHA-256 of the ordered column names and types"
+        ),
         "columns": fields.List(fields.Nested(get_column_model)),
     },
 )
@@ -64,11 +79,348 @@ error_model = ns.model(
     },
 )
 
+file_list_parser = pagination_parser.copy()
+file_list_parser.add_argument(
+    "ids",
+    type=str,
+    location="args",
+    help="Comma-separated file IDs: return exactly these files, in this "
+    "order, instead of a page",
+)
+file_list_parser.add_argument(
+    "schema_of",
+    type=int,
+    location="args",
+    help="Only list files with the same columns (names and types, in order) "
+    "as the file with this ID",
+)
+file_list_parser.add_argument(
+    "fingerprint",
+    type=str,
+    location="args",
+    help="Only list files with this schema fingerprint",
+)
+file_list_parser.add_argument(
+    "include",
+    type=str,
+    choices=("columns",),
+    location="args",
+    help="Extra data to include: `columns` adds the path and columns of "
+    "every file",
+)
+
 upload_parser = ns.parser()
 upload_parser.add_argument(
     "file", location="files", type=FileStorage, required=True
 )
 
+detail_parser = ns.parser()
+detail_parser.add_argument(
+    "include",
+    type=str,
+    choices=("preview",),
+    location="args",
+    help="Extra data to include: `preview` adds the first rows of the file",
+)
+
+export_parser = ns.parser()
+export_parser.add_argument(
+    "columns",
+    type=str,
+    location="args",
+    help="Comma-separated list of column names to export (default: all)",
+)
+export_parser.add_argument(
+    "where",
+    type=str,
+    location="args",
+    help="Only export rows where a column has a value, e.g. `Tactic=Events`",
+)
+export_parser.add_argument(
+    "format",
+    choices=["csv", "ndjson", "json"],
+    default="csv",
+    location="args",
+    help="Output format",
+)
+
+value_count_model = ns.model(
+    "ValueCount",
+    {
+        "value": fields.String(description="Raw value as stored in the file"),
+        "count": fields.Integer(description="Number of rows with the value"),
+        "error": fields.Float(
+            description="Half-width of the 95% confidence interval of an "
+            "approximate count"
+        ),
+    },
+)
+
+column_values_model = ns.model(
+    "ColumnValues",
+    {
+        "column": fields.String(description="Name of the column"),
+        "approximate": fields.Boolean(
+            description="Whether the counts were estimated from the row sample"
+        ),
+        "sample_size": fields.Integer(
+            description="Number of sampled rows behind approximate counts"
+        ),
+        "encoded": fields.Boolean(
+            description="Whether the counts came from the dictionary encoding"
+        ),
+        "values": fields.List(fields.Nested(value_count_model)),
+    },
+)
+
+join_parser = ns.parser()
+join_parser.add_argument(
+    "on",
+    type=str,
+    required=True,
+    location="args",
+    help="Comma-separated key column names in the first file",
+)
+join_parser.add_argument(
+    "other_on",
+    type=str,
+    location="args",
+    help="Comma-separated key column names in the second file "
+    "(default: same as `on`)",
+)
+join_parser.add_argument(
+    "how",
+    choices=["inner", "left"],
+    default="inner",
+    location="args",
+    help="Join type",
+)
+join_parser.add_argument(
+    "format",
+    choices=["csv", "ndjson", "json"],
+    default="ndjson",
+    location="args",
+    help="Output format",
+)
+
+histogram_parser = ns.parser()
+histogram_parser.add_argument(
+    "bins",
+    type=int,
+    default=10,
+    location="args",
+    help="Number of bins",
+)
+histogram_parser.add_argument(
+    "method",
+    choices=["equal", "quantile"],
+    default="equal",
+    location="args",
+    help="Equal-width bins or quantile (equal-count) bins",
+)
+
+histogram_bin_model = ns.model(
+    "HistogramBin",
+    {
+        "start": fields.Raw(description="Lower edge (inclusive)"),
+        "end": fields.Raw(
+            description="Upper edge (exclusive, except for the last bin)"
+        ),
+        "count": fields.Integer(description="Number of values in the bin"),
+    },
+)
+
+histogram_model = ns.model(
+    "Histogram",
+    {
+        "column": fields.String(description="Name of the column"),
+        "method": fields.String(description="Binning method"),
+        "count": fields.Integer(description="Number of binned values"),
+        "missing": fields.Integer(
+            description="Number of empty values or values not of the "
+            "column's type"
+        ),
+        "bins": fields.List(fields.Nested(histogram_bin_model)),
+    },
+)
+
+values_parser = ns.parser()
+values_parser.add_argument(
+    "approximate",
+    type=inputs.boolean,
+    default=False,
+    location="args",
+    help="Estimate the counts from the file's row sample",
+)
+
+sample_parser = ns.parser()
+sample_parser.add_argument(
+    "n",
+    type=inputs.positive,
+    default=100,
+    location="args",
+    help="Number of rows to return (at most the stored sample size)",
+)
+
+search_parser = ns.parser()
+search_parser.add_argument(
+    "q",
+    type=str,
+    required=True,
+    location="args",
+    help='Full-text query (FTS5 syntax, e.g. `spring` or `"spring sale"`)',
+)
+search_parser.add_argument(
+    "limit",
+    type=int,
+    default=50,
+    location="args",
+    help="Maximum number of rows to return (at most `MAX_SEARCH_ROWS`)",
+)
+
+search_row_model = ns.model(
+    "SearchRow",
+    {
+        "row": fields.Integer(description="Zero-based data row number"),
+        "values": fields.Raw(description="Column name to value mapping"),
+    },
+)
+
+search_result_model = ns.model(
+    "SearchResult",
+    {
+        "query": fields.String(description="Query that was run"),
+        "rows": fields.List(fields.Nested(search_row_model)),
+    },
+)
+
+sample_model = ns.model(
+    "RowSample",
+    {
+        "row_count": fields.Integer(
+            description="Number of rows the sample was drawn from"
+        ),
+        "rows": fields.List(fields.Nested(search_row_model)),
+    },
+)
+
+validation_column_model = ns.model(
+    "ValidationColumn",
+    {
+        "col_index": fields.Integer(description="Index of the column"),
+        "col_name": fields.String(description="Column name"),
+        "col_type": fields.String(
+            enum=["text", "number", "datetime"], description="Column type"
+        ),
+        "violations": fields.Integer(
+            description="Number of values that do not fit the column type"
+        ),
+        "rows": fields.List(
+            fields.Integer,
+            description="Zero-based numbers of the first offending rows",
+        ),
+        "offsets": fields.List(
+            fields.Integer, description="Byte offsets of the same rows"
+        ),
+    },
+)
+
+validation_report_model = ns.model(
+    "ValidationReport",
+    {
+        "status": fields.String(
+            enum=["pending", "complete", "failed"],
+            description="Whether the validation has finished",
+        ),
+        "row_count": fields.Integer(description="Number of rows checked"),
+        "valid": fields.Boolean(
+            description="Whether every value fits its column type"
+        ),
+        "duration": fields.Float(description="Seconds the validation took"),
+        "error": fields.String(description="Why the validation failed"),
+        "columns": fields.List(fields.Nested(validation_column_model)),
+    },
+)
+
+query_parser = ns.parser()
+query_parser.add_argument(
+    "sql",
+    type=str,
+    required=True,
+    location="json",
+    help="A single SELECT statement against the table `data`, e.g. "
+    '`SELECT "Tactic", count(*) FROM data GROUP BY 1`',
+)
+query_parser.add_argument(
+    "params",
+    type=list,
+    location="json",
+    help="Values for the statement's `?` placeholders",
+)
+query_parser.add_argument(
+    "limit",
+    type=inputs.positive,
+    location="json",
+    help="Maximum number of rows to return (default: `SQL_QUERY_MAX_ROWS`)",
+)
+
+query_result_model = ns.model(
+    "QueryResult",
+    {
+        "columns": fields.List(
+            fields.String, description="Names of the result columns"
+        ),
+        "rows": fields.List(fields.List(fields.Raw), description="Result rows"),
+        "truncated": fields.Boolean(
+            description="Whether more rows than `limit` were available"
+        ),
+    },
+)
+
+rows_parser = ns.parser()
+rows_parser.add_argument(
+    "sort",
+    type=str,
+    location="args",
+    help="Column to order the rows by, optionally followed by `:asc` or "
+    "`:desc` (e.g. `Investment:desc`). File order when omitted",
+)
+rows_parser.add_argument(
+    "per_page",
+    type=int,
+    default=50,
+    location="args",
+    help="Number of rows to return per page",
+)
+rows_parser.add_argument(
+    "page",
+    type=int,
+    default=1,
+    location="args",
+    help="Which page of rows to return",
+)
+
+rows_page_model = ns.model(
+    "RowsPage",
+    {
+        "sort": fields.String(description="Order of the rows, if sorted"),
+        "page": fields.Integer(description="One-based page number"),
+        "per_page": fields.Integer(description="Rows per page"),
+        "row_count": fields.Integer(description="Number of rows in the file"),
+        "rows": fields.List(fields.Nested(search_row_model)),
+    },
+)
+
+append_parser = ns.parser()
+append_parser.add_argument(
+    "file",
+    location="files",
+    type=FileStorage,
+    required=False,
+    help="CSV rows to append. The raw request body is used instead when "
+    "this is omitted (e.g. `Content-Type: text/csv`)",
+)
+
 
 @ns.route("", endpoint="get_file_list")
 class FileListResource(Resource):
@@ -80,11 +432,21 @@ class FileListResource(Resource):
     instead of POST-ing to a route such as `/upload`
     """
 
-    page_parser = pagination_parser.copy()
+    page_parser = file_list_parser
 
     @ns.response(
         HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=get_file_list_model
     )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
     @ns.response(
         HTTPStatus.INTERNAL_SERVER_ERROR.value,
         HTTPStatus.INTERNAL_SERVER_ERROR.phrase,
@@ -95,6 +457,9 @@ class FileListResource(Resource):
     def get(self):
         """GET handler which returns a list of files in the database
 
+        `ids=1,2,3&include=columns` fetches the full schemas of many files in
+        one request, `schema_of=<id>` lists the files laid out like another.
+
         Returns:
             A list of files
         """
@@ -104,6 +469,16 @@ class FileListResource(Resource):
         try:
             files = FileDAO.list_files(**args)
             return files, HTTPStatus.OK
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
         except DatabaseOpsException as dbe:
             current_app.logger.error(dbe.message)
             current_app.logger.error(dbe.data)
@@ -122,10 +497,18 @@ class FileListResource(Resource):
         HTTPStatus.UNSUPPORTED_MEDIA_TYPE.phrase,
     )
     @ns.response(HTTPStatus.BAD_REQUEST.value, HTTPStatus.BAD_REQUEST.phrase)
+    @ns.response(
+        HTTPStatus.SERVICE_UNAVAILABLE.value,
+        HTTPStatus.SERVICE_UNAVAILABLE.phrase,
+        model=error_model,
+    )
     @ns.expect(upload_parser)
     def post(self, **kwargs):
         """POST handler for file uploads
 
+        When too many files are being processed already the upload is turned
+        away with a 503 and a `Retry-After` header.
+
         Returns:
             Details for the file that was uploaded
         """
@@ -135,6 +518,13 @@ class FileListResource(Resource):
             rv = FileDAO.add_file(uploaded_file)
             current_app.logger.debug(f"Returning data:\n{rv}")
             return rv, HTTPStatus.CREATED
+        except IngestBusyException as busy:
+            current_app.logger.warning(busy.message)
+            return (
+                {"message": busy.message, "data": busy.data},
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"Retry-After": str(busy.data["retry_after"])},
+            )
         except DatabaseOpsException as dbe:
             return {
                 "message": dbe.message,
@@ -145,6 +535,11 @@ class FileListResource(Resource):
                 "message": invalid.message,
                 "data": invalid.data,
             }, HTTPStatus.BAD_REQUEST
+        except UnreadableFileException as unreadable:
+            return {
+                "message": unreadable.message,
+                "data": unreadable.data,
+            }, HTTPStatus.BAD_REQUEST
         except CsvPocException as e:
             return {
                 "message": e.message,
@@ -169,9 +564,20 @@ class FileResource(Resource):
     @ns.response(
         HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=get_file_model
     )
+    @ns.expect(detail_parser)
     def get(self, file_id, **kwargs):
-        """GET handler for returning the details on a single CSV file"""
+        """GET handler for returning the details on a single CSV file
+
+        With `include=preview` the response also holds the first rows of the
+        file, taken from the preview serialized at ingest.
+        """
+        args = detail_parser.parse_args()
         try:
+            if args["include"] == "preview":
+                return Response(
+                    FileDAO.get_file_with_preview(file_id),
+                    mimetype="application/json",
+                )
             file = FileDAO.get_file(file_id, **kwargs)
             return file, HTTPStatus.OK
         except FileNotFoundException as fnf:
@@ -188,3 +594,430 @@ class FileResource(Resource):
                 "message": dbe.message,
                 "data": dbe.data,
             }, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route("/<int:file_id>/rows", endpoint="file_rows")
+class FileRowsResource(Resource):
+    """Resource for reading and adding rows of an existing CSV file"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=rows_page_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(rows_parser)
+    def get(self, file_id):
+        """GET handler returning a page of rows, optionally sorted
+
+        The first request for a sort order sorts the file on disk, which
+        takes a while for large files; later pages are read from the stored
+        order.
+        """
+        args = rows_parser.parse_args()
+        try:
+            rv = FileDAO.get_rows(
+                file_id,
+                sort=args["sort"],
+                page=args["page"],
+                per_page=args["per_page"],
+            )
+            return rv, HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=get_file_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.INTERNAL_SERVER_ERROR.value,
+        HTTPStatus.INTERNAL_SERVER_ERROR.phrase,
+        model=error_model,
+    )
+    @ns.expect(append_parser)
+    def post(self, file_id):
+        """POST handler that appends CSV rows to an existing file
+
+        Only the new rows are read; the stored row count, row index and
+        column statistics are updated incrementally.
+        """
+        try:
+            args = append_parser.parse_args()
+            uploaded_file: FileStorage = args.get("file")
+            data = uploaded_file.stream if uploaded_file else request.stream
+            rv = FileDAO.append_rows(file_id, data)
+            return rv, HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except UnreadableFileException as unreadable:
+            return {
+                "message": unreadable.message,
+                "data": unreadable.data,
+            }, HTTPStatus.BAD_REQUEST
+        except CsvPocException as e:
+            current_app.logger.error(
+                f"Error appending to file {file_id}: {e.message}"
+            )
+            return {
+                "message": e.message,
+                "data": e.data,
+            }, HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@ns.route("/<int:file_id>/export", endpoint="file_export")
+class FileExportResource(Resource):
+    """Resource for downloading (part of) a stored CSV file"""
+
+    @ns.response(HTTPStatus.OK.value, HTTPStatus.OK.phrase)
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(export_parser)
+    def get(self, file_id):
+        """GET handler that streams a file as CSV, NDJSON or a JSON array
+
+        The body is sent with chunked transfer encoding and generated row by
+        row, so memory use does not depend on the size of the file.
+        """
+        args = export_parser.parse_args()
+        try:
+            body, mimetype, filename = FileDAO.export_file(
+                file_id,
+                columns=args["columns"],
+                fmt=args["format"],
+                where=args["where"],
+            )
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            },
+        )
+
+
+@ns.route(
+    "/<int:file_id>/columns/<string:col_name>/values", endpoint="column_values"
+)
+class ColumnValuesResource(Resource):
+    """Resource for the distinct values of a single column"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=column_values_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(values_parser)
+    def get(self, file_id, col_name):
+        """GET handler returning every value of a column with its count"""
+        args = values_parser.parse_args()
+        try:
+            rv = FileDAO.count_values(
+                file_id, col_name, approximate=args["approximate"]
+            )
+            return rv, HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+
+@ns.route(
+    "/<int:file_id>/columns/<string:col_name>/histogram",
+    endpoint="column_histogram",
+)
+class ColumnHistogramResource(Resource):
+    """Resource for the histogram of a number or datetime column"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=histogram_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(histogram_parser)
+    def get(self, file_id, col_name):
+        """GET handler returning equal-width or quantile bins of a column"""
+        args = histogram_parser.parse_args()
+        try:
+            rv = FileDAO.column_histogram(
+                file_id, col_name, bins=args["bins"], method=args["method"]
+            )
+            return rv, HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+
+@ns.route("/<int:file_id>/sample", endpoint="file_sample")
+class FileSampleResource(Resource):
+    """Resource for a uniform random sample of a file's rows"""
+
+    @ns.response(HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=sample_model)
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(sample_parser)
+    def get(self, file_id):
+        """GET handler returning sampled rows without reading the CSV file"""
+        args = sample_parser.parse_args()
+        try:
+            return FileDAO.sample_file(file_id, n=args["n"]), HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+
+@ns.route("/<int:file_id>/join/<int:other_id>", endpoint="file_join")
+class FileJoinResource(Resource):
+    """Resource for joining two stored CSV files"""
+
+    @ns.response(HTTPStatus.OK.value, HTTPStatus.OK.phrase)
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(join_parser)
+    def get(self, file_id, other_id):
+        """GET handler that streams the join of two files
+
+        The smaller file is held in a hash table and the larger one is
+        streamed past it; both are partitioned on disk when the smaller one
+        does not fit in `JOIN_MEMORY_BUDGET`.
+        """
+        args = join_parser.parse_args()
+        try:
+            body, mimetype, filename = FileDAO.join_files(
+                file_id,
+                other_id,
+                on=args["on"],
+                other_on=args["other_on"],
+                how=args["how"],
+                fmt=args["format"],
+            )
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            },
+        )
+
+
+@ns.route("/<int:file_id>/search", endpoint="file_search")
+class FileSearchResource(Resource):
+    """Resource for full-text search within a single CSV file"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=search_result_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(search_parser)
+    def get(self, file_id):
+        """GET handler returning the rows whose text columns match a query"""
+        args = search_parser.parse_args()
+        try:
+            rv = FileDAO.search_file(file_id, args["q"], limit=args["limit"])
+            return rv, HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
+
+
+@ns.route("/<int:file_id>/validation", endpoint="file_validation")
+class FileValidationResource(Resource):
+    """Resource for the validation of every row against the column types"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=validation_report_model
+    )
+    @ns.response(
+        HTTPStatus.ACCEPTED.value,
+        HTTPStatus.ACCEPTED.phrase,
+        model=validation_report_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    def get(self, file_id):
+        """GET handler returning the validation report of a file
+
+        Validation runs in the background after every upload and append.
+        While it is running the response is a 202 with a `pending` status.
+        """
+        try:
+            report = FileDAO.get_validation(file_id)
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        if report["status"] == "pending":
+            return report, HTTPStatus.ACCEPTED
+        return report, HTTPStatus.OK
+
+
+@ns.route("/<int:file_id>/query", endpoint="file_query")
+class FileQueryResource(Resource):
+    """Resource for read-only SQL queries over a single CSV file"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=query_result_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.expect(query_parser)
+    def post(self, file_id):
+        """POST handler running a SELECT against the file's SQL table
+
+        The table has one column per CSV column plus `_row`, the row number.
+        Queries are refused if they are not a SELECT, and cut off after
+        `SQL_QUERY_TIMEOUT` seconds.
+        """
+        args = query_parser.parse_args()
+        try:
+            rv = FileDAO.query_file(
+                file_id, args["sql"], params=args["params"], limit=args["limit"]
+            )
+            return rv, HTTPStatus.OK
+        except FileNotFoundException as fnf:
+            return {
+                "message": fnf.message,
+                "data": fnf.data,
+            }, HTTPStatus.NOT_FOUND
+        except InvalidMetadataException as invalid:
+            return {
+                "message": invalid.message,
+                "data": invalid.data,
+            }, HTTPStatus.BAD_REQUEST
@@ -0,0 +1,197 @@
+"""Data access library for the Uploads API Namespace"""
+import os
+import shutil
+from typing import BinaryIO
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from csv_poc.database.models import File
+from csv_poc.utils.exc import (
+    DatabaseOpsException,
+    IncompleteUploadException,
+    InvalidFileTypeException,
+    InvalidMetadataException,
+)
+from csv_poc.utils.uploads import (
+    UploadSession,
+    create_session,
+    expire_sessions,
+    load_session,
+    received_parts,
+    remove_session,
+    session_lock,
+    write_part,
+)
+
+from .files_dao import FileDAO, allowed_file
+
+
+def _session_folder() -> str:
+    return current_app.config["UPLOAD_SESSION_FOLDER"]
+
+
+def _check_name_available(safe_filename: str) -> None:
+    if File.query.filter_by(name=safe_filename).first() is not None:
+        raise DatabaseOpsException(
+            message="File already exists", data=safe_filename
+        )
+
+
+class UploadDAO(object):
+    """DAO for resumable uploads sent in parts
+
+    See `csv_poc.utils.uploads` for how sessions are stored.
+    """
+
+    @staticmethod
+    def _status(session: UploadSession) -> dict:
+        received = sorted(received_parts(session))
+        return {
+            "id": session.id,
+            "name": session.name,
+            "size": session.size,
+            "part_size": session.part_size,
+            "part_count": session.part_count,
+            "received": received,
+            "missing": sorted(
+                set(range(1, session.part_count + 1)).difference(received)
+            ),
+        }
+
+    @staticmethod
+    def create_upload(name: str, size: int, part_size: int = None) -> dict:
+        """Opens an upload session
+
+        Sessions that have been idle for longer than `UPLOAD_SESSION_TTL` are
+        cleaned up at the same time.
+
+        Args:
+            name: File name, as for a regular upload
+            size: Total size of the file in bytes
+            part_size: Size of every part but the last (default
+              `UPLOAD_PART_SIZE`)
+
+        Returns:
+            The session's status, including its `id`
+
+        Raises:
+            InvalidFileTypeException: The file name has the wrong extension
+            InvalidMetadataException: Size or part size out of bounds
+            DatabaseOpsException: A file with this name already exists
+        """
+        config = current_app.config
+        if not allowed_file(name):
+            raise InvalidFileTypeException(
+                message=f"Invalid file type for file {name}", data=None
+            )
+        part_size = part_size or config["UPLOAD_PART_SIZE"]
+        if not 0 < size <= config["UPLOAD_MAX_SIZE"]:
+            raise InvalidMetadataException(
+                message=f"Size must be between 1 and "
+                f"{config['UPLOAD_MAX_SIZE']} bytes",
+                data=size,
+            )
+        if not 0 < part_size <= config["MAX_CONTENT_LENGTH"]:
+            raise InvalidMetadataException(
+                message=f"Part size must be between 1 and "
+                f"{config['MAX_CONTENT_LENGTH']} bytes",
+                data=part_size,
+            )
+        if -(-size // part_size) > config["UPLOAD_MAX_PARTS"]:
+            raise InvalidMetadataException(
+                message=f"Part size too small, at most "
+                f"{config['UPLOAD_MAX_PARTS']} parts are allowed",
+                data=part_size,
+            )
+        safe_filename = secure_filename(name)
+        _check_name_available(safe_filename)
+
+        expired = expire_sessions(
+            _session_folder(), config["UPLOAD_SESSION_TTL"]
+        )
+        if expired:
+            current_app.logger.info(f"Removed {expired} expired upload(s)")
+        session = create_session(
+            _session_folder(), safe_filename, size, part_size
+        )
+        current_app.logger.debug(
+            f"Opened upload {session.id} for {safe_filename} "
+            f"({size} bytes in {session.part_count} parts)"
+        )
+        return UploadDAO._status(session)
+
+    @staticmethod
+    def get_upload(upload_id: str) -> dict:
+        """Status of a session, listing the parts received so far
+
+        Raises:
+            UploadNotFoundException: No session with this ID
+        """
+        return UploadDAO._status(load_session(_session_folder(), upload_id))
+
+    @staticmethod
+    def upload_part(upload_id: str, part_number: int, data: BinaryIO) -> dict:
+        """Stores one part of an upload
+
+        Raises:
+            UploadNotFoundException: No session with this ID
+            InvalidMetadataException: Unknown part number or wrong length
+        """
+        session = load_session(_session_folder(), upload_id)
+        return write_part(session, part_number, data)
+
+    @staticmethod
+    def commit_upload(upload_id: str) -> dict:
+        """Turns a complete upload into a file and runs the regular ingest
+
+        The assembled data file is hard-linked (not copied, unless the upload
+        folder is on another filesystem) into the upload folder. The session
+        keeps its data until ingest succeeds, so a failed commit can be
+        retried.
+
+        Returns:
+            Details for the new file
+
+        Raises:
+            UploadNotFoundException: No session with this ID
+            IncompleteUploadException: Some parts have not been received
+            DatabaseOpsException: A file with this name already exists
+            FilesystemException: The file could not be stored or read
+        """
+        session = load_session(_session_folder(), upload_id)
+        with session_lock(session, exclusive=True):
+            received = received_parts(session)
+            missing = [
+                n for n in range(1, session.part_count + 1) if n not in received
+            ]
+            if missing:
+                raise IncompleteUploadException(
+                    message=f"Upload {upload_id} is missing {len(missing)} "
+                    f"part(s)",
+                    data={"missing": missing},
+                )
+            _check_name_available(session.name)
+
+            def link_into_place(file_path: str) -> None:
+                try:
+                    os.link(session.data_path, file_path)
+                except OSError:
+                    shutil.copyfile(session.data_path, file_path)
+
+            rv = FileDAO.ingest_file(session.name, link_into_place)
+            remove_session(session)
+
+        current_app.logger.debug(f"Committed upload {upload_id} as {rv['id']}")
+        return rv
+
+    @staticmethod
+    def abort_upload(upload_id: str) -> None:
+        """Discards a session and everything received for it
+
+        Raises:
+            UploadNotFoundException: No session with this ID
+        """
+        session = load_session(_session_folder(), upload_id)
+        with session_lock(session, exclusive=True):
+            remove_session(session)
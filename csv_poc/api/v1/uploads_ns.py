@@ -0,0 +1,236 @@
+"""API Namespace for resumable uploads sent in parts
+
+Large files are uploaded in three steps:
+
+1. `POST /uploads` with the file name and size opens a session
+2. `PUT /uploads/<id>/parts/<n>` sends part `n` as the raw request body.
+   Parts can be sent in any order and in parallel; after an interruption,
+   `GET /uploads/<id>` lists the parts that still have to be sent.
+3. `POST /uploads/<id>/commit` turns the parts into a file, exactly like a
+   regular upload through `POST /files`
+"""
+from flask_restx import Resource, fields, inputs, Namespace
+from http import HTTPStatus
+from flask import current_app, request
+
+from csv_poc.utils.exc import (
+    CsvPocException,
+    DatabaseOpsException,
+    IncompleteUploadException,
+    IngestBusyException,
+    InvalidFileTypeException,
+    InvalidMetadataException,
+    UnreadableFileException,
+    UploadNotFoundException,
+)
+
+from .files_ns import error_model, get_file_model
+from .uploads_dao import UploadDAO
+
+ns = Namespace("uploads", description="Resumable uploads in parts")
+
+upload_session_model = ns.model(
+    "UploadSession",
+    {
+        "id": fields.String(description="ID of the upload session"),
+        "name": fields.String(description="Name of the file"),
+        "size": fields.Integer(description="Total size in bytes"),
+        "part_size": fields.Integer(
+            description="Size of every part but the last, in bytes"
+        ),
+        "part_count": fields.Integer(description="Number of parts"),
+        "received": fields.List(
+            fields.Integer, description="Parts that have been received"
+        ),
+        "missing": fields.List(
+            fields.Integer, description="Parts that still have to be sent"
+        ),
+    },
+)
+
+upload_part_model = ns.model(
+    "UploadPart",
+    {
+        "part_number": fields.Integer(description="Number of the part"),
+        "size": fields.Integer(description="Bytes received"),
+        "sha256": fields.String(description="SHA-256 of the received bytes"),
+    },
+)
+
+create_parser = ns.parser()
+create_parser.add_argument(
+    "name", type=str, required=True, location="json", help="Name of the file"
+)
+create_parser.add_argument(
+    "size",
+    type=inputs.positive,
+    required=True,
+    location="json",
+    help="Total size of the file in bytes",
+)
+create_parser.add_argument(
+    "part_size",
+    type=inputs.positive,
+    location="json",
+    help="Size of every part but the last (default: `UPLOAD_PART_SIZE`)",
+)
+
+
+def _error(e: CsvPocException, status: HTTPStatus):
+    return {"message": e.message, "data": e.data}, status
+
+
+@ns.route("", endpoint="uploads")
+class UploadListResource(Resource):
+    """Resource for opening upload sessions"""
+
+    @ns.response(
+        HTTPStatus.CREATED.value,
+        HTTPStatus.CREATED.phrase,
+        model=upload_session_model,
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.expect(create_parser)
+    def post(self):
+        """POST handler that opens an upload session"""
+        args = create_parser.parse_args()
+        try:
+            rv = UploadDAO.create_upload(
+                args["name"], args["size"], args["part_size"]
+            )
+            return rv, HTTPStatus.CREATED
+        except (
+            InvalidFileTypeException,
+            InvalidMetadataException,
+            DatabaseOpsException,
+        ) as e:
+            return _error(e, HTTPStatus.BAD_REQUEST)
+
+
+@ns.route("/<string:upload_id>", endpoint="upload")
+class UploadResource(Resource):
+    """Resource for checking on or discarding an upload session"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=upload_session_model
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    def get(self, upload_id):
+        """GET handler listing the parts received and still missing
+
+        Used to resume an interrupted upload.
+        """
+        try:
+            return UploadDAO.get_upload(upload_id), HTTPStatus.OK
+        except UploadNotFoundException as e:
+            return _error(e, HTTPStatus.NOT_FOUND)
+
+    @ns.response(HTTPStatus.NO_CONTENT.value, HTTPStatus.NO_CONTENT.phrase)
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    def delete(self, upload_id):
+        """DELETE handler that discards a session and its parts"""
+        try:
+            UploadDAO.abort_upload(upload_id)
+            return None, HTTPStatus.NO_CONTENT
+        except UploadNotFoundException as e:
+            return _error(e, HTTPStatus.NOT_FOUND)
+
+
+@ns.route("/<string:upload_id>/parts/<int:part_number>", endpoint="upload_part")
+class UploadPartResource(Resource):
+    """Resource for sending the parts of an upload"""
+
+    @ns.response(
+        HTTPStatus.OK.value, HTTPStatus.OK.phrase, model=upload_part_model
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    def put(self, upload_id, part_number):
+        """PUT handler storing one part, sent as the raw request body
+
+        Every part but the last must be exactly `part_size` bytes. Sending a
+        part again replaces it.
+        """
+        try:
+            rv = UploadDAO.upload_part(upload_id, part_number, request.stream)
+            return rv, HTTPStatus.OK
+        except UploadNotFoundException as e:
+            return _error(e, HTTPStatus.NOT_FOUND)
+        except InvalidMetadataException as e:
+            return _error(e, HTTPStatus.BAD_REQUEST)
+
+
+@ns.route("/<string:upload_id>/commit", endpoint="upload_commit")
+class UploadCommitResource(Resource):
+    """Resource for finishing an upload"""
+
+    @ns.response(
+        HTTPStatus.CREATED.value,
+        HTTPStatus.CREATED.phrase,
+        model=get_file_model,
+    )
+    @ns.response(
+        HTTPStatus.BAD_REQUEST.value,
+        HTTPStatus.BAD_REQUEST.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.NOT_FOUND.value,
+        HTTPStatus.NOT_FOUND.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.CONFLICT.value,
+        HTTPStatus.CONFLICT.phrase,
+        model=error_model,
+    )
+    @ns.response(
+        HTTPStatus.SERVICE_UNAVAILABLE.value,
+        HTTPStatus.SERVICE_UNAVAILABLE.phrase,
+        model=error_model,
+    )
+    def post(self, upload_id):
+        """POST handler that ingests a complete upload as a new file
+
+        Responds like `POST /files` does for a regular upload, including the
+        503 when too many files are being processed. The parts are kept, so
+        the commit can simply be retried.
+        """
+        try:
+            rv = UploadDAO.commit_upload(upload_id)
+            return rv, HTTPStatus.CREATED
+        except UploadNotFoundException as e:
+            return _error(e, HTTPStatus.NOT_FOUND)
+        except IncompleteUploadException as e:
+            return _error(e, HTTPStatus.CONFLICT)
+        except IngestBusyException as e:
+            return _error(e, HTTPStatus.SERVICE_UNAVAILABLE) + (
+                {"Retry-After": str(e.data["retry_after"])},
+            )
+        except (DatabaseOpsException, UnreadableFileException) as e:
+            return _error(e, HTTPStatus.BAD_REQUEST)
+        except CsvPocException as e:
+            current_app.logger.error(
+                f"Error committing upload {upload_id}: {e.message}"
+            )
+            return _error(e, HTTPStatus.INTERNAL_SERVER_ERROR)
@@ -12,13 +12,16 @@ import and call "create_app()" in order to start the Flask development server.
 import logging
 import os
 import pprint
+import threading
 from logging.handlers import RotatingFileHandler
 
 from flask import Flask
+from sqlalchemy.engine import make_url
 
 from csv_poc import commands
 from csv_poc.extensions import db, migrate
-from csv_poc.api.v1 import api_v1
+from csv_poc.database.engine import configure_sqlite, pool_options
+from csv_poc.utils.profiling import init_memory_profiling
 
 
 def create_app(config_obj="csv_poc.settings") -> Flask:
@@ -39,7 +42,11 @@ def create_app(config_obj="csv_poc.settings") -> Flask:
     app.config.from_object(config_obj)
 
     register_extensions(app)
-    register_blueprints(app)
+    init_memory_profiling(app)
+    if app.config.get("LAZY_STARTUP"):
+        defer_blueprints(app)
+    else:
+        register_blueprints(app)
     register_commands(app)
     configure_logger(app)
     return app
@@ -55,15 +62,27 @@ def register_extensions(app: Flask) -> None:
     Args:
         app: Flask instance
     """
+    engine_options = pool_options(app.config)
+    engine_options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
     db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_sqlite(engine, app.config)
+
+    # the models are cheap to import, and loading them here keeps the metadata
+    # complete for `create_all()`/migrations even when the API is lazy-loaded
+    import csv_poc.database.models  # noqa: F401
 
     # conditionally set/use batch ops for migrations
     # https://blog.miguelgrinberg.com/post/fixing-alter-table-errors-with-flask-migrate-and-sqlite
-    with app.app_context():
-        if db.engine.url.drivername == "sqlite":
-            migrate.init_app(app, db, render_as_batch=True)
-        else:
-            migrate.init_app(app, db)
+    # the backend is read from the configured URI rather than `db.engine` so
+    # that no connection is checked out while the app is being built
+    backend = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+    if backend == "sqlite":
+        migrate.init_app(app, db, render_as_batch=True)
+    else:
+        migrate.init_app(app, db)
 
 
 def register_blueprints(app: Flask) -> None:
@@ -75,9 +94,61 @@ def register_blueprints(app: Flask) -> None:
     Args:
         app:
     """
+    # flask-restx (and everything it pulls in) is imported here instead of at
+    # module level so that importing this module stays cheap
+    from csv_poc.api.v1 import api_v1
+
     app.register_blueprint(api_v1)
 
 
+def defer_blueprints(app: Flask) -> None:
+    """Postpones Blueprint registration until the first request
+
+    Used when `LAZY_STARTUP` is enabled. The API modules are only imported
+    once a request actually arrives, which keeps worker boot (and therefore
+    restarts and scale-ups) fast. Flask refuses new Blueprints after the first
+    request has been dispatched, so registration happens in a thin wrapper
+    around `wsgi_app` that runs before Flask starts handling the request.
+
+    Note that CLI commands which inspect the URL map (e.g. `flask routes`)
+    will not see the API routes in this mode.
+
+    Args:
+        app: Flask instance
+    """
+    wsgi_app = app.wsgi_app
+    lock = threading.Lock()
+    registered = False
+
+    def lazy_wsgi_app(environ, start_response):
+        nonlocal registered
+        if not registered:
+            with lock:
+                if not registered:
+                    register_blueprints(app)
+                    registered = True
+                    app.wsgi_app = wsgi_app
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = lazy_wsgi_app
+
+
+def dispose_engines(app: Flask) -> None:
+    """Drops every pooled database connection held by this process
+
+    Connections must never be shared across a `fork()`. When the app is
+    preloaded (e.g. `gunicorn --preload`) the master may already have opened
+    connections, so each worker calls this right after forking. `close=False`
+    leaves the parent's sockets alone and simply gives the child a fresh pool.
+
+    Args:
+        app: Flask instance
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
 def register_commands(app: Flask):
     """Helper that adds custom CLI commands to the application
 
@@ -86,6 +157,8 @@ def register_commands(app: Flask):
     """
     app.cli.add_command(commands.test)
     app.cli.add_command(commands.postman)
+    app.cli.add_command(commands.import_dir)
+    app.cli.add_command(commands.loadtest)
 
 
 def configure_logger(app: Flask) -> None:
@@ -115,4 +188,5 @@ def configure_logger(app: Flask) -> None:
 
     app.logger.setLevel(logging.DEBUG if app.config["DEBUG"] else logging.INFO)
     app.logger.info("CSV PoC API Initialized")
-    app.logger.debug(f":: App Config ::\n{pprint.pformat(app.config)}")
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug(f":: App Config ::\n{pprint.pformat(app.config)}")
@@ -0,0 +1,27 @@
+"""Entrypoint for serving the app from an asyncio (ASGI) server
+
+Request bodies are received on the event loop and spooled to disk, and the
+Flask app itself runs in a thread pool (see `csv_poc.utils.asgi`), so slow
+uploads no longer pin a whole worker.
+
+  Typical usage:
+
+  $ uvicorn csv_poc.asgi:app --host 0.0.0.0 --port 5000
+
+  or, with gunicorn managing the processes:
+
+  $ gunicorn -k uvicorn.workers.UvicornWorker csv_poc.asgi:app
+
+"""
+from csv_poc.app import create_app
+from csv_poc.extensions import db
+from csv_poc.utils.asgi import AsyncWsgiBridge
+
+flask_app = create_app()
+with flask_app.app_context():
+    flask_app.logger.info("Making sure database is up to date...")
+    db.create_all()
+
+app = AsyncWsgiBridge(
+    flask_app, max_workers=flask_app.config["ASGI_WORKER_THREADS"]
+)
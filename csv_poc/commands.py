@@ -1,7 +1,10 @@
 """Custom Flask CLI commands"""
 import os
+import time
 import click
 import pprint
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from flask import current_app, json
 from flask.cli import with_appcontext
 
@@ -79,3 +82,230 @@ def postman(urlvars, swagger, file):
     else:
         click.echo("Printing Postman collection...\n")
         pprint.pprint(json.dumps(data), indent=2)
+
+
+@click.command("import-dir")
+@click.argument(
+    "directory", type=click.Path(exists=True, file_okay=False, resolve_path=True)
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes (defaults to the number of CPUs)",
+)
+@click.option(
+    "-b",
+    "--batch-size",
+    type=int,
+    default=500,
+    help="Number of files saved per database transaction",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Keep running and import new/changed files as they appear",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=5.0,
+    help="Seconds between directory scans when watching",
+)
+@with_appcontext
+def import_dir(directory, workers, batch_size, watch, interval):
+    """Bulk-imports every CSV file found in a directory tree
+
+    Files are copied into the upload folder and scanned in parallel worker
+    processes, and their metadata is saved in large batches. A file is
+    skipped when its size and modification time match what was recorded by
+    the previous import; when only the modification time changed it is
+    hashed and skipped if the content is identical.
+
+    Args:
+        directory: Root of the directory tree to import
+        workers: Size of the process pool
+        batch_size: Files per database transaction
+        watch: Poll the directory for changes until interrupted
+        interval: Polling interval used with `--watch`
+    """
+    from csv_poc.api.v1.files_dao import FileDAO
+    from csv_poc.database.models import File
+    from csv_poc.extensions import db
+    from csv_poc.utils.importer import (
+        ImportTask,
+        copy_config,
+        find_csv_files,
+        import_name,
+        init_worker,
+        run_import_task,
+    )
+
+    upload_folder = current_app.config["UPLOAD_FOLDER"]
+    Path(upload_folder).mkdir(parents=True, exist_ok=True)
+
+    def plan():
+        """Lists the files that need to be (re-)imported"""
+        known = {
+            name: (byte_size, source_mtime, content_hash)
+            for name, byte_size, source_mtime, content_hash in db.session.query(
+                File.name, File.byte_size, File.source_mtime, File.content_hash
+            )
+        }
+        tasks, skipped, seen = [], 0, set()
+        for path in find_csv_files(
+            directory, current_app.config["ALLOWED_EXTENSIONS"]
+        ):
+            name = import_name(directory, path)
+            if name in seen:
+                click.echo(f"Skipping {path}: name '{name}' already used")
+                continue
+            seen.add(name)
+            stat = os.stat(path)
+            byte_size, mtime, content_hash = known.get(name, (None,) * 3)
+            if byte_size == stat.st_size and mtime == stat.st_mtime:
+                skipped += 1
+                continue
+            tasks.append(
+                ImportTask(
+                    source=path,
+                    name=name,
+                    destination=os.path.join(upload_folder, name),
+                    known_hash=content_hash if name in known else None,
+                )
+            )
+        return tasks, skipped
+
+    def flush(batch, totals):
+        counts = FileDAO.save_imports(batch)
+        for key, value in counts.items():
+            totals[key] += value
+        batch.clear()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(copy_config(current_app.config),),
+    ) as executor:
+        while True:
+            started = time.perf_counter()
+            tasks, skipped = plan()
+            totals = {"imported": 0, "replaced": 0, "unchanged": skipped}
+            failed, batch = 0, []
+
+            for result in executor.map(run_import_task, tasks, chunksize=8):
+                if result.status == "failed":
+                    failed += 1
+                    click.echo(
+                        f"Failed to import {result.task.source}: {result.error}"
+                    )
+                    continue
+                batch.append(result)
+                if len(batch) >= batch_size:
+                    flush(batch, totals)
+            flush(batch, totals)
+
+            if tasks or not watch:
+                elapsed = time.perf_counter() - started
+                click.echo(
+                    f"Imported {totals['imported']}, replaced "
+                    f"{totals['replaced']}, unchanged {totals['unchanged']}, "
+                    f"failed {failed} in {elapsed:.1f}s"
+                )
+            if not watch:
+                break
+            time.sleep(interval)
+
+
+@click.command()
+@click.option(
+    "--url",
+    default=None,
+    help="Base URL of a running server. When omitted, gunicorn is started "
+    "locally against a scratch database.",
+)
+@click.option(
+    "-w", "--workers", type=int, default=2, help="Gunicorn worker processes"
+)
+@click.option("--threads", type=int, default=1, help="Threads per worker")
+@click.option(
+    "-c",
+    "--concurrency",
+    type=int,
+    default=8,
+    help="Number of concurrent client threads",
+)
+@click.option(
+    "-d", "--duration", type=float, default=10.0, help="Seconds to run for"
+)
+@click.option(
+    "-m",
+    "--mix",
+    default=None,
+    help="Relative weights of the operations (default: "
+    "upload=1,list=10,detail=5)",
+)
+@click.option(
+    "-f",
+    "--file",
+    "upload_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=os.path.join(PROJECT_ROOT, "sample.csv"),
+    help="CSV file used for uploads",
+)
+def loadtest(url, workers, threads, concurrency, duration, mix, upload_file):
+    """Runs a concurrent load test against the files API
+
+    Client threads pick uploads, list calls and detail calls according to
+    `--mix` until `--duration` is over, then throughput and p50/p95/p99
+    latencies are reported per operation. Run it with different `--workers`
+    and `--threads` values to size gunicorn for a given load.
+
+    Args:
+        url: Server to test, a local gunicorn is started when omitted
+        workers: Gunicorn workers for the local server
+        threads: Gunicorn threads per worker for the local server
+        concurrency: Client threads
+        duration: Length of the run in seconds
+        mix: Comma-separated `operation=weight` pairs, `DEFAULT_MIX` when
+          omitted
+        upload_file: CSV file to upload
+    """
+    from contextlib import nullcontext
+
+    from csv_poc.utils.loadtest import (
+        DEFAULT_MIX,
+        local_server,
+        parse_mix,
+        run_load,
+        summarize,
+    )
+
+    mix = mix or DEFAULT_MIX
+    try:
+        weights = parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--mix")
+    with open(upload_file, "rb") as f:
+        payload = f.read()
+
+    server = nullcontext(url) if url else local_server(workers, threads)
+    with server as base_url:
+        click.echo(
+            f"Running {mix} against {base_url} with {concurrency} clients "
+            f"for {duration:.0f}s..."
+        )
+        samples = run_load(base_url, weights, concurrency, duration, payload)
+
+    click.echo(
+        f"{'operation':<11}{'requests':>9}{'errors':>8}{'req/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    )
+    for row in summarize(samples, duration):
+        click.echo(
+            f"{row['operation']:<11}{row['requests']:>9}{row['errors']:>8}"
+            f"{row['rps']:>9.1f}{row['p50']:>9.1f}{row['p95']:>9.1f}"
+            f"{row['p99']:>9.1f}"
+        )
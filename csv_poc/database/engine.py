@@ -0,0 +1,68 @@
+"""Helpers for configuring the SQLAlchemy engine(s) used by the application
+
+Flask-SQLAlchemy creates the engines itself, so the settings below are applied
+in two places: pool options are merged into `SQLALCHEMY_ENGINE_OPTIONS` before
+the extension is initialized, and the SQLite pragmas are attached as a
+"connect" listener once the engines exist.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+
+def pool_options(config) -> dict:
+    """Builds connection pool keyword arguments for `create_engine()`
+
+    SQLite uses its own pool implementations (and a file lock rather than a
+    server), so sizing options are only returned for client/server databases
+    such as Postgres.
+
+    Args:
+        config: Flask config (or any mapping) with the `DATABASE_POOL_*` keys
+
+    Returns:
+        A dictionary suitable for `SQLALCHEMY_ENGINE_OPTIONS`
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    return {
+        "pool_size": config.get("DATABASE_POOL_SIZE", 5),
+        "max_overflow": config.get("DATABASE_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DATABASE_POOL_TIMEOUT", 30),
+        "pool_recycle": config.get("DATABASE_POOL_RECYCLE", 1800),
+        "pool_pre_ping": config.get("DATABASE_POOL_PRE_PING", True),
+    }
+
+
+def configure_sqlite(engine: Engine, config) -> None:
+    """Applies performance-related pragmas to every new SQLite connection
+
+    WAL journaling lets readers keep going while an upload is committing, and
+    `synchronous=NORMAL` is the recommended (still crash-safe) pairing for it.
+    The busy timeout makes concurrent writers wait for the lock instead of
+    failing straight away with "database is locked".
+
+    Args:
+        engine: Engine to configure; non-SQLite engines are left untouched
+        config: Flask config (or any mapping) with the `SQLITE_*` keys
+    """
+    if engine.url.get_backend_name() != "sqlite":
+        return
+
+    pragmas = {
+        "journal_mode": config.get("SQLITE_JOURNAL_MODE"),
+        "synchronous": config.get("SQLITE_SYNCHRONOUS"),
+        "busy_timeout": config.get("SQLITE_BUSY_TIMEOUT"),
+        "mmap_size": config.get("SQLITE_MMAP_SIZE"),
+    }
+    pragmas = {key: value for key, value in pragmas.items() if value is not None}
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
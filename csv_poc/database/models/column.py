@@ -10,7 +10,15 @@ class Column(PkModel):
     """
 
     # set the default keys returned when serializing an instance
-    default_fields = ["id", "col_name", "col_index", "col_type"]
+    default_fields = [
+        "id",
+        "col_name",
+        "col_index",
+        "col_type",
+        "null_count",
+        "min_value",
+        "max_value",
+    ]
 
     __tablename__ = "columns"
     col_index = db.Column(db.Integer, nullable=False)
@@ -20,7 +28,20 @@ class Column(PkModel):
         default="text",
         nullable=False,
     )
-    file_id = db.Column(db.Integer, db.ForeignKey("files.id"), nullable=False)
+    file_id = db.Column(
+        db.Integer, db.ForeignKey("files.id"), nullable=False, index=True
+    )
+
+    # running statistics, maintained at ingest and on every append
+    null_count = db.Column(db.Integer, server_default="0", nullable=False)
+    min_value = db.Column(db.String, nullable=True)
+    max_value = db.Column(db.String, nullable=True)
+
+    # case-insensitive prefix search over column names across all files, see
+    # `csv_poc.database.reads.find_columns()`
+    __table_args__ = (
+        db.Index("ix_columns_col_name_lower", db.func.lower(col_name)),
+    )
 
     def __repr__(self):
         return f"<Column {self.col_name} has type {self.col_type}>"
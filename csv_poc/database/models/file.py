@@ -12,6 +12,24 @@ class File(PkModel):
     __tablename__ = "files"
     name = db.Column(db.String, nullable=False, unique=True)
     path = db.Column(db.String, nullable=False, unique=True)
+    column_count = db.Column(db.Integer, server_default="0", nullable=False)
+
+    # The following are only known once the content has been read, which
+    # happens after the row is created. `FetchedValue` keeps them out of the
+    # initial INSERT so the database fills in NULL until they are set.
+    row_count = db.Column(db.Integer, server_default=db.FetchedValue())
+    byte_size = db.Column(db.BigInteger, server_default=db.FetchedValue())
+    # SHA-256 of the content at ingest, chained on every append
+    content_hash = db.Column(
+        db.String(64), server_default=db.FetchedValue(), index=True
+    )
+    # modification time of the source file for directory imports
+    source_mtime = db.Column(db.Float, server_default=db.FetchedValue())
+    # SHA-256 of the ordered (col_name, col_type) pairs, shared by files
+    # with the same layout
+    schema_fingerprint = db.Column(
+        db.String(64), server_default=db.FetchedValue(), index=True
+    )
     columns = db.relationship("Column", backref="file", lazy=True)
 
     def __repr__(self):
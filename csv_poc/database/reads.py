@@ -0,0 +1,228 @@
+"""Read-only queries that bypass the ORM
+
+The read endpoints only turn rows into JSON. Loading ORM instances for that
+pays for identity-map bookkeeping, attribute instrumentation and a lazy load
+of `File.columns`. The queries below use Core selects instead and return rows
+as named tuples, which serialize straight into the same dictionaries that
+`PkModel.to_dict()` produces for the models.
+
+Writes still go through the models.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from csv_poc.utils.exc import FileNotFoundException
+
+from .models import Column, File
+
+files_table = File.__table__
+columns_table = Column.__table__
+
+
+class FileSummary(NamedTuple):
+    """A file as listed by `GET /files`"""
+
+    id: int
+    name: str
+    row_count: Optional[int]
+    byte_size: Optional[int]
+    column_count: int
+
+
+class ColumnRecord(NamedTuple):
+    """A column with the fields of `Column.default_fields`"""
+
+    id: int
+    col_index: int
+    col_name: str
+    col_type: str
+    null_count: int
+    min_value: Optional[str]
+    max_value: Optional[str]
+
+
+class FileRecord(NamedTuple):
+    """A file with its path and columns, as returned by `GET /files/<id>`"""
+
+    id: int
+    name: str
+    path: str
+    row_count: Optional[int]
+    byte_size: Optional[int]
+    column_count: int
+    schema_fingerprint: Optional[str]
+    columns: List[ColumnRecord]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "path": self.path,
+            "row_count": self.row_count,
+            "byte_size": self.byte_size,
+            "column_count": self.column_count,
+            "schema_fingerprint": self.schema_fingerprint,
+            "columns": [column._asdict() for column in self.columns],
+        }
+
+
+class ColumnMatch(NamedTuple):
+    """A column found by `GET /columns`, with the file it belongs to"""
+
+    file_id: int
+    file_name: str
+    col_index: int
+    col_name: str
+    col_type: str
+
+
+_column_fields = [columns_table.c[name] for name in ColumnRecord._fields]
+_summary_fields = [files_table.c[name] for name in FileSummary._fields]
+_record_fields = [files_table.c[name] for name in FileRecord._fields[:-1]]
+
+
+def file_page(
+    session: Session, page: int, per_page: int, fingerprint: str = None
+) -> List[FileSummary]:
+    """One page of files, ordered by ID
+
+    Args:
+        session: Database session
+        page: One-based page number
+        per_page: Files per page
+        fingerprint: Only list files with this schema fingerprint
+    """
+    query = select(*_summary_fields)
+    if fingerprint is not None:
+        query = query.where(files_table.c.schema_fingerprint == fingerprint)
+    result = session.execute(
+        query.order_by(files_table.c.id)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    )
+    return list(map(FileSummary._make, result))
+
+
+def file_fingerprint(session: Session, file_id: int) -> Optional[str]:
+    """Schema fingerprint of a file
+
+    Raises:
+        FileNotFoundException: No file with this ID
+    """
+    row = session.execute(
+        select(files_table.c.schema_fingerprint).where(
+            files_table.c.id == file_id
+        )
+    ).first()
+    if row is None:
+        raise FileNotFoundException(
+            message=f"File with ID {file_id} could not be found!", data=None
+        )
+    return row[0]
+
+
+def find_columns(
+    session: Session, name: str, page: int, per_page: int, prefix: bool = True
+) -> List[ColumnMatch]:
+    """One page of the columns, in any file, whose name matches `name`
+
+    Matching ignores (ASCII) case. Both forms are a range scan on the
+    `lower(col_name)` index, ordered by that index, so the cost depends on
+    the number of matches and not on the size of the columns table.
+
+    Args:
+        session: Database session
+        name: Column name, or the start of one if `prefix` is set
+        page: One-based page number
+        per_page: Columns per page
+        prefix: Match every name starting with `name` instead of only `name`
+    """
+    lowered = func.lower(columns_table.c.col_name)
+    wanted = func.lower(literal(name))
+    if prefix:
+        # every string starting with the prefix sorts between the prefix
+        # itself and the prefix followed by the largest code point
+        condition = (lowered >= wanted) & (lowered < wanted + "\U0010ffff")
+    else:
+        condition = lowered == wanted
+    result = session.execute(
+        select(
+            columns_table.c.file_id,
+            files_table.c.name,
+            columns_table.c.col_index,
+            columns_table.c.col_name,
+            columns_table.c.col_type,
+        )
+        .join(files_table, files_table.c.id == columns_table.c.file_id)
+        .where(condition)
+        .order_by(lowered, columns_table.c.id)
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+    )
+    return list(map(ColumnMatch._make, result))
+
+
+def columns_by_file(
+    session: Session, file_ids: Sequence[int]
+) -> Dict[int, List[ColumnRecord]]:
+    """Columns of the given files in one query, keyed by file ID
+
+    Every requested ID is in the result, files without columns map to an
+    empty list. Columns are in the order they were created.
+    """
+    grouped = {file_id: [] for file_id in file_ids}
+    if not grouped:
+        return grouped
+    result = session.execute(
+        select(columns_table.c.file_id, *_column_fields)
+        .where(columns_table.c.file_id.in_(grouped))
+        .order_by(columns_table.c.id)
+    )
+    make = ColumnRecord._make
+    for row in result:
+        grouped[row[0]].append(make(row[1:]))
+    return grouped
+
+
+def file_summaries(
+    session: Session, file_ids: Sequence[int]
+) -> List[FileSummary]:
+    """The given files in one query, in the order of `file_ids`
+
+    IDs without a file are skipped.
+    """
+    result = session.execute(
+        select(*_summary_fields).where(files_table.c.id.in_(file_ids))
+    )
+    found = {row[0]: FileSummary._make(row) for row in result}
+    return [found[file_id] for file_id in file_ids if file_id in found]
+
+
+def file_records(session: Session, file_ids: Sequence[int]) -> List[FileRecord]:
+    """The given files with their columns, in the order of `file_ids`
+
+    Takes two queries however many files are requested: one for the files
+    and one for all of their columns. IDs without a file are skipped.
+    """
+    result = session.execute(
+        select(*_record_fields).where(files_table.c.id.in_(file_ids))
+    )
+    found = {row[0]: row for row in result}
+    columns = columns_by_file(session, list(found))
+    return [
+        FileRecord(*found[file_id], columns[file_id])
+        for file_id in file_ids
+        if file_id in found
+    ]
+
+
+def file_record(session: Session, file_id: int) -> Optional[FileRecord]:
+    """A file with its columns, None if there is no such file"""
+    row = session.execute(
+        select(*_record_fields).where(files_table.c.id == file_id)
+    ).first()
+    if row is None:
+        return None
+    return FileRecord(*row, columns_by_file(session, [file_id])[file_id])
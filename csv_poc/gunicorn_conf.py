@@ -0,0 +1,30 @@
+"""Gunicorn configuration for the Docker container version of the app
+
+  Typical usage example:
+
+  $ gunicorn -c python:csv_poc.gunicorn_conf csv_poc.wsgi:app
+
+With `preload_app` enabled the application (and the database check done in
+`csv_poc/wsgi.py`) is loaded once in the master process and shared with every
+worker through copy-on-write memory, which makes worker restarts nearly free.
+The only catch is the database pool: connections opened by the master must not
+be reused by the forked workers, which is what `post_fork` takes care of.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+
+def post_fork(server, worker):
+    """Gives each freshly forked worker its own connection pool"""
+    from csv_poc.app import dispose_engines
+
+    app = server.app.wsgi()
+    dispose_engines(app)
+    server.log.debug(f"Disposed inherited DB connections in worker {worker.pid}")
@@ -3,6 +3,7 @@
 All "default" values in this file are settings for a production environment.
 """
 import os
+import tempfile
 from environs import Env
 
 HERE = os.path.abspath(os.path.dirname(__file__))
@@ -20,18 +21,98 @@ UPLOAD_FOLDER = env.str(
 )
 ALLOWED_EXTENSIONS = {"csv"}
 MAX_CONTENT_LENGTH = 16 * 1000 * 1000
+# build a full-text index over text columns at ingest
+FULL_TEXT_SEARCH = env.bool("FULL_TEXT_SEARCH", default=True)
+# text columns with at most this many distinct values are dictionary-encoded
+# at ingest (max 256, 0 disables the encoding)
+DICTIONARY_MAX_VALUES = env.int("DICTIONARY_MAX_VALUES", default=256)
+# number of rows kept in the per-file reservoir sample (0 disables it)
+SAMPLE_SIZE = env.int("SAMPLE_SIZE", default=1000)
+# number of rows in the pre-serialized preview returned with file details
+PREVIEW_ROWS = env.int("PREVIEW_ROWS", default=50)
+# load every file into its own SQLite table for `POST /files/<id>/query`,
+# indexing up to this many columns; rows and seconds a query may return/take
+SQL_TABLES = env.bool("SQL_TABLES", default=False)
+SQL_TABLE_MAX_INDEXES = env.int("SQL_TABLE_MAX_INDEXES", default=32)
+SQL_QUERY_MAX_ROWS = env.int("SQL_QUERY_MAX_ROWS", default=1000)
+SQL_QUERY_TIMEOUT = env.float("SQL_QUERY_TIMEOUT", default=5.0)
+# bytes the sorted runs of `GET /files/<id>/rows?sort=` may take up in
+# memory before they are spilled to disk
+SORT_MEMORY_BUDGET = env.int("SORT_MEMORY_BUDGET", default=64 * 1024 * 1024)
+# disk cache for value counts, histograms, joins and filtered exports,
+# shared by all workers on the host (0 disables it)
+RESULT_CACHE_FOLDER = env.str(
+    "RESULT_CACHE_FOLDER", default=os.path.join(UPLOAD_FOLDER, ".cache")
+)
+RESULT_CACHE_MAX_BYTES = env.int(
+    "RESULT_CACHE_MAX_BYTES", default=512 * 1024 * 1024
+)
+# bytes the in-memory side of a join may use before it is spilled to disk
+JOIN_MEMORY_BUDGET = env.int("JOIN_MEMORY_BUDGET", default=64 * 1024 * 1024)
+# resumable uploads in parts. Sessions must be on the same filesystem as
+# UPLOAD_FOLDER so that finished files are moved into place, not copied.
+UPLOAD_SESSION_FOLDER = env.str(
+    "UPLOAD_SESSION_FOLDER", default=os.path.join(UPLOAD_FOLDER, ".sessions")
+)
+UPLOAD_MAX_SIZE = env.int("UPLOAD_MAX_SIZE", default=8 * 1024 * 1024 * 1024)
+UPLOAD_PART_SIZE = env.int("UPLOAD_PART_SIZE", default=8 * 1024 * 1024)
+UPLOAD_MAX_PARTS = env.int("UPLOAD_MAX_PARTS", default=10000)
+# sessions without activity for this many seconds are removed
+UPLOAD_SESSION_TTL = env.int("UPLOAD_SESSION_TTL", default=24 * 60 * 60)
+# admission control for ingest: concurrent ingests per worker process and
+# per host (0 disables a limit), how many requests may queue for a slot and
+# for how long, and the Retry-After sent when a request is turned away
+INGEST_MAX_CONCURRENT = env.int("INGEST_MAX_CONCURRENT", default=1)
+INGEST_MAX_CONCURRENT_HOST = env.int(
+    "INGEST_MAX_CONCURRENT_HOST", default=max(1, (os.cpu_count() or 2) // 2)
+)
+INGEST_LOCK_FOLDER = env.str(
+    "INGEST_LOCK_FOLDER",
+    default=os.path.join(tempfile.gettempdir(), "csv_poc_ingest"),
+)
+INGEST_QUEUE_SIZE = env.int("INGEST_QUEUE_SIZE", default=4)
+INGEST_QUEUE_TIMEOUT = env.float("INGEST_QUEUE_TIMEOUT", default=30)
+INGEST_RETRY_AFTER = env.int("INGEST_RETRY_AFTER", default=10)
+# background validation of every row against the column types: processes
+# per web worker (0 checks rows in the background thread), rows per chunk
+# handed to a process and offending rows listed per column. Validation does
+# not go through the ingest limits above, so every web worker adds its own
+# processes; keep the total well below the cores ingest needs.
+VALIDATION_WORKERS = env.int("VALIDATION_WORKERS", default=1)
+VALIDATION_CHUNK_ROWS = env.int("VALIDATION_CHUNK_ROWS", default=100000)
+VALIDATION_EXAMPLES = env.int("VALIDATION_EXAMPLES", default=10)
 SERVER_NAME = env.str(
     "SERVER_NAME", default="server" if ENV == "TESTING" else None
 )
+# size of the thread pool running the app when served through `csv_poc.asgi`
+ASGI_WORKER_THREADS = env.int("ASGI_WORKER_THREADS", default=8)
+# defer importing/registering the API until the first request is served
+LAZY_STARTUP = env.bool("LAZY_STARTUP", default=False)
 
 # Database Settings
 SQLALCHEMY_DATABASE_URI = env.str("DATABASE_URI", default="sqlite://")
 SQLALCHEMY_TRACK_MODIFICATIONS = env.bool(
     "SQLALCHEMY_TRACK_MODIFICATIONS", default=False
 )
+# Connection pool sizing, only used for client/server databases (Postgres)
+DATABASE_POOL_SIZE = env.int("DATABASE_POOL_SIZE", default=5)
+DATABASE_MAX_OVERFLOW = env.int("DATABASE_MAX_OVERFLOW", default=10)
+DATABASE_POOL_TIMEOUT = env.int("DATABASE_POOL_TIMEOUT", default=30)
+DATABASE_POOL_RECYCLE = env.int("DATABASE_POOL_RECYCLE", default=1800)
+DATABASE_POOL_PRE_PING = env.bool("DATABASE_POOL_PRE_PING", default=True)
+# Pragmas applied to every new SQLite connection
+SQLITE_JOURNAL_MODE = env.str("SQLITE_JOURNAL_MODE", default="WAL")
+SQLITE_SYNCHRONOUS = env.str("SQLITE_SYNCHRONOUS", default="NORMAL")
+SQLITE_BUSY_TIMEOUT = env.int("SQLITE_BUSY_TIMEOUT", default=5000)  # ms
+SQLITE_MMAP_SIZE = env.int("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024)
 
 # Logging
 LOG_TO_STDOUT = env.bool("LOG_TO_STDOUT", default=False)
+# tracemalloc-based profiling of requests and upload phases (slow, opt-in)
+MEMORY_PROFILING = env.bool("MEMORY_PROFILING", default=False)
+MEMORY_PROFILE_FRAMES = env.int("MEMORY_PROFILE_FRAMES", default=1)
+MEMORY_PROFILE_TOP = env.int("MEMORY_PROFILE_TOP", default=10)
+MEMORY_PROFILE_HISTORY = env.int("MEMORY_PROFILE_HISTORY", default=100)
 
 # Swagger / RestX Settings
 SWAGGER_UI_DOC_EXPANSION = "list"
@@ -0,0 +1,164 @@
+"""Admission control for file ingest
+
+Parsing a large file keeps a worker busy for a long time. Without a limit, a
+burst of uploads pushes every worker into `parse_columns` at once and requests
+that only read metadata wait behind them. `IngestGate` caps the number of
+ingests running at the same time:
+
+- per worker process, with a bounded semaphore
+- per host, with a fixed set of lock files that every process sharing the
+  lock folder competes for (`flock`, so a crashed process frees its slot)
+
+Requests that can not start right away wait in a bounded queue. Once the queue
+is full, or a request has waited for `timeout` seconds, it is turned away with
+`IngestBusyException` so the client can retry later.
+"""
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Optional
+
+from flask import current_app
+
+from csv_poc.utils.exc import IngestBusyException
+
+# how often a queued request checks for a free host slot, in seconds
+POLL_INTERVAL = 0.05
+
+
+class IngestGate(object):
+    """Limits the number of ingests running at the same time
+
+    Args:
+        per_worker: Ingests running at once in this process (0: no limit)
+        per_host: Ingests running at once in all processes sharing
+          `lock_folder` (0: no limit)
+        lock_folder: Directory holding the host-wide slot lock files
+        queue_size: Requests that may wait for a slot; further requests are
+          turned away immediately
+        timeout: Seconds a queued request waits before it is turned away
+        retry_after: Seconds clients are told to wait before retrying
+    """
+
+    def __init__(
+        self,
+        per_worker: int,
+        per_host: int,
+        lock_folder: str,
+        queue_size: int,
+        timeout: float,
+        retry_after: int,
+    ):
+        self.per_host = per_host
+        self.lock_folder = lock_folder
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._semaphore = (
+            threading.BoundedSemaphore(per_worker) if per_worker else None
+        )
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests currently queued"""
+        return self._waiting
+
+    def _busy(self, reason: str) -> IngestBusyException:
+        return IngestBusyException(
+            message=f"Too many files are being processed ({reason}), "
+            f"try again in {self.retry_after} seconds",
+            data={"retry_after": self.retry_after},
+        )
+
+    def _try_host_slot(self) -> Optional[IO]:
+        os.makedirs(self.lock_folder, exist_ok=True)
+        for n in range(self.per_host):
+            fh = open(os.path.join(self.lock_folder, f"ingest-{n}.lock"), "a")
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fh
+            except BlockingIOError:
+                fh.close()
+        return None
+
+    def _acquire(self, block: bool):
+        """Takes a worker slot and a host slot
+
+        Returns:
+            A tuple of whether both were acquired and the host slot's file
+        """
+        deadline = time.monotonic() + self.timeout
+        if self._semaphore is not None:
+            acquired = (
+                self._semaphore.acquire(timeout=self.timeout)
+                if block
+                else self._semaphore.acquire(blocking=False)
+            )
+            if not acquired:
+                return False, None
+        if not self.per_host:
+            return True, None
+        while True:
+            host_slot = self._try_host_slot()
+            if host_slot is not None:
+                return True, host_slot
+            if not block or time.monotonic() >= deadline:
+                if self._semaphore is not None:
+                    self._semaphore.release()
+                return False, None
+            time.sleep(POLL_INTERVAL)
+
+    def _release(self, host_slot: Optional[IO]) -> None:
+        if host_slot is not None:
+            fcntl.flock(host_slot, fcntl.LOCK_UN)
+            host_slot.close()
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+    @contextmanager
+    def slot(self):
+        """Holds an ingest slot, waiting in the queue if none is free
+
+        Raises:
+            IngestBusyException: The queue is full or the wait timed out
+        """
+        acquired, host_slot = self._acquire(block=False)
+        if not acquired:
+            with self._lock:
+                if self._waiting >= self.queue_size:
+                    raise self._busy("queue full")
+                self._waiting += 1
+            try:
+                acquired, host_slot = self._acquire(block=True)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise self._busy("timed out waiting")
+        try:
+            yield
+        finally:
+            self._release(host_slot)
+
+
+def ingest_gate() -> IngestGate:
+    """The current app's gate, created from its config on first use"""
+    gate = current_app.extensions.get("ingest_gate")
+    if gate is None:
+        config = current_app.config
+        gate = current_app.extensions.setdefault(
+            "ingest_gate",
+            IngestGate(
+                per_worker=config["INGEST_MAX_CONCURRENT"],
+                per_host=config["INGEST_MAX_CONCURRENT_HOST"],
+                lock_folder=config["INGEST_LOCK_FOLDER"],
+                queue_size=config["INGEST_QUEUE_SIZE"],
+                timeout=config["INGEST_QUEUE_TIMEOUT"],
+                retry_after=config["INGEST_RETRY_AFTER"],
+            ),
+        )
+    return gate
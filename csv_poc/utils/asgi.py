@@ -0,0 +1,250 @@
+"""Asyncio front-end that serves the Flask (WSGI) application over ASGI
+
+Under a plain WSGI server a request occupies a worker for as long as its body
+takes to arrive, so a handful of slow clients uploading large files can starve
+every other request. `AsyncWsgiBridge` moves the slow part onto the event loop:
+
+- request bodies are received asynchronously and spooled to memory (small
+  bodies) or to a temporary file (large ones), with the disk writes handed to
+  an executor so they never block the loop
+- only once the whole body is available is the Flask app invoked, in a thread
+  pool, with the spooled body as `wsgi.input`, so parsing and CSV analysis
+  happen off the loop too
+- because every request runs in that pool, metadata reads keep being served
+  while any number of uploads are still trickling in
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Optional
+
+from flask import Flask
+
+
+class PayloadTooLarge(Exception):
+    """Raised when a request body exceeds `MAX_CONTENT_LENGTH`"""
+
+    pass
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before sending the whole body"""
+
+    pass
+
+
+class AsyncWsgiBridge(object):
+    """ASGI application wrapping a Flask instance
+
+    Args:
+        app: Flask instance to dispatch requests to
+        max_workers: Size of the thread pool that runs the Flask app
+        spool_threshold: Bodies larger than this many bytes are written to a
+          temporary file instead of being kept in memory
+        write_buffer: Number of bytes collected before each disk write
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        max_workers: int = 8,
+        spool_threshold: int = 1024 * 1024,
+        write_buffer: int = 256 * 1024,
+    ):
+        self.app = app
+        self.max_content_length = app.config.get("MAX_CONTENT_LENGTH")
+        self.spool_threshold = spool_threshold
+        self.write_buffer = write_buffer
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="wsgi"
+        )
+        # body writes get their own pool so that uploads keep draining even
+        # when every app thread is busy parsing
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="spool"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:  # pragma: no cover
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                self.io_executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        try:
+            body = await self._spool_body(scope, receive, loop)
+        except PayloadTooLarge:
+            await self._send_simple(send, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+        except ClientDisconnected:
+            return
+
+        try:
+            body_length = body.tell()
+            body.seek(0)
+            environ = self._build_environ(scope, body, body_length)
+            await self._run_wsgi(environ, send, loop)
+        finally:
+            await loop.run_in_executor(self.io_executor, body.close)
+
+    async def _spool_body(self, scope, receive, loop):
+        """Receives the request body without blocking the event loop
+
+        Returns:
+            A file object positioned at the end of the body
+        """
+        declared = self._header(scope, b"content-length")
+        if (
+            declared is not None
+            and self.max_content_length is not None
+            and int(declared) > self.max_content_length
+        ):
+            raise PayloadTooLarge()
+
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+        buffer = bytearray()
+        received = 0
+        more_body = True
+        try:
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise ClientDisconnected()
+                chunk = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                received += len(chunk)
+                if (
+                    self.max_content_length is not None
+                    and received > self.max_content_length
+                ):
+                    raise PayloadTooLarge()
+                buffer += chunk
+                if len(buffer) >= self.write_buffer or not more_body:
+                    data, buffer = bytes(buffer), bytearray()
+                    await loop.run_in_executor(
+                        self.io_executor, body.write, data
+                    )
+        except BaseException:
+            body.close()
+            raise
+        return body
+
+    async def _run_wsgi(self, environ, send, loop):
+        """Calls the WSGI app in the executor and streams its response back"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+            return lambda data: None  # legacy `write()` is not supported
+
+        iterable = await loop.run_in_executor(
+            self.executor, self.app, environ, start_response
+        )
+        iterator = iter(iterable)
+        sentinel = object()
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response["status"],
+                    "headers": response["headers"],
+                }
+            )
+            while True:
+                chunk = await loop.run_in_executor(
+                    self.executor, next, iterator, sentinel
+                )
+                if chunk is sentinel:
+                    break
+                if chunk:
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": True,
+                        }
+                    )
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(iterable, "close"):
+                await loop.run_in_executor(self.executor, iterable.close)
+
+    @staticmethod
+    async def _send_simple(send, status: HTTPStatus):
+        body = status.phrase.encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.value,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _header(scope, name: bytes) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key.lower() == name:
+                return value.decode("latin-1")
+        return None
+
+    @staticmethod
+    def _build_environ(scope, body, body_length: int) -> dict:
+        """Translates an ASGI HTTP scope into a WSGI environ dictionary"""
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+            "PATH_INFO": scope["path"].encode().decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "CONTENT_LENGTH": str(body_length),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif name == "CONTENT_LENGTH":
+                continue
+            else:
+                key = f"HTTP_{name}"
+                if key in environ:
+                    value = f"{environ[key]},{value}"
+                environ[key] = value
+        return environ
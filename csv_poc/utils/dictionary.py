@@ -0,0 +1,250 @@
+"""Dictionary encoding of low-cardinality text columns
+
+Columns such as "Tactic" or "Pay Type" only ever hold a handful of distinct
+values. For those, ingest stores two files next to the CSV file:
+
+  * `<path>.dict`: JSON with the encoded column indexes and, for each of
+    them, the list of distinct values (the position in the list is the code)
+  * `<path>.codes`: one byte per encoded column per row, row-major, so that
+    appending rows only ever appends to the file
+
+Reading a column is then a strided slice of the codes file, which is a lot
+cheaper than parsing every CSV row.
+"""
+import json
+import os
+from collections import Counter
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+DICT_SUFFIX = ".dict"
+CODES_SUFFIX = ".codes"
+# codes are stored as single bytes
+MAX_CODES = 256
+CHUNK_ROWS = 64 * 1024
+
+
+def dictionary_path(file_path: str) -> str:
+    """Location of the value dictionary for a given CSV file"""
+    return f"{file_path}{DICT_SUFFIX}"
+
+
+def codes_path(file_path: str) -> str:
+    """Location of the code array for a given CSV file"""
+    return f"{file_path}{CODES_SUFFIX}"
+
+
+class Dictionary(NamedTuple):
+    """Decoded content of a `.dict` file"""
+
+    columns: List[int]
+    values: List[List[str]]
+
+    @property
+    def width(self) -> int:
+        """Number of bytes per row in the codes file"""
+        return len(self.columns)
+
+    def position(self, col_index: int) -> Optional[int]:
+        """Position of a column within a row of codes, None if not encoded"""
+        try:
+            return self.columns.index(col_index)
+        except ValueError:
+            return None
+
+
+class DictionaryEncoder(object):
+    """Writes dictionary-encoded codes while rows are scanned
+
+    A column stops being encoded as soon as it holds more than `max_values`
+    distinct values. Its byte keeps being written as a placeholder until
+    `close()`, which then rewrites the codes without it; in the common case
+    where nothing overflows the codes file is written exactly once.
+
+    Args:
+        file_path: Path of the CSV file the encoding belongs to
+        indices: Column indexes to encode. Ignored when `append` is set, the
+          columns recorded in the existing dictionary are used instead.
+        max_values: Highest number of distinct values per column
+        append: Extend an existing encoding instead of replacing it
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        indices: Sequence[int] = (),
+        max_values: int = MAX_CODES,
+        append: bool = False,
+    ):
+        self.file_path = file_path
+        self.max_values = min(max_values, MAX_CODES)
+        self._append = append
+        if append:
+            dictionary = load_dictionary(file_path)
+            self.columns = list(dictionary.columns)
+            self.values = [list(values) for values in dictionary.values]
+            self._original_size = os.path.getsize(codes_path(file_path))
+        else:
+            self.columns = list(indices)
+            self.values = [[] for _ in self.columns]
+            self._original_size = 0
+        self._original_values = [len(values) for values in self.values]
+        self._lookup = [
+            {value: code for code, value in enumerate(values)}
+            for values in self.values
+        ]
+        self._dropped = set()
+        self._buffer = bytearray()
+        self._fh = open(codes_path(file_path), "ab" if append else "wb")
+
+    def add(self, row_number: int, row: List[str]) -> None:
+        if not self.columns:
+            return
+        for position, col_index in enumerate(self.columns):
+            code = 0
+            if position not in self._dropped:
+                value = row[col_index]
+                lookup = self._lookup[position]
+                code = lookup.get(value)
+                if code is None:
+                    if len(lookup) >= self.max_values:
+                        self._dropped.add(position)
+                        code = 0
+                    else:
+                        code = lookup[value] = len(lookup)
+                        self.values[position].append(value)
+            self._buffer.append(code)
+        if len(self._buffer) >= CHUNK_ROWS * len(self.columns):
+            self.flush()
+
+    def flush(self) -> None:
+        self._fh.write(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self) -> None:
+        self.flush()
+        self._fh.close()
+        if self._dropped:
+            self._drop_columns()
+        if not self.columns:
+            remove_dictionary(self.file_path)
+            return
+        staging = f"{dictionary_path(self.file_path)}.tmp"
+        with open(staging, "w") as fh:
+            json.dump({"columns": self.columns, "values": self.values}, fh)
+        os.replace(staging, dictionary_path(self.file_path))
+
+    def abort(self) -> None:
+        self._fh.close()
+        if self._append:
+            with open(codes_path(self.file_path), "r+b") as fh:
+                fh.truncate(self._original_size)
+        else:
+            remove_dictionary(self.file_path)
+
+    def _drop_columns(self) -> None:
+        width = len(self.columns)
+        keep = [p for p in range(width) if p not in self._dropped]
+        path = codes_path(self.file_path)
+        staging = f"{path}.tmp"
+        with open(path, "rb") as src, open(staging, "wb") as dst:
+            for chunk in iter(lambda: src.read(CHUNK_ROWS * width), b""):
+                rows = len(chunk) // width
+                out = bytearray(rows * len(keep))
+                for new, old in enumerate(keep):
+                    out[new :: len(keep)] = chunk[old::width]
+                dst.write(out)
+        os.replace(staging, path)
+        self.columns = [self.columns[p] for p in keep]
+        self.values = [self.values[p] for p in keep]
+        self._dropped = set()
+
+
+def remove_dictionary(file_path: str) -> None:
+    """Deletes the encoding of a file, if it has one"""
+    for path in (dictionary_path(file_path), codes_path(file_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def load_dictionary(file_path: str, rows: int = None) -> Optional[Dictionary]:
+    """Reads the value dictionary of a file
+
+    Args:
+        file_path: Path of the stored CSV file
+        rows: Expected number of rows. When given and the codes file does not
+          hold exactly that many rows, the encoding is considered stale.
+
+    Returns:
+        A `Dictionary`, or None when the file has no usable encoding
+    """
+    try:
+        with open(dictionary_path(file_path)) as fh:
+            raw = json.load(fh)
+        size = os.path.getsize(codes_path(file_path))
+    except FileNotFoundError:
+        return None
+    dictionary = Dictionary(columns=raw["columns"], values=raw["values"])
+    if rows is not None and size != rows * dictionary.width:
+        return None
+    return dictionary
+
+
+def _code_chunks(file_path: str, dictionary: Dictionary) -> Iterator[bytes]:
+    size = CHUNK_ROWS * dictionary.width
+    with open(codes_path(file_path), "rb") as fh:
+        yield from iter(lambda: fh.read(size), b"")
+
+
+def decode_rows(
+    file_path: str,
+    dictionary: Dictionary,
+    indices: List[int],
+    where: tuple = None,
+) -> Iterator[tuple]:
+    """Yields the values of encoded columns without reading the CSV file
+
+    Args:
+        file_path: Path of the stored CSV file
+        dictionary: The file's dictionary, from `load_dictionary()`
+        indices: Column indexes to return, all of them must be encoded
+        where: Optional `(col_index, value)` equality filter on an encoded
+          column
+
+    Yields:
+        One tuple of values per (matching) row
+    """
+    width = dictionary.width
+    positions = [dictionary.position(idx) for idx in indices]
+    filter_position = filter_code = None
+    if where is not None:
+        filter_position = dictionary.position(where[0])
+        values = dictionary.values[filter_position]
+        if where[1] not in values:
+            return
+        filter_code = values.index(where[1])
+    for chunk in _code_chunks(file_path, dictionary):
+        columns = [
+            map(dictionary.values[p].__getitem__, chunk[p::width])
+            for p in positions
+        ]
+        rows = zip(*columns)
+        if filter_position is not None:
+            rows = (
+                row
+                for row, code in zip(rows, chunk[filter_position::width])
+                if code == filter_code
+            )
+        yield from rows
+
+
+def count_values(
+    file_path: str, dictionary: Dictionary, col_index: int
+) -> Counter:
+    """Counts the occurrences of every value of an encoded column"""
+    position = dictionary.position(col_index)
+    width = dictionary.width
+    codes = Counter()
+    for chunk in _code_chunks(file_path, dictionary):
+        codes.update(chunk[position::width])
+    values = dictionary.values[position]
+    return Counter({values[code]: count for code, count in codes.items()})
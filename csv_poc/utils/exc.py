@@ -63,3 +63,21 @@ class FilesystemException(CsvPocException):
     """Used when the server is unable to write to a local folder"""
 
     pass
+
+
+class UploadNotFoundException(CsvPocException):
+    """Used when an upload session doesn't exist (any more)"""
+
+    pass
+
+
+class IncompleteUploadException(CsvPocException):
+    """Used when committing an upload session that is still missing parts"""
+
+    pass
+
+
+class IngestBusyException(CsvPocException):
+    """Used when too many files are being ingested to accept another one"""
+
+    pass
@@ -0,0 +1,113 @@
+"""Streaming serializers used to send stored CSV files back to clients
+
+Every function here is a generator that reads the stored file row by row and
+yields encoded chunks, so memory use stays constant no matter how large the
+file is. Chunks are grouped into roughly `CHUNK_SIZE` bytes to keep the number
+of writes to the socket reasonable.
+"""
+import csv
+import io
+import json
+from operator import itemgetter
+from typing import Iterator, List
+
+from csv_poc.utils.file import iter_records
+from csv_poc.utils.values import typed_value
+
+CHUNK_SIZE = 64 * 1024
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def project_rows(
+    file_path: str, indices: List[int], offset: int = None, where: tuple = None
+) -> Iterator[tuple]:
+    """Yields only the requested fields of every data row
+
+    Args:
+        file_path: Path of the stored CSV file
+        indices: Column indexes to keep, in output order
+        offset: Byte offset of the first data row. When omitted the header
+          row is read and skipped.
+        where: Optional `(col_index, value)` equality filter
+    """
+    pick = itemgetter(*indices) if indices else (lambda row: ())
+    single = len(indices) == 1
+    with open(file_path, "rb") as csv_file:
+        records = iter_records(csv_file, offset or 0)
+        if offset is None:
+            next(records, None)
+        for _, row in records:
+            if where is not None and row[where[0]] != where[1]:
+                continue
+            values = pick(row)
+            yield (values,) if single else values
+
+
+def _chunked(pieces: Iterator[str]) -> Iterator[bytes]:
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _csv_pieces(names, rows) -> Iterator[str]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow(row)
+        if out.tell() >= CHUNK_SIZE:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+
+def _json_objects(names, types, rows) -> Iterator[str]:
+    fields = list(zip(names, types))
+    for row in rows:
+        yield json.dumps(
+            {
+                name: typed_value(col_type, value)
+                for (name, col_type), value in zip(fields, row)
+            }
+        )
+
+
+def export_rows(
+    fmt: str, names: List[str], types: List[str], rows: Iterator[tuple]
+) -> Iterator[bytes]:
+    """Serializes projected rows in the requested format
+
+    Args:
+        fmt: One of the keys of `EXPORT_FORMATS`
+        names: Names of the projected columns
+        types: Types of the projected columns
+        rows: Tuples of raw values, e.g. from `project_rows()`
+
+    Yields:
+        UTF-8 encoded chunks of the response body
+    """
+    if fmt == "csv":
+        pieces = _csv_pieces(names, rows)
+    elif fmt == "ndjson":
+        pieces = (obj + "\n" for obj in _json_objects(names, types, rows))
+    else:
+        pieces = _json_array(_json_objects(names, types, rows))
+    return _chunked(pieces)
+
+
+def _json_array(objects: Iterator[str]) -> Iterator[str]:
+    yield "["
+    for idx, obj in enumerate(objects):
+        yield obj if idx == 0 else "," + obj
+    yield "]"
@@ -1,9 +1,73 @@
 """Utilities related to examining and parsing CSV files"""
 from flask import current_app
 import csv
+import fcntl
+import hashlib
+import json
+import math
+import os
 import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import (
+    BinaryIO,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+)
 
-from csv_poc.database.models import Column
+from csv_poc.database.models import Column, File
+from csv_poc.utils.dictionary import (
+    CODES_SUFFIX,
+    DICT_SUFFIX,
+    MAX_CODES,
+    DictionaryEncoder,
+    load_dictionary,
+    remove_dictionary,
+)
+from csv_poc.utils.exc import UnreadableFileException
+from csv_poc.utils.preview import PREVIEW_SUFFIX, PreviewWriter
+from csv_poc.utils.row_index import (
+    INDEX_SUFFIX,
+    RowIndexWriter,
+    indexed_rows,
+    read_offsets,
+    truncate_index,
+)
+from csv_poc.utils.sample import (
+    SAMPLE_SUFFIX,
+    ReservoirSampler,
+    load_sample,
+    remove_sample,
+)
+from csv_poc.utils.search import (
+    SEARCH_SUFFIX,
+    SearchIndexWriter,
+    search_index_path,
+)
+from csv_poc.utils.sql_table import (
+    TABLE_SUFFIX,
+    SqlTableWriter,
+    remove_table,
+    table_path,
+)
+
+# derived files stored next to every uploaded CSV file
+SIDECAR_SUFFIXES = (
+    INDEX_SUFFIX,
+    SEARCH_SUFFIX,
+    DICT_SUFFIX,
+    CODES_SUFFIX,
+    SAMPLE_SUFFIX,
+    PREVIEW_SUFFIX,
+    TABLE_SUFFIX,
+)
+
+DATE_PATTERN = re.compile(r"(\d+)/(\d+)/(\d+)")
 
 
 def guess_column_type(content) -> str:
@@ -38,6 +102,12 @@ def guess_column_type(content) -> str:
         )
         return "datetime"
 
+    # "nan" and "inf" parse as floats too, but are much more likely words
+    number = value_key("number", content)
+    if number is not None and math.isfinite(number):
+        current_app.logger.debug(f"Input appears to be a number")
+        return "number"
+
     current_app.logger.debug(
         "Checks for datetime and number failed, assuming plain text"
     )
@@ -46,43 +116,620 @@ def guess_column_type(content) -> str:
     return "text"
 
 
-def parse_columns(file_path: str, file_id: int):
+def iter_records(
+    csv_file: BinaryIO, offset: int = 0
+) -> Iterator[Tuple[int, List[str]]]:
+    """Yields every record of a CSV file along with its byte offset
+
+    The file is read line by line in binary mode so that exact byte offsets
+    are known. A line that leaves a quoted field open (odd number of quote
+    characters) is joined with the following line(s) before parsing, so
+    quoted newlines are handled the same way `csv.reader` handles them.
+    Blank lines are skipped.
+
+    Args:
+        csv_file: File object opened in binary mode
+        offset: Byte offset to start reading at
+
+    Yields:
+        Tuples of `(offset, fields)`
+    """
+    csv_file.seek(offset)
+    pending = []
+    quotes = 0
+    start = position = offset
+    for line in csv_file:
+        if not pending:
+            start = position
+        position += len(line)
+        pending.append(line)
+        quotes += line.count(b'"')
+        if quotes % 2:
+            continue
+
+        raw = b"".join(pending) if len(pending) > 1 else line
+        pending, quotes = [], 0
+        text = raw.decode("utf-8")
+        if start == 0 and text.startswith("\ufeff"):
+            text = text[1:]
+        if not text.strip():
+            continue
+        if '"' in text:
+            yield start, next(csv.reader([text]))
+        else:
+            yield start, text.rstrip("\r\n").split(",")
+
+    if pending:
+        # unterminated quoted field at the end of the file
+        yield start, next(csv.reader([b"".join(pending).decode("utf-8")]))
+
+
+def value_key(col_type: str, value: str):
+    """Converts a raw CSV value into something that orders like its type
+
+    Returns:
+        A float for numbers, a `(year, month, day)` tuple for dates and the
+        string itself for text. `None` is returned for empty values and for
+        values that do not fit the type.
+    """
+    if value == "":
+        return None
+    if col_type == "number":
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    if col_type == "datetime":
+        match = DATE_PATTERN.search(value)
+        if match is None:
+            return None
+        month, day, year = (int(part) for part in match.groups())
+        return year, month, day
+    return value
+
+
+class ColumnStats(object):
+    """Running statistics for a single column
+
+    Statistics can be seeded from the values stored on a `Column` so that an
+    append only has to look at the new rows.
+
+    Args:
+        col_type: One of "text", "number" or "datetime"
+        null_count: Number of empty values seen so far
+        min_value: Smallest value seen so far (raw string)
+        max_value: Largest value seen so far (raw string)
+    """
+
+    __slots__ = (
+        "col_type",
+        "null_count",
+        "min_value",
+        "max_value",
+        "widened",
+        "_min_key",
+        "_max_key",
+    )
+
+    def __init__(self, col_type, null_count=0, min_value=None, max_value=None):
+        self.col_type = col_type
+        self.null_count = null_count or 0
+        self.min_value = min_value
+        self.max_value = max_value
+        self.widened = False
+        self._min_key = (
+            None if min_value is None else value_key(col_type, min_value)
+        )
+        self._max_key = (
+            None if max_value is None else value_key(col_type, max_value)
+        )
+
+    @classmethod
+    def from_column(cls, column: Column) -> "ColumnStats":
+        return cls(
+            column.col_type,
+            column.null_count,
+            column.min_value,
+            column.max_value,
+        )
+
+    def add(self, value: str, check_type: bool = False) -> None:
+        """Folds one value into the statistics
+
+        Args:
+            value: Raw CSV value
+            check_type: When set, a value that contradicts the column type
+              widens the column to "text". Min/max can not be recomputed for
+              the rows that were already stored, so they are reset in that
+              case and only track the values seen afterwards.
+        """
+        if value == "":
+            self.null_count += 1
+            return
+
+        key = value_key(self.col_type, value)
+        if key is None:
+            if not check_type:
+                return
+            self.col_type = "text"
+            self.widened = True
+            self.min_value = self.max_value = None
+            self._min_key = self._max_key = None
+            key = value
+
+        if self._min_key is None or key < self._min_key:
+            self._min_key, self.min_value = key, value
+        if self._max_key is None or key > self._max_key:
+            self._max_key, self.max_value = key, value
+
+    def as_dict(self) -> dict:
+        return {
+            "col_type": self.col_type,
+            "null_count": self.null_count,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+        }
+
+
+def scan_rows(
+    csv_file: BinaryIO,
+    stats: List[ColumnStats],
+    index: RowIndexWriter,
+    offset: int = 0,
+    base_offset: int = 0,
+    check_types: bool = False,
+    consumers: Sequence = (),
+    first_row: int = 0,
+) -> int:
+    """Reads data rows, updating column statistics and the row index
+
+    Args:
+        csv_file: File object opened in binary mode
+        stats: One `ColumnStats` per column, updated in place
+        index: Writer receiving the offset of every row
+        offset: Byte offset of the first data row in `csv_file`
+        base_offset: Added to every offset written to the index, used when
+          `csv_file` holds data that will end up at the end of another file
+        check_types: Widen column types on contradicting values
+        consumers: Additional writers (e.g. `SearchIndexWriter`) whose
+          `add(row_number, row)` method is called for every row
+        first_row: Row number of the first row read
+
+    Returns:
+        Number of rows read
+
+    Raises:
+        UnreadableFileException: A row does not have the same number of
+          fields as the header
+    """
+    rows = 0
+    width = len(stats)
+    for row_offset, row in iter_records(csv_file, offset):
+        if len(row) != width:
+            raise UnreadableFileException(
+                message=f"Row {rows + 1} has {len(row)} fields, "
+                f"expected {width}",
+                data={"offset": row_offset},
+            )
+        index.append(base_offset + row_offset)
+        for column_stats, value in zip(stats, row):
+            column_stats.add(value, check_type=check_types)
+        for consumer in consumers:
+            consumer.add(first_row + rows, row)
+        rows += 1
+    return rows
+
+
+class ScannedFile(NamedTuple):
+    """Result of `scan_file()`"""
+
+    header: List[str]
+    stats: List[ColumnStats]
+    row_count: int
+
+
+def scan_file(file_path: str) -> ScannedFile:
+    """Reads a whole CSV file once, without holding it in memory
+
+    Column types are guessed from the first data row. Every row is then
+    streamed to build the row offset index, the full-text index over the
+    text columns, the dictionary encoding of low-cardinality text columns, a
+    uniform sample of the rows, a preview of the first rows and, with
+    `SQL_TABLES`, an SQL table of the rows (all written next to the file) as
+    well as the per-column statistics. This does not
+    touch the database, so it can run in worker processes.
+
+    Args:
+        file_path: String with path to CSV file to open
+
+    Returns:
+        A `ScannedFile`
+
+    Raises:
+        StopIteration: The file is empty
+        UnreadableFileException: A row does not match the header's width
+    """
+    with open(file_path, mode="rb") as csv_file, RowIndexWriter(
+        file_path
+    ) as index:
+        records = iter_records(csv_file)
+
+        # extract header row and the first data row
+        _, header_row = next(records)
+        first = next(records, None)
+        content_row = first[1] if first else None
+
+        col_types = [
+            guess_column_type(content=content_row[idx])
+            if content_row and idx < len(content_row)
+            else "text"
+            for idx in range(len(header_row))
+        ]
+        stats = [ColumnStats(col_type) for col_type in col_types]
+        text_columns = [
+            idx for idx, col_type in enumerate(col_types) if col_type == "text"
+        ]
+        consumers = []
+        if current_app.config.get("FULL_TEXT_SEARCH", True):
+            consumers.append(SearchIndexWriter(file_path, text_columns))
+        max_values = current_app.config.get("DICTIONARY_MAX_VALUES", MAX_CODES)
+        if max_values:
+            consumers.append(
+                DictionaryEncoder(file_path, text_columns, max_values)
+            )
+        else:
+            remove_dictionary(file_path)
+        sample_size = current_app.config.get("SAMPLE_SIZE", 1000)
+        if sample_size:
+            consumers.append(ReservoirSampler(file_path, sample_size))
+        else:
+            remove_sample(file_path)
+        if current_app.config.get("SQL_TABLES", False):
+            consumers.append(
+                SqlTableWriter(
+                    file_path,
+                    header_row,
+                    col_types,
+                    max_indexes=current_app.config.get(
+                        "SQL_TABLE_MAX_INDEXES", 32
+                    ),
+                )
+            )
+        else:
+            remove_table(file_path)
+        consumers.append(
+            PreviewWriter(
+                file_path,
+                header_row,
+                stats,
+                limit=current_app.config.get("PREVIEW_ROWS", 50),
+            )
+        )
+
+        row_count = 0
+        try:
+            if first:
+                row_count = scan_rows(
+                    csv_file, stats, index, offset=first[0], consumers=consumers
+                )
+        except Exception:
+            for consumer in consumers:
+                consumer.abort()
+            raise
+        for consumer in consumers:
+            consumer.close()
+
+    return ScannedFile(header=header_row, stats=stats, row_count=row_count)
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def schema_fingerprint(columns: Iterable[Tuple[str, str]]) -> str:
+    """Canonical fingerprint of a file's layout
+
+    Files with the same column names and types, in the same order, share a
+    fingerprint, whatever their content.
+
+    Args:
+        columns: `(col_name, col_type)` pairs in column order
+    """
+    canonical = json.dumps(
+        [[name, col_type] for name, col_type in columns],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def chain_hash(content_hash: str, appended_digest: bytes) -> str:
+    """Content hash of a file after more bytes have been appended to it
+
+    Appends never re-read the stored bytes, so instead of a plain digest of
+    the whole file the new hash chains the previous one with the SHA-256
+    digest of the appended bytes. It still changes whenever the content does.
+    """
+    digest = hashlib.sha256((content_hash or "").encode())
+    digest.update(appended_digest)
+    return digest.hexdigest()
+
+
+class ParsedFile(NamedTuple):
+    """Result of `parse_columns()`"""
+
+    columns: List[Column]
+    row_count: int
+
+
+def parse_columns(file_path: str, file_id: int) -> ParsedFile:
     """Examine columns in a CSV file and create Column objects
 
+    See `scan_file()` for how the file is read.
+
     Args:
         file_path: String with path to CSV file to open
         file_id: Primary key for the File instance to associate the column with
 
     Returns:
-        A list of Column instances that have been created and added to the
-        database session but HAVE NOT been committed yet.
+        A `ParsedFile` with the Column instances that have been created and
+        added to the database session but HAVE NOT been committed yet, and
+        the number of data rows in the file.
+
+    Raises:
+        UnreadableFileException: A row does not match the header's width
     """
     try:
-        with open(file_path, mode="r") as csv_file:
-            csv_reader = csv.reader(csv_file)
-            rows = list(csv_reader)
-
-            # extract header row and the first data row
-            header_row: str = rows[0]
-            content_row: str = rows[1] if len(rows) > 1 else None
-
-            # use `enumerate` here to access the index
-            for idx, name in enumerate(header_row):
-                if content_row:
-                    column_content = content_row[idx]
-                    col_type = guess_column_type(content=column_content)
-
-                # finally, create a new Column instance but do not save at this
-                # time
-                Column.create(
-                    save=False,
-                    col_index=idx,
-                    col_name=name,
-                    col_type=col_type,
-                    file_id=file_id,
-                )
+        scanned = scan_file(file_path)
+
+        # finally, create new Column instances but do not save at this time
+        columns = [
+            Column.create(
+                save=False,
+                col_index=idx,
+                col_name=name,
+                file_id=file_id,
+                **scanned.stats[idx].as_dict(),
+            )
+            for idx, name in enumerate(scanned.header)
+        ]
+        return ParsedFile(columns=columns, row_count=scanned.row_count)
+
+    except UnreadableFileException:
+        raise
 
     except Exception as e:
         current_app.logger.error(
             f"Unknown error occurred while parsing columns:\n{str(e)}"
         )
+        return ParsedFile(columns=[], row_count=0)
+
+
+@contextmanager
+def locked_file(file_path: str):
+    """Holds an exclusive (advisory) lock on a stored file
+
+    Used to serialize appends so that concurrent requests can not interleave
+    their rows or index entries.
+    """
+    with open(file_path, "rb") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+class AppendResult(NamedTuple):
+    """Result of `append_rows()`"""
+
+    rows: int
+    original_size: int
+    original_rows: int
+    # derived-data writers that still have to be committed or aborted
+    consumers: tuple = ()
+
+
+def append_rows(file: File, data: BinaryIO) -> AppendResult:
+    """Appends CSV rows to a stored file and updates its metadata in place
+
+    The new data is spooled to a temporary file and scanned there first, so
+    nothing touches the stored file unless every row is valid. Only the new
+    bytes are read: the row count, offset index and column statistics are
+    carried forward from what was stored at ingest. If the first record of
+    `data` repeats the file's header it is skipped.
+
+    The `File`/`Column` instances are modified but NOT committed. Callers
+    should hold `locked_file()` and call `finish_append()` once the commit
+    succeeded, or `rollback_append()` if it failed.
+
+    Args:
+        file: File instance to append to
+        data: Binary stream of CSV data
+
+    Returns:
+        An `AppendResult`
+
+    Raises:
+        UnreadableFileException: The data is not valid CSV for this file
+    """
+    columns = sorted(file.columns, key=lambda c: c.col_index)
+    stats = [ColumnStats.from_column(column) for column in columns]
+    original_size = os.path.getsize(file.path)
+    original_rows = file.row_count or 0
+    result = AppendResult(
+        rows=0, original_size=original_size, original_rows=original_rows
+    )
+    if indexed_rows(file.path) != original_rows:
+        raise UnreadableFileException(
+            message=f"File with ID {file.id} has no usable row index, upload "
+            "it again before appending to it",
+            data=None,
+        )
+
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(file.path), suffix=".append"
+    ) as spool:
+        shutil.copyfileobj(data, spool)
+        spool.flush()
+
+        with open(file.path, "rb") as stored:
+            stored.seek(max(original_size - 1, 0))
+            needs_newline = original_size > 0 and stored.read(1) != b"\n"
+        # byte offset in the stored file where the first new row will land
+        data_offset = original_size + (1 if needs_newline else 0)
+        consumers = []
+
+        try:
+            first = next(iter_records(spool), None)
+            if first is None:
+                return result
+            offset = first[0]
+            if first[1] == [column.col_name for column in columns]:
+                offset = _next_record_offset(spool, offset)
+
+            if os.path.exists(search_index_path(file.path)):
+                consumers.append(SearchIndexWriter(file.path, append=True))
+            if os.path.exists(table_path(file.path)):
+                consumers.append(SqlTableWriter(file.path, append=True))
+            if load_dictionary(file.path, original_rows) is not None:
+                consumers.append(
+                    DictionaryEncoder(
+                        file.path,
+                        max_values=current_app.config.get(
+                            "DICTIONARY_MAX_VALUES", MAX_CODES
+                        ),
+                        append=True,
+                    )
+                )
+            else:
+                remove_dictionary(file.path)
+            if load_sample(file.path, original_rows) is not None:
+                consumers.append(ReservoirSampler(file.path, append=True))
+            else:
+                remove_sample(file.path)
+            limit = current_app.config.get("PREVIEW_ROWS", 50)
+            if original_rows < limit:
+                consumers.append(
+                    PreviewWriter(
+                        file.path,
+                        [column.col_name for column in columns],
+                        stats,
+                        limit=limit,
+                        rows=read_rows(
+                            file.path, read_offsets(file.path, 0, original_rows)
+                        ),
+                    )
+                )
+
+            with RowIndexWriter(file.path, append=True) as index:
+                rows = scan_rows(
+                    spool,
+                    stats,
+                    index,
+                    offset=offset,
+                    base_offset=data_offset - offset,
+                    check_types=True,
+                    consumers=consumers,
+                    first_row=original_rows,
+                )
+        except (UnreadableFileException, UnicodeDecodeError) as e:
+            truncate_index(file.path, original_rows)
+            for consumer in consumers:
+                consumer.abort()
+            if isinstance(e, UnreadableFileException):
+                raise
+            raise UnreadableFileException(
+                message="Appended data is not valid UTF-8", data=str(e)
+            )
+        if rows == 0:
+            for consumer in consumers:
+                consumer.abort()
+            return result
+
+        appended = hashlib.sha256()
+        with open(file.path, "ab") as stored:
+            if needs_newline:
+                stored.write(b"\n")
+                appended.update(b"\n")
+            spool.seek(offset)
+            for chunk in iter(lambda: spool.read(1024 * 1024), b""):
+                stored.write(chunk)
+                appended.update(chunk)
+
+    for column, column_stats in zip(columns, stats):
+        if column_stats.widened:
+            current_app.logger.info(
+                f"Column '{column.col_name}' of file {file.id} widened to text"
+            )
+        column.update(commit=False, **column_stats.as_dict())
+    file.update(
+        commit=False,
+        row_count=original_rows + rows,
+        byte_size=os.path.getsize(file.path),
+        content_hash=chain_hash(file.content_hash, appended.digest()),
+        # widened column types change the layout
+        schema_fingerprint=schema_fingerprint(
+            (column.col_name, column.col_type) for column in columns
+        ),
+    )
+    return result._replace(rows=rows, consumers=tuple(consumers))
+
+
+def _next_record_offset(csv_file: BinaryIO, offset: int) -> int:
+    """Byte offset of the record following the one starting at `offset`"""
+    records = iter_records(csv_file, offset)
+    next(records)
+    following = next(records, None)
+    return following[0] if following else os.fstat(csv_file.fileno()).st_size
+
+
+def finish_append(result: AppendResult) -> None:
+    """Commits the derived data written by `append_rows()`"""
+    for consumer in result.consumers:
+        consumer.close()
+
+
+def rollback_append(file_path: str, result: AppendResult) -> None:
+    """Undoes the on-disk part of `append_rows()`"""
+    for consumer in result.consumers:
+        consumer.abort()
+    with open(file_path, "r+b") as fh:
+        fh.truncate(result.original_size)
+    truncate_index(file_path, result.original_rows)
+
+
+def move_sidecars(source_path: str, destination_path: str) -> None:
+    """Moves the derived files of `source_path` over those of another file
+
+    Derived files that exist for the destination but were not produced for
+    the source are removed, so nothing stale is left behind.
+    """
+    for suffix in SIDECAR_SUFFIXES:
+        source, destination = source_path + suffix, destination_path + suffix
+        if os.path.exists(source):
+            os.replace(source, destination)
+        elif os.path.exists(destination):
+            os.remove(destination)
+
+
+def remove_stored(file_path: str) -> None:
+    """Deletes a file along with the derived files kept next to it"""
+    for path in [file_path] + [file_path + s for s in SIDECAR_SUFFIXES]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_rows(file_path: str, offsets: Sequence[int]) -> List[List[str]]:
+    """Reads the records starting at each of the given byte offsets"""
+    rows = []
+    with open(file_path, "rb") as csv_file:
+        for offset in offsets:
+            record = next(iter_records(csv_file, offset), None)
+            rows.append(record[1] if record else [])
+    return rows
@@ -0,0 +1,128 @@
+"""Histograms of `number` and `datetime` columns
+
+A column is first read into a typed `array` of floats (dates become day
+ordinals), after which binning is done in bulk: equal-width bins map every
+value to its bin index with a single pass of arithmetic, quantile bins sort
+the array once and find each edge with a binary search.
+"""
+import math
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+
+from csv_poc.utils.export import project_rows
+from csv_poc.utils.file import value_key
+
+HISTOGRAM_METHODS = ("equal", "quantile")
+HISTOGRAM_TYPES = ("number", "datetime")
+MAX_BINS = 1000
+
+
+def typed_column(file_path: str, col_index: int, col_type: str) -> Tuple:
+    """Reads one column as floats
+
+    Returns:
+        A tuple of an `array("d")` holding the values that fit the column's
+        type and the number of values that were empty or did not fit
+    """
+    values, missing = array("d"), 0
+    for (raw,) in project_rows(file_path, [col_index]):
+        key = value_key(col_type, raw)
+        if key is not None and col_type == "datetime":
+            try:
+                key = date(*key).toordinal()
+            except ValueError:
+                key = None
+        if key is None or (col_type == "number" and not math.isfinite(key)):
+            missing += 1
+        else:
+            values.append(key)
+    return values, missing
+
+
+def equal_width_bins(values: array, bins: int) -> Tuple[List[float], List]:
+    """Splits the range of `values` into `bins` bins of the same width"""
+    low, high = min(values), max(values)
+    if low == high:
+        return [low, high], [len(values)]
+    scale = bins / (high - low)
+    counts = Counter(map(int, ((value - low) * scale for value in values)))
+    # the maximum lands exactly on the upper edge, keep it in the last bin
+    counts[bins - 1] += counts.pop(bins, 0)
+    edges = [low + (high - low) * n / bins for n in range(bins)] + [high]
+    return edges, [counts.get(n, 0) for n in range(bins)]
+
+
+def quantile_bins(values: array, bins: int) -> Tuple[List[float], List]:
+    """Splits `values` into `bins` bins holding about as many values each
+
+    Edges that coincide (many identical values) are merged, so fewer bins
+    than requested may be returned.
+    """
+    ordered = sorted(values)
+    edges = []
+    for n in range(bins):
+        edge = ordered[len(ordered) * n // bins]
+        if not edges or edge > edges[-1]:
+            edges.append(edge)
+    counts = [
+        bisect_left(ordered, edges[n + 1]) - bisect_left(ordered, edges[n])
+        for n in range(len(edges) - 1)
+    ]
+    counts.append(len(ordered) - bisect_left(ordered, edges[-1]))
+    return edges + [ordered[-1]], counts
+
+
+def _format_edge(col_type: str, edge: float):
+    if col_type != "datetime":
+        return edge
+    whole = int(edge)
+    moment = datetime.fromordinal(whole) + timedelta(days=edge - whole)
+    if moment.time() == datetime.min.time():
+        return moment.date().isoformat()
+    return moment.isoformat(timespec="seconds")
+
+
+def histogram(
+    file_path: str,
+    col_index: int,
+    col_type: str,
+    bins: int = 10,
+    method: str = "equal",
+) -> dict:
+    """Builds the histogram of one column
+
+    Args:
+        file_path: Path of the stored CSV file
+        col_index: Index of the column
+        col_type: "number" or "datetime"
+        bins: Number of bins
+        method: "equal" (equal-width) or "quantile" bins
+
+    Returns:
+        A dictionary with the bins (`start`, `end`, `count`) and the number
+        of values that were empty or did not match the column's type.
+        Datetime edges are ISO 8601 strings.
+    """
+    values, missing = typed_column(file_path, col_index, col_type)
+    edges, counts = [], []
+    if values:
+        if method == "quantile":
+            edges, counts = quantile_bins(values, bins)
+        else:
+            edges, counts = equal_width_bins(values, bins)
+    return {
+        "method": method,
+        "count": len(values),
+        "missing": missing,
+        "bins": [
+            {
+                "start": _format_edge(col_type, edges[n]),
+                "end": _format_edge(col_type, edges[n + 1]),
+                "count": count,
+            }
+            for n, count in enumerate(counts)
+        ],
+    }
@@ -0,0 +1,170 @@
+"""Helpers for bulk-importing directories of CSV files
+
+The expensive part of an import (copying the file into the upload folder,
+hashing it and scanning every row) happens in worker processes through
+`run_import_task()`. Workers never touch the database; they hand back plain
+`ImportResult` tuples which the parent process saves in large batches (see
+`FileDAO.save_imports`).
+
+New content is left under a staging name next to the stored file, and the
+parent only moves it into place with `install_staged()` once the batch is
+committed. A batch that fails to save is thrown away with `discard_staged()`,
+so the files on disk always match what the database describes.
+"""
+import hashlib
+import os
+from typing import Iterator, List, NamedTuple, Optional
+
+from flask import Flask
+from werkzeug.utils import secure_filename
+
+from csv_poc.utils.file import (
+    hash_file,
+    move_sidecars,
+    remove_stored,
+    scan_file,
+)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ImportTask(NamedTuple):
+    """A single file to import"""
+
+    source: str
+    name: str
+    destination: str
+    # content hash currently stored for `name`, if any
+    known_hash: Optional[str] = None
+
+
+class ImportResult(NamedTuple):
+    """Outcome of `run_import_task()`
+
+    `status` is one of "scanned" (new or changed content, ready to save),
+    "unchanged" (same hash as what is stored) or "failed".
+    """
+
+    task: ImportTask
+    status: str
+    byte_size: int = 0
+    mtime: float = 0.0
+    content_hash: Optional[str] = None
+    header: List[str] = []
+    stats: List[dict] = []
+    row_count: int = 0
+    error: Optional[str] = None
+    # scanned copy of the source, waiting for `install_staged()`
+    staging: Optional[str] = None
+
+
+def find_csv_files(root: str, extensions) -> Iterator[str]:
+    """Walks `root` and yields every file with an allowed extension"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if (
+                "." in filename
+                and filename.rsplit(".", 1)[1].lower() in extensions
+            ):
+                yield os.path.join(dirpath, filename)
+
+
+def import_name(root: str, path: str) -> str:
+    """Stored name for an imported file
+
+    Sub-directories become part of the name so that files with the same name
+    in different folders (e.g. `2021/jan/data.csv` and `2021/feb/data.csv`)
+    do not collide.
+    """
+    relative = os.path.relpath(path, root)
+    return secure_filename(relative.replace(os.sep, "_"))
+
+
+def init_worker(config: dict) -> None:
+    """Process pool initializer
+
+    The scanning code logs through `current_app`, so each worker gets a bare
+    Flask instance (no extensions, no database) with the relevant config.
+    """
+    app = Flask("csv_poc")
+    app.config.update(config)
+    app.app_context().push()
+
+
+def run_import_task(task: ImportTask) -> ImportResult:
+    """Copies, hashes and scans one file (runs in a worker process)
+
+    When the file is already known the source is hashed first, and nothing
+    is copied if the hash matches. New content is copied to a staging name
+    and scanned there; the stored file is left alone until the parent has
+    saved the result.
+    """
+    staging = f"{task.destination}.{os.getpid()}.importing"
+    try:
+        stat = os.stat(task.source)
+        if task.known_hash is not None:
+            content_hash = hash_file(task.source)
+            if content_hash == task.known_hash:
+                return ImportResult(
+                    task=task,
+                    status="unchanged",
+                    byte_size=stat.st_size,
+                    mtime=stat.st_mtime,
+                    content_hash=content_hash,
+                )
+
+        digest = hashlib.sha256()
+        with open(task.source, "rb") as src, open(staging, "wb") as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+
+        scanned = scan_file(staging)
+        return ImportResult(
+            task=task,
+            status="scanned",
+            byte_size=stat.st_size,
+            mtime=stat.st_mtime,
+            content_hash=digest.hexdigest(),
+            header=scanned.header,
+            stats=[column.as_dict() for column in scanned.stats],
+            row_count=scanned.row_count,
+            staging=staging,
+        )
+
+    except Exception as e:
+        remove_stored(staging)
+        return ImportResult(task=task, status="failed", error=repr(e))
+
+
+def install_staged(result: ImportResult) -> None:
+    """Moves a scanned file and its derived files over the stored file"""
+    if result.staging is not None:
+        os.replace(result.staging, result.task.destination)
+        move_sidecars(result.staging, result.task.destination)
+
+
+def discard_staged(result: ImportResult) -> None:
+    """Removes a scanned file that is not going to be stored"""
+    if result.staging is not None:
+        remove_stored(result.staging)
+
+
+def copy_config(config) -> dict:
+    """Subset of the Flask config handed to worker processes"""
+    return {
+        key: config[key]
+        for key in (
+            "UPLOAD_FOLDER",
+            "ALLOWED_EXTENSIONS",
+            "DEBUG",
+            "FULL_TEXT_SEARCH",
+            "DICTIONARY_MAX_VALUES",
+            "SAMPLE_SIZE",
+            "PREVIEW_ROWS",
+            "SQL_TABLES",
+            "SQL_TABLE_MAX_INDEXES",
+        )
+        if key in config
+    }
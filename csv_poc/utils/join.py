@@ -0,0 +1,202 @@
+"""Hash join of two stored CSV files
+
+The smaller file (by size on disk) is loaded into a hash table keyed by the
+join columns and the larger one is streamed past it, so only one side ever
+has to fit in memory. When the build side turns out to be larger than the
+memory budget, both sides are hash-partitioned into temporary files and the
+partitions are joined one pair at a time (a "grace" hash join).
+
+Empty key values never match anything, like NULL in SQL.
+"""
+import csv
+import math
+import os
+import tempfile
+from collections import defaultdict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from csv_poc.utils.file import iter_records
+
+JOIN_TYPES = ("inner", "left")
+# rough per-value overhead of a str in the hash table, in bytes
+VALUE_OVERHEAD = 56
+
+
+class JoinSide(NamedTuple):
+    """One of the two files being joined"""
+
+    path: str
+    key_indices: List[int]
+    width: int
+    byte_size: int
+
+
+def _file_rows(path: str) -> Iterator[List[str]]:
+    with open(path, "rb") as csv_file:
+        records = iter_records(csv_file)
+        next(records, None)
+        for _, row in records:
+            yield row
+
+
+def _spilled_rows(path: str) -> Iterator[List[str]]:
+    with open(path, newline="", encoding="utf-8") as fh:
+        yield from csv.reader(fh)
+
+
+def _key(row: List[str], indices: List[int]) -> Optional[tuple]:
+    key = tuple(row[idx] for idx in indices)
+    return None if "" in key else key
+
+
+def _row_size(row: List[str]) -> int:
+    return sum(len(value) for value in row) + VALUE_OVERHEAD * (len(row) + 1)
+
+
+class _Partitions(object):
+    """Temporary CSV files holding the rows of one side, split by key hash"""
+
+    def __init__(self, directory: str, name: str, count: int):
+        self.paths = [
+            os.path.join(directory, f"{name}_{n}.csv") for n in range(count)
+        ]
+        self._files = [
+            open(path, "w", newline="", encoding="utf-8") for path in self.paths
+        ]
+        self._writers = [csv.writer(fh) for fh in self._files]
+
+    def write(self, key: Optional[tuple], row: List[str]) -> None:
+        # rows without a key can go anywhere, they never match
+        partition = hash(key) % len(self._writers) if key else 0
+        self._writers[partition].writerow(row)
+
+    def close(self) -> None:
+        for fh in self._files:
+            fh.close()
+
+
+def _join_in_memory(
+    table: Dict[tuple, List[List[str]]],
+    unkeyed: List[List[str]],
+    build: JoinSide,
+    probe: JoinSide,
+    probe_rows: Iterator[List[str]],
+    outer_build: bool,
+    outer_probe: bool,
+    build_is_left: bool,
+) -> Iterator[Tuple[list, list]]:
+    matched = set()
+    empty_build = [""] * build.width
+    for row in probe_rows:
+        key = _key(row, probe.key_indices)
+        matches = table.get(key) if key else None
+        if matches:
+            if outer_build:
+                matched.add(key)
+            for build_row in matches:
+                yield (build_row, row) if build_is_left else (row, build_row)
+        elif outer_probe:
+            yield row, empty_build
+    if outer_build:
+        empty_probe = [""] * probe.width
+        for key, rows in table.items():
+            if key not in matched:
+                for build_row in rows:
+                    yield build_row, empty_probe
+        for build_row in unkeyed:
+            yield build_row, empty_probe
+
+
+def hash_join(
+    left: JoinSide,
+    right: JoinSide,
+    how: str = "inner",
+    memory_budget: int = 64 * 1024 * 1024,
+) -> Iterator[Tuple[list, list]]:
+    """Joins two files on equal key values
+
+    Args:
+        left: Left side of the join
+        right: Right side of the join
+        how: "inner" or "left"
+        memory_budget: Approximate number of bytes the build side's hash
+          table may use before both sides are partitioned on disk
+
+    Yields:
+        `(left row, right row)` pairs. For a left join, left rows without a
+        match are paired with a row of empty strings.
+    """
+    build_is_left = left.byte_size <= right.byte_size
+    build, probe = (left, right) if build_is_left else (right, left)
+    # with a left join, whichever side is the left one must keep its rows
+    outer_build = how == "left" and build_is_left
+    outer_probe = how == "left" and not build_is_left
+
+    table, unkeyed, used, raw = defaultdict(list), [], 0, 1
+    build_rows = _file_rows(build.path)
+    for row in build_rows:
+        key = _key(row, build.key_indices)
+        if key is None:
+            if outer_build:
+                unkeyed.append(row)
+            continue
+        table[key].append(row)
+        used += _row_size(row)
+        raw += sum(len(value) + 1 for value in row)
+        if used > memory_budget:
+            break
+    else:
+        yield from _join_in_memory(
+            table,
+            unkeyed,
+            build,
+            probe,
+            _file_rows(probe.path),
+            outer_build,
+            outer_probe,
+            build_is_left,
+        )
+        return
+
+    # the build side does not fit: partition both sides so that every
+    # partition of the build side should fit in the budget on its own
+    estimate = build.byte_size * used / raw
+    count = min(max(2, math.ceil(2 * estimate / memory_budget)), 256)
+    with tempfile.TemporaryDirectory(prefix="join_") as directory:
+        build_parts = _Partitions(directory, "build", count)
+        for row in unkeyed:
+            build_parts.write(None, row)
+        for key, rows in table.items():
+            for row in rows:
+                build_parts.write(key, row)
+        table.clear()
+        for row in build_rows:
+            build_parts.write(_key(row, build.key_indices), row)
+        build_parts.close()
+
+        probe_parts = _Partitions(directory, "probe", count)
+        for row in _file_rows(probe.path):
+            probe_parts.write(_key(row, probe.key_indices), row)
+        probe_parts.close()
+
+        for build_path, probe_path in zip(build_parts.paths, probe_parts.paths):
+            table, unkeyed = defaultdict(list), []
+            for row in _spilled_rows(build_path):
+                key = _key(row, build.key_indices)
+                if key is None:
+                    if outer_build:
+                        unkeyed.append(row)
+                    continue
+                table[key].append(row)
+            os.remove(build_path)
+            yield from _join_in_memory(
+                table,
+                unkeyed,
+                build,
+                probe,
+                _spilled_rows(probe_path),
+                outer_build,
+                outer_probe,
+                build_is_left,
+            )
+            os.remove(probe_path)
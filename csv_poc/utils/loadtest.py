@@ -0,0 +1,280 @@
+"""Concurrent HTTP load generation against the files API
+
+Used by the `flask loadtest` command. A pool of client threads, each with its
+own keep-alive connection, picks operations from a weighted mix (uploads,
+list calls, detail calls) until the time is up. Every request is timed and
+the results are summarized per operation with throughput and latency
+percentiles.
+"""
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple
+from urllib.parse import urlsplit
+
+OPERATIONS = ("upload", "list", "detail")
+DEFAULT_MIX = "upload=1,list=10,detail=5"
+BOUNDARY = "loadtestboundary"
+
+
+class Sample(NamedTuple):
+    """Outcome of a single request"""
+
+    operation: str
+    status: int
+    elapsed: float
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parses `op=weight` pairs, e.g. "upload=1,list=10,detail=5"
+
+    Raises:
+        ValueError: Unknown operation or invalid weight
+    """
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' in mix")
+        weights[name] = int(weight or 1)
+        if weights[name] < 0:
+            raise ValueError(f"Negative weight for '{name}'")
+    if not any(weights.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return weights
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return float("nan")
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+def multipart_body(name: str, content: bytes) -> bytes:
+    return (
+        (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+        ).encode()
+        + content
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+
+class LoadClient(object):
+    """One client thread's connection and request helpers
+
+    Args:
+        base_url: Root URL of the server, e.g. `http://127.0.0.1:5000`
+        payload: CSV content used for uploads
+        file_ids: IDs available for detail calls, shared between clients
+        lock: Guards `file_ids`
+    """
+
+    def __init__(self, base_url: str, payload: bytes, file_ids, lock):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/") + "/api/v1/files"
+        self.payload = payload
+        self.file_ids = file_ids
+        self.lock = lock
+        self.conn = None
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(
+                    self.host, self.port, timeout=60
+                )
+            try:
+                self.conn.request(
+                    method, path, body=body, headers=headers or {}
+                )
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    self.close()
+                return response.status, data
+            except (http.client.HTTPException, OSError):
+                # stale keep-alive connection, retry once on a new one
+                self.close()
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def run(self, operation: str) -> int:
+        if operation == "upload":
+            status, data = self.request(
+                "POST",
+                self.prefix,
+                body=multipart_body(
+                    f"loadtest_{uuid.uuid4().hex}.csv", self.payload
+                ),
+                headers={
+                    "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"
+                },
+            )
+            if status == 201:
+                with self.lock:
+                    self.file_ids.append(json.loads(data)["id"])
+            return status
+        if operation == "detail":
+            with self.lock:
+                file_id = random.choice(self.file_ids) if self.file_ids else 1
+            return self.request("GET", f"{self.prefix}/{file_id}")[0]
+        return self.request("GET", f"{self.prefix}?per_page=50")[0]
+
+
+def run_load(
+    base_url: str,
+    mix: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    payload: bytes,
+) -> List[Sample]:
+    """Runs the mix with `concurrency` client threads for `duration` seconds
+
+    One file is uploaded before the clock starts so that detail calls always
+    have something to fetch.
+    """
+    file_ids, lock = [], threading.Lock()
+    LoadClient(base_url, payload, file_ids, lock).run("upload")
+
+    operations = [name for name in mix if mix[name]]
+    weights = [mix[name] for name in operations]
+    samples = []
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        client = LoadClient(base_url, payload, file_ids, lock)
+        local = []
+        while time.perf_counter() < deadline:
+            operation = random.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = client.run(operation)
+            except (http.client.HTTPException, OSError):
+                status = 0
+            local.append(Sample(operation, status, time.perf_counter() - start))
+        client.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples: List[Sample], duration: float) -> List[dict]:
+    """Aggregates samples per operation (plus an "all" row)"""
+    rows = []
+    for operation in list(OPERATIONS) + ["all"]:
+        selected = [s for s in samples if operation in ("all", s.operation)]
+        if not selected:
+            continue
+        latencies = sorted(s.elapsed for s in selected)
+        rows.append(
+            {
+                "operation": operation,
+                "requests": len(selected),
+                "errors": sum(1 for s in selected if not 200 <= s.status < 300),
+                "rps": len(selected) / duration,
+                "p50": percentile(latencies, 50) * 1000,
+                "p95": percentile(latencies, 95) * 1000,
+                "p99": percentile(latencies, 99) * 1000,
+            }
+        )
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, process, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server exited during start-up")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def server_env(workdir: str, env: dict = None) -> dict:
+    """Environment of a scratch server keeping all of its state in `workdir`
+
+    Besides the database and uploads this covers the ingest slot locks and
+    the result cache, which are otherwise shared with every other server on
+    the host.
+    """
+    uploads = os.path.join(workdir, "uploads")
+    return dict(
+        os.environ,
+        DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        UPLOAD_FOLDER=uploads,
+        UPLOAD_SESSION_FOLDER=os.path.join(uploads, ".sessions"),
+        RESULT_CACHE_FOLDER=os.path.join(uploads, ".cache"),
+        INGEST_LOCK_FOLDER=os.path.join(workdir, "ingest_locks"),
+        FLASK_ENV="production",
+        **(env or {}),
+    )
+
+
+@contextmanager
+def local_server(workers: int, threads: int, env: dict = None) -> Iterator:
+    """Starts gunicorn with `csv_poc.wsgi:app` against a scratch database
+
+    The database, upload folder, ingest locks and result cache live in a
+    temporary directory that is removed afterwards, so load tests never touch
+    real data or compete with a real server for ingest slots. Any setting can
+    be overridden through `env`.
+
+    Yields:
+        The base URL of the server
+    """
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "-c", "python:csv_poc.gunicorn_conf",
+            "-w", str(workers), "--threads", str(threads),
+            "-b", f"127.0.0.1:{port}",
+            "csv_poc.wsgi:app",
+        ],  # fmt: skip
+        env=server_env(workdir, env),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_port(port, process)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
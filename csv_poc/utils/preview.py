@@ -0,0 +1,98 @@
+"""Pre-serialized preview of the first rows of a stored CSV file
+
+Ingest writes the first `PREVIEW_ROWS` rows, with typed values, as a JSON
+document next to the file (`<path>.preview.json`). File detail requests can
+then splice those bytes into their response as-is: no CSV parsing and no JSON
+encoding of the rows happens per request. Recently used blobs are also kept
+in memory, keyed by the blob's path and modification time.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+from csv_poc.utils.values import typed_value
+
+PREVIEW_SUFFIX = ".preview.json"
+
+
+def preview_path(file_path: str) -> str:
+    """Location of the preview blob for a given CSV file"""
+    return f"{file_path}{PREVIEW_SUFFIX}"
+
+
+class PreviewWriter(object):
+    """Collects the first rows of a file and serializes them on `close()`
+
+    Args:
+        file_path: Path of the CSV file the preview belongs to
+        names: Column names, in file order
+        stats: `ColumnStats` of every column. Their `col_type` is read when
+          the preview is written, so types widened while scanning are used.
+        limit: Number of rows in the preview
+        rows: Rows already in the file, used when appending to a file that
+          has fewer than `limit` rows
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        names: List[str],
+        stats: Sequence,
+        limit: int = 50,
+        rows: Sequence[List[str]] = (),
+    ):
+        self.file_path = file_path
+        self.names = names
+        self.stats = stats
+        self.limit = limit
+        self.rows = list(rows)[:limit]
+
+    def add(self, row_number: int, row: List[str]) -> None:
+        if len(self.rows) < self.limit:
+            self.rows.append(row)
+
+    def close(self) -> None:
+        fields = [
+            (name, column.col_type)
+            for name, column in zip(self.names, self.stats)
+        ]
+        blob = json.dumps(
+            [
+                {
+                    name: typed_value(col_type, value)
+                    for (name, col_type), value in zip(fields, row)
+                }
+                for row in self.rows
+            ],
+            separators=(",", ":"),
+        )
+        staging = f"{preview_path(self.file_path)}.tmp"
+        with open(staging, "w") as fh:
+            fh.write(blob)
+        os.replace(staging, preview_path(self.file_path))
+
+    def abort(self) -> None:
+        pass
+
+
+@lru_cache(maxsize=256)
+def _read_blob(path: str, mtime_ns: int) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def load_preview(file_path: str) -> Optional[bytes]:
+    """Returns the serialized preview of a file, None if it has none"""
+    path = preview_path(file_path)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _read_blob(path, mtime_ns)
+
+
+def embed_preview(document: dict, blob: Optional[bytes]) -> bytes:
+    """Serializes `document` with the preview blob added as `preview`"""
+    body = json.dumps(document).encode("utf-8")
+    return b"".join([body[:-1], b', "preview": ', blob or b"null", body[-1:]])
@@ -0,0 +1,141 @@
+"""Opt-in memory profiling based on `tracemalloc`
+
+With `MEMORY_PROFILING` enabled every request, and every phase wrapped in
+`memory_phase()` (upload: save, parse_columns, commit, to_dict), produces a
+record with its peak memory, the memory it still held when it finished and
+the source lines that allocated the most. Records are logged and kept in a
+bounded in-process history served by `GET /api/v1/debug/memory`.
+
+tracemalloc slows Python down noticeably and its counters are global to the
+process, so numbers are only meaningful with one request in flight per
+worker (e.g. gunicorn sync workers). It is meant for diagnosing, not for
+production traffic.
+"""
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
+
+from flask import Flask, current_app, g, request
+
+_lock = threading.Lock()
+_open_spans = []
+_history = deque(maxlen=100)
+_top = 10
+_filters = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+class _Span(object):
+    """Memory accounting for one request or phase that is still running"""
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.start_bytes, _ = tracemalloc.get_traced_memory()
+        self.peak_bytes = self.start_bytes
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(_filters)
+
+
+def _fold_peak() -> int:
+    """Credits the peak since the last reset to every open span"""
+    current, peak = tracemalloc.get_traced_memory()
+    for span in _open_spans:
+        span.peak_bytes = max(span.peak_bytes, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+def _begin(kind: str, name: str) -> Optional[_Span]:
+    if not tracemalloc.is_tracing():
+        return None
+    with _lock:
+        _fold_peak()
+        span = _Span(kind, name)
+        _open_spans.append(span)
+    return span
+
+
+def _end(span: _Span) -> dict:
+    with _lock:
+        current = _fold_peak()
+        _open_spans.remove(span)
+    snapshot = tracemalloc.take_snapshot().filter_traces(_filters)
+    top = [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+        }
+        for stat in snapshot.compare_to(span.snapshot, "lineno")[:_top]
+    ]
+    record = {
+        "kind": span.kind,
+        "name": span.name,
+        "duration": round(time.perf_counter() - span.started, 4),
+        "peak_bytes": span.peak_bytes - span.start_bytes,
+        "retained_bytes": current - span.start_bytes,
+        "top": top,
+    }
+    _history.append(record)
+    current_app.logger.info(
+        f"Memory profile for {span.kind} {span.name}: peak "
+        f"{record['peak_bytes'] / 1024:.1f} KiB, retained "
+        f"{record['retained_bytes'] / 1024:.1f} KiB",
+        extra={"memory_profile": record},
+    )
+    return record
+
+
+@contextmanager
+def memory_phase(name: str):
+    """Profiles a block of code when memory profiling is enabled
+
+    Typical usage example:
+
+      with memory_phase("parse_columns"):
+          parsed = parse_columns(...)
+    """
+    span = _begin("phase", name)
+    try:
+        yield
+    finally:
+        if span is not None:
+            _end(span)
+
+
+def memory_profiles(limit: int = None) -> List[dict]:
+    """Most recent profile records, newest last"""
+    records = list(_history)
+    return records[-limit:] if limit else records
+
+
+def init_memory_profiling(app: Flask) -> None:
+    """Starts tracemalloc and profiles every request if enabled in config
+
+    Reads `MEMORY_PROFILING`, `MEMORY_PROFILE_FRAMES` (traceback depth kept
+    by tracemalloc), `MEMORY_PROFILE_TOP` (allocation sites per record) and
+    `MEMORY_PROFILE_HISTORY` (records kept in memory).
+    """
+    global _history, _top
+    if not app.config.get("MEMORY_PROFILING", False):
+        return
+    _history = deque(maxlen=app.config.get("MEMORY_PROFILE_HISTORY", 100))
+    _top = app.config.get("MEMORY_PROFILE_TOP", 10)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(app.config.get("MEMORY_PROFILE_FRAMES", 1))
+
+    @app.before_request
+    def start_request_profile():
+        g.memory_span = _begin("request", f"{request.method} {request.path}")
+
+    @app.teardown_request
+    def end_request_profile(exc):
+        span = g.pop("memory_span", None)
+        if span is not None:
+            _end(span)
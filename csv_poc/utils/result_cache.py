@@ -0,0 +1,246 @@
+"""Disk cache for results derived from stored files
+
+Value counts, histograms, joins and filtered exports are pure functions of
+the content of the files involved and the request parameters. Their results
+are kept as files in `RESULT_CACHE_FOLDER`, named after the content hashes of
+the files and a digest of the canonicalized request, so every worker process
+on the host shares them and a file whose content changed never hits an
+entry made for its old content.
+
+Entries are written to a temporary file and renamed into place, so readers
+never see a partial entry. Every hit refreshes the entry's modification
+time, and once the entries add up to more than `RESULT_CACHE_MAX_BYTES` the
+least recently used ones are removed.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
+
+from flask import current_app
+
+ENTRY_SUFFIX = ".result"
+TEMP_SUFFIX = ".tmp"
+# temporary files older than this (seconds) were left behind by a crash
+STALE_TEMP_AGE = 60 * 60
+# content hash characters used in entry names
+HASH_PREFIX = 16
+CHUNK_SIZE = 64 * 1024
+
+
+def request_digest(request: dict) -> str:
+    """Digest of a request, independent of the order of its parameters"""
+    canonical = json.dumps(
+        request, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache(object):
+    """Size-bounded LRU cache of results on local disk
+
+    Args:
+        folder: Directory holding the entries
+        max_bytes: Total size of all entries (0 disables the cache)
+    """
+
+    def __init__(self, folder: str, max_bytes: int):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def key(
+        self, content_hashes: Sequence[Optional[str]], request: dict
+    ) -> Optional[str]:
+        """Entry name for a request over files with the given content
+
+        Returns:
+            None when the cache is disabled or a file's content hash is
+            unknown, in which case the result is not cached
+        """
+        if not self.max_bytes or not all(content_hashes):
+            return None
+        files = "_".join(h[:HASH_PREFIX] for h in content_hashes)
+        digest = request_digest(
+            {"files": list(content_hashes), "request": request}
+        )
+        return f"{files}.{digest}{ENTRY_SUFFIX}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key)
+
+    def _open(self, key: Optional[str]):
+        """Opens an entry and marks it as used, None on a miss"""
+        if key is None:
+            return None
+        try:
+            fh = open(self._path(key), "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            # evicted by another process since, the open handle still reads
+            pass
+        return fh
+
+    def _staging(self, key: str) -> str:
+        os.makedirs(self.folder, exist_ok=True)
+        return os.path.join(
+            self.folder,
+            f"{key}.{os.getpid()}.{threading.get_ident()}{TEMP_SUFFIX}",
+        )
+
+    def _commit(self, staging: str, key: str) -> None:
+        os.replace(staging, self._path(key))
+        self.evict()
+
+    def get_or_compute(self, key: Optional[str], compute: Callable[[], dict]):
+        """Cached JSON result, computed and stored on a miss
+
+        Args:
+            key: Entry name from `key()`
+            compute: Produces the result, a JSON-serializable value
+        """
+        fh = self._open(key)
+        if fh is not None:
+            with fh:
+                try:
+                    return json.load(fh)
+                except ValueError:
+                    # unreadable entry, replaced below
+                    pass
+        result = compute()
+        if key is not None:
+            payload = json.dumps(result, separators=(",", ":")).encode()
+            if len(payload) <= self.max_bytes:
+                staging = self._staging(key)
+                with open(staging, "wb") as out:
+                    out.write(payload)
+                self._commit(staging, key)
+        return result
+
+    def stream(self, key: Optional[str], body: Iterable[bytes]):
+        """Cached response body, or `body` copied into the cache as it goes
+
+        The entry is only stored once `body` has been consumed completely
+        and if it fits the budget; a response that is cut short leaves
+        nothing behind. `body` is not consumed at all on a hit.
+
+        Args:
+            key: Entry name from `key()`
+            body: Lazily produced chunks of the response body
+        """
+        fh = self._open(key)
+        if fh is not None:
+            return self._replay(fh)
+        if key is None:
+            return iter(body)
+        return self._record(key, body)
+
+    @staticmethod
+    def _replay(fh) -> Iterator[bytes]:
+        with fh:
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _record(self, key: str, body: Iterable[bytes]) -> Iterator[bytes]:
+        staging = self._staging(key)
+        out, size = open(staging, "wb"), 0
+        try:
+            for chunk in body:
+                if out is not None:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        # too big to cache, keep streaming without copying
+                        out.close()
+                        out = None
+                        os.remove(staging)
+                    else:
+                        out.write(chunk)
+                yield chunk
+            if out is not None:
+                out.close()
+                out = None
+                self._commit(staging, key)
+        finally:
+            if out is not None:
+                out.close()
+                os.remove(staging)
+
+    def _entries(self) -> List[os.DirEntry]:
+        try:
+            return list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return []
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until within budget
+
+        Temporary files left behind by crashed workers are removed as well.
+        Entries another process removed in the meantime are skipped.
+        """
+        with self._lock:
+            now, entries = time.time(), []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith(TEMP_SUFFIX):
+                    if now - stat.st_mtime > STALE_TEMP_AGE:
+                        _remove(entry.path)
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+
+    def invalidate(self, content_hash: Optional[str]) -> int:
+        """Removes every entry made from a file with the given content
+
+        Returns:
+            Number of removed entries
+        """
+        if not content_hash:
+            return 0
+        prefix = content_hash[:HASH_PREFIX]
+        removed = 0
+        for entry in self._entries():
+            if not entry.name.endswith(ENTRY_SUFFIX):
+                continue
+            files = entry.name.split(".", 1)[0].split("_")
+            if prefix in files and _remove(entry.path):
+                removed += 1
+        return removed
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def result_cache() -> ResultCache:
+    """The current app's cache, created from its config on first use"""
+    cache = current_app.extensions.get("result_cache")
+    if cache is None:
+        config = current_app.config
+        cache = current_app.extensions.setdefault(
+            "result_cache",
+            ResultCache(
+                folder=config["RESULT_CACHE_FOLDER"],
+                max_bytes=config["RESULT_CACHE_MAX_BYTES"],
+            ),
+        )
+    return cache
@@ -0,0 +1,107 @@
+"""Byte-offset index of the data rows in a stored CSV file
+
+The index lives next to the CSV file (`<path>.idx`) and is simply an array of
+unsigned 64-bit integers: entry `n` is the byte offset at which data row `n`
+(zero-based, header excluded) starts. It is written during ingest and extended
+in place when rows are appended, which makes jumping to any row an O(1) seek.
+"""
+import os
+from array import array
+from typing import List, Sequence
+
+INDEX_SUFFIX = ".idx"
+INDEX_TYPECODE = "Q"
+ITEM_SIZE = array(INDEX_TYPECODE).itemsize
+
+
+def index_path(file_path: str) -> str:
+    """Location of the row index for a given CSV file"""
+    return f"{file_path}{INDEX_SUFFIX}"
+
+
+class RowIndexWriter(object):
+    """Buffered writer for row offsets
+
+    Typical usage example:
+
+      with RowIndexWriter(file_path) as index:
+          index.append(offset)
+
+    Args:
+        file_path: Path of the CSV file the index belongs to
+        append: Extend an existing index instead of replacing it
+        buffer_size: Number of offsets held in memory between writes
+    """
+
+    def __init__(self, file_path: str, append: bool = False, buffer_size=65536):
+        self._fh = open(index_path(file_path), "ab" if append else "wb")
+        self._buffer = array(INDEX_TYPECODE)
+        self._buffer_size = buffer_size
+
+    def append(self, offset: int) -> None:
+        self._buffer.append(offset)
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self._buffer.tofile(self._fh)
+        self._buffer = array(INDEX_TYPECODE)
+        self._fh.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_offsets(file_path: str, start: int = 0, stop: int = None) -> array:
+    """Reads the offsets of rows `start` (inclusive) to `stop` (exclusive)
+
+    Args:
+        file_path: Path of the CSV file the index belongs to
+        start: First row number
+        stop: Row number to stop at, defaults to the end of the index
+
+    Returns:
+        An `array` of byte offsets
+    """
+    offsets = array(INDEX_TYPECODE)
+    count = indexed_rows(file_path)
+    stop = count if stop is None else min(stop, count)
+    if start >= stop:
+        return offsets
+    with open(index_path(file_path), "rb") as fh:
+        fh.seek(start * ITEM_SIZE)
+        offsets.fromfile(fh, stop - start)
+    return offsets
+
+
+def lookup_offsets(file_path: str, rows: Sequence[int]) -> List[int]:
+    """Reads the offsets of arbitrary (not necessarily contiguous) rows"""
+    offsets = []
+    with open(index_path(file_path), "rb") as fh:
+        for row in rows:
+            fh.seek(row * ITEM_SIZE)
+            entry = array(INDEX_TYPECODE)
+            entry.frombytes(fh.read(ITEM_SIZE))
+            offsets.append(entry[0])
+    return offsets
+
+
+def indexed_rows(file_path: str) -> int:
+    """Number of rows recorded in the index (0 when there is no index)"""
+    try:
+        return os.path.getsize(index_path(file_path)) // ITEM_SIZE
+    except FileNotFoundError:
+        return 0
+
+
+def truncate_index(file_path: str, rows: int) -> None:
+    """Drops every entry after the first `rows` ones"""
+    with open(index_path(file_path), "r+b") as fh:
+        fh.truncate(rows * ITEM_SIZE)
@@ -0,0 +1,165 @@
+"""Fixed-size uniform sample of the data rows of a stored CSV file
+
+The sample is kept next to the CSV file (`<path>.sample`) and is built with
+reservoir sampling (Algorithm L) during the ingest pass, so it costs one
+comparison per row for most rows. The sampler state is stored with the rows,
+which lets appends keep extending the same sample instead of starting over.
+"""
+import json
+import math
+import os
+import random
+from collections import Counter
+from typing import List, NamedTuple, Optional, Tuple
+
+SAMPLE_SUFFIX = ".sample"
+# z-score for the 95% confidence intervals of approximate answers
+Z_95 = 1.96
+
+
+def sample_path(file_path: str) -> str:
+    """Location of the row sample for a given CSV file"""
+    return f"{file_path}{SAMPLE_SUFFIX}"
+
+
+class RowSample(NamedTuple):
+    """Content of a `.sample` file"""
+
+    # number of rows the sample was drawn from
+    seen: int
+    size: int
+    # `(row number, values)` pairs
+    rows: List[Tuple[int, List[str]]]
+
+
+class ReservoirSampler(object):
+    """Keeps a uniform random sample of the rows passed to `add()`
+
+    Nothing is written until `close()`, so `abort()` just drops the state.
+
+    Args:
+        file_path: Path of the CSV file the sample belongs to
+        size: Number of rows to keep. Ignored when `append` is set.
+        append: Continue the existing sample instead of starting a new one
+        rng: Random number generator, mostly useful for tests
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        size: int = 1000,
+        append: bool = False,
+        rng: random.Random = None,
+    ):
+        self.file_path = file_path
+        self._rng = rng or random.Random()
+        if append:
+            with open(sample_path(file_path)) as fh:
+                state = json.load(fh)
+            self.size = state["size"]
+            self.seen = state["seen"]
+            self.rows = [tuple(entry) for entry in state["rows"]]
+            self._w = state["w"]
+            self._next = state["next"]
+        else:
+            self.size = size
+            self.seen = 0
+            self.rows = []
+            self._w = self._draw_weight(1.0)
+            self._next = self.size + self._skip()
+
+    def _draw_weight(self, w: float) -> float:
+        return w * math.exp(math.log(1.0 - self._rng.random()) / self.size)
+
+    def _skip(self) -> int:
+        if self._w >= 1.0:
+            return 0
+        return int(math.log(1.0 - self._rng.random()) / math.log(1.0 - self._w))
+
+    def add(self, row_number: int, row: List[str]) -> None:
+        if self.seen < self.size:
+            self.rows.append((row_number, row))
+        elif self.seen == self._next:
+            self.rows[self._rng.randrange(self.size)] = (row_number, row)
+            self._w = self._draw_weight(self._w)
+            self._next += self._skip() + 1
+        self.seen += 1
+
+    def close(self) -> None:
+        staging = f"{sample_path(self.file_path)}.tmp"
+        with open(staging, "w") as fh:
+            json.dump(
+                {
+                    "size": self.size,
+                    "seen": self.seen,
+                    "w": self._w,
+                    "next": self._next,
+                    "rows": sorted(self.rows),
+                },
+                fh,
+            )
+        os.replace(staging, sample_path(self.file_path))
+
+    def abort(self) -> None:
+        pass
+
+
+def remove_sample(file_path: str) -> None:
+    """Deletes the row sample of a file, if it has one"""
+    if os.path.exists(sample_path(file_path)):
+        os.remove(sample_path(file_path))
+
+
+def load_sample(file_path: str, rows: int = None) -> Optional[RowSample]:
+    """Reads the row sample of a file
+
+    Args:
+        file_path: Path of the stored CSV file
+        rows: Expected number of rows in the file. When given and the sample
+          was drawn from a different number of rows it is considered stale.
+
+    Returns:
+        A `RowSample`, or None when the file has no usable sample
+    """
+    try:
+        with open(sample_path(file_path)) as fh:
+            state = json.load(fh)
+    except FileNotFoundError:
+        return None
+    if rows is not None and state["seen"] != rows:
+        return None
+    return RowSample(
+        seen=state["seen"],
+        size=state["size"],
+        rows=[tuple(entry) for entry in state["rows"]],
+    )
+
+
+def estimate_counts(sample: RowSample, col_index: int) -> List[dict]:
+    """Estimates how often each value of a column occurs in the whole file
+
+    Each count is scaled up from the sample and comes with the half-width of
+    its 95% confidence interval (normal approximation with finite population
+    correction). When the sample holds every row the counts are exact.
+
+    Returns:
+        `{"value", "count", "error"}` dictionaries, most frequent first.
+        Values that do not appear in the sample are not listed.
+    """
+    counts = Counter(values[col_index] for _, values in sample.rows)
+    taken, total = len(sample.rows), sample.seen
+    estimates = []
+    for value, count in counts.most_common():
+        error = 0.0
+        if taken < total:
+            p = count / taken
+            fpc = (total - taken) / (total - 1)
+            error = Z_95 * total * math.sqrt(p * (1 - p) / taken * fpc)
+        estimates.append(
+            {
+                "value": value,
+                "count": round(count * total / taken),
+                "error": round(error, 1),
+            }
+        )
+    return estimates
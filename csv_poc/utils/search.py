@@ -0,0 +1,129 @@
+"""Full-text index over the text columns of a stored CSV file
+
+Each file gets its own SQLite database next to it (`<path>.fts.db`) holding a
+contentless FTS5 table. The rowid of every entry is the data row number, so a
+match can be turned into a byte offset through the row index and read
+straight from the CSV file; the values themselves are not duplicated.
+"""
+import os
+import sqlite3
+from typing import List, Sequence
+
+from csv_poc.utils.exc import InvalidMetadataException
+
+SEARCH_SUFFIX = ".fts.db"
+
+
+def search_index_path(file_path: str) -> str:
+    """Location of the full-text index for a given CSV file"""
+    return f"{file_path}{SEARCH_SUFFIX}"
+
+
+class SearchIndexWriter(object):
+    """Batched writer for the full-text index
+
+    Rows are buffered and inserted with `executemany()`; everything happens in
+    a single transaction that is committed by `close()` or discarded by
+    `abort()`, so an append that fails leaves the index untouched.
+
+    Args:
+        file_path: Path of the CSV file the index belongs to
+        indices: Column indexes to index. Ignored when `append` is set, the
+          indexes recorded when the index was created are used instead.
+        append: Extend an existing index instead of replacing it
+        batch_size: Number of rows buffered between inserts
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        indices: Sequence[int] = (),
+        append: bool = False,
+        batch_size: int = 5000,
+    ):
+        path = search_index_path(file_path)
+        if not append and os.path.exists(path):
+            os.remove(path)
+        self._conn = sqlite3.connect(path)
+        if append:
+            self.indices = _indexed_columns(self._conn)
+        else:
+            self.indices = list(indices)
+            self._conn.executescript(
+                "CREATE TABLE meta (col_index INTEGER NOT NULL);"
+                "CREATE VIRTUAL TABLE rows_fts USING fts5("
+                "content, content='', tokenize='unicode61');"
+            )
+            self._conn.executemany(
+                "INSERT INTO meta (col_index) VALUES (?)",
+                [(idx,) for idx in self.indices],
+            )
+        self._batch = []
+        self._batch_size = batch_size
+
+    def add(self, row_number: int, row: List[str]) -> None:
+        if not self.indices:
+            return
+        text = "\t".join(row[idx] for idx in self.indices if row[idx])
+        if text:
+            self._batch.append((row_number, text))
+            if len(self._batch) >= self._batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            self._conn.executemany(
+                "INSERT INTO rows_fts (rowid, content) VALUES (?, ?)",
+                self._batch,
+            )
+            self._batch = []
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.commit()
+        self._conn.close()
+
+    def abort(self) -> None:
+        self._conn.rollback()
+        self._conn.close()
+
+
+def _indexed_columns(conn: sqlite3.Connection) -> List[int]:
+    return [idx for (idx,) in conn.execute("SELECT col_index FROM meta")]
+
+
+def search_rows(file_path: str, query: str, limit: int = 50) -> List[int]:
+    """Finds the rows matching an FTS5 query
+
+    Args:
+        file_path: Path of the stored CSV file
+        query: FTS5 query string, e.g. `spring campaign` or `"spring sale"`
+        limit: Maximum number of row numbers returned
+
+    Returns:
+        Matching row numbers, in file order
+
+    Raises:
+        InvalidMetadataException: The query is not valid FTS5 syntax or the
+          file has no search index
+    """
+    path = search_index_path(file_path)
+    if not os.path.exists(path):
+        raise InvalidMetadataException(
+            message="This file has no search index", data=None
+        )
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT rowid FROM rows_fts WHERE rows_fts MATCH ? "
+            "ORDER BY rowid LIMIT ?",
+            (query, limit),
+        )
+        return [rowid for (rowid,) in cursor]
+    except sqlite3.OperationalError as oe:
+        raise InvalidMetadataException(
+            message=f"Invalid search query {query!r}", data=str(oe)
+        )
+    finally:
+        conn.close()
+
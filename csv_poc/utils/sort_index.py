@@ -0,0 +1,231 @@
+"""Row order of a stored CSV file sorted by one column
+
+Sorting happens out of core: the column is read in file order and collected
+into runs that fit the memory budget. Each run is sorted and spilled to a
+temporary file, and the runs are then merged with a k-way heap merge. Only
+the sort key and row number of every row are kept, never the whole row.
+
+The result is a permutation index stored next to the CSV file
+(`<path>.sort.<col_index>.<asc|desc>`). It holds the content hash of the
+file it was built for, followed by the data row numbers in sorted order as
+unsigned 64-bit integers, so any page of the sorted rows is a single seek
+away. Values are ordered like their column type (see `value_key()`); empty
+values and values that do not fit the type come last in either direction.
+Rows with equal values keep their file order.
+"""
+import glob
+import heapq
+import os
+import pickle
+import tempfile
+import threading
+from array import array
+from itertools import islice
+from operator import itemgetter
+from typing import Iterator, List, Optional, Tuple
+
+from csv_poc.utils.export import project_rows
+from csv_poc.utils.file import value_key
+from csv_poc.utils.row_index import INDEX_TYPECODE, ITEM_SIZE
+
+SORT_SUFFIX = ".sort"
+SORT_DIRECTIONS = ("asc", "desc")
+# room for the content hash at the start of the index
+HEADER_SIZE = 64
+# rough size of a (key, row number) pair in memory, on top of the value
+RECORD_OVERHEAD = 160
+# pairs written to (and read back from) a run file in one go; the merge
+# holds one batch of every run in memory
+SPILL_BATCH = 1000
+# row numbers held in memory while writing the index
+BUFFER_ROWS = 65536
+
+
+def sort_index_path(file_path: str, col_index: int, descending: bool) -> str:
+    """Location of the permutation index for one column and direction"""
+    direction = SORT_DIRECTIONS[descending]
+    return f"{file_path}{SORT_SUFFIX}.{col_index}.{direction}"
+
+
+def remove_sort_indexes(file_path: str) -> None:
+    """Deletes every permutation index of a file"""
+    for path in glob.glob(f"{glob.escape(file_path)}{SORT_SUFFIX}.*"):
+        os.remove(path)
+
+
+def _header(content_hash: Optional[str]) -> bytes:
+    return (content_hash or "").encode("ascii").ljust(HEADER_SIZE, b"\0")
+
+
+def _keyed_rows(
+    file_path: str,
+    col_index: int,
+    col_type: str,
+    descending: bool,
+    row_count: Optional[int],
+) -> Iterator[Tuple[tuple, int, int]]:
+    """Yields the sort key, row number and rough size of every data row"""
+    values = project_rows(file_path, [col_index])
+    for row_number, (raw,) in enumerate(islice(values, row_count)):
+        key = value_key(col_type, raw)
+        # NaN is not ordered against anything, treat it as missing
+        missing = key is None or key != key
+        # keys are compared in reverse when descending, so the flag that
+        # moves missing values to the end flips as well
+        yield (
+            (not missing if descending else missing, None if missing else key),
+            row_number,
+            RECORD_OVERHEAD + len(raw),
+        )
+
+
+def _spill(run: List[tuple], directory: str, number: int) -> str:
+    path = os.path.join(directory, f"run_{number}")
+    with open(path, "wb") as fh:
+        for start in range(0, len(run), SPILL_BATCH):
+            pickle.dump(
+                run[start : start + SPILL_BATCH],
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+    return path
+
+
+def _read_run(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as fh:
+        while True:
+            try:
+                yield from pickle.load(fh)
+            except EOFError:
+                return
+
+
+def sorted_row_numbers(
+    file_path: str,
+    col_index: int,
+    col_type: str,
+    descending: bool = False,
+    row_count: int = None,
+    memory_budget: int = 64 * 1024 * 1024,
+    directory: str = None,
+) -> Iterator[int]:
+    """Yields the data row numbers of a file ordered by one column
+
+    Args:
+        file_path: Path of the stored CSV file
+        col_index: Index of the column to sort by
+        col_type: Type of the column
+        descending: Largest values first
+        row_count: Number of data rows to sort, all of them when omitted
+        memory_budget: Bytes the rows of a run may take up in memory
+        directory: Where the runs are spilled, a temporary directory that
+          is removed afterwards when omitted
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as spill_dir:
+        runs, run, size = [], [], 0
+        for key, row_number, row_size in _keyed_rows(
+            file_path, col_index, col_type, descending, row_count
+        ):
+            run.append((key, row_number))
+            size += row_size
+            if size >= memory_budget:
+                run.sort(key=itemgetter(0), reverse=descending)
+                runs.append(_spill(run, spill_dir, len(runs)))
+                run, size = [], 0
+        # the sort is stable and the runs are in file order, so equal keys
+        # keep their file order through the merge as well
+        run.sort(key=itemgetter(0), reverse=descending)
+        merged = heapq.merge(
+            *(_read_run(path) for path in runs),
+            run,
+            key=itemgetter(0),
+            reverse=descending,
+        )
+        for _, row_number in merged:
+            yield row_number
+
+
+def build_sort_index(
+    file_path: str,
+    col_index: int,
+    col_type: str,
+    descending: bool,
+    content_hash: Optional[str],
+    row_count: int,
+    memory_budget: int = 64 * 1024 * 1024,
+) -> str:
+    """Sorts the rows of a file and stores the permutation index
+
+    The index is written to a temporary file and renamed into place, so
+    concurrent builds and readers never see a partial index.
+
+    Args:
+        file_path: Path of the stored CSV file
+        col_index: Index of the column to sort by
+        col_type: Type of the column
+        descending: Largest values first
+        content_hash: Content hash of the file, stored with the index
+        row_count: Number of data rows to sort. Rows appended while the
+          index is built are left out, as they are not part of the content
+          the hash was taken of.
+        memory_budget: Bytes the rows of a sorted run may take up in memory
+
+    Returns:
+        Path of the index
+    """
+    path = sort_index_path(file_path, col_index, descending)
+    staging = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(staging, "wb") as fh:
+            fh.write(_header(content_hash))
+            buffer = array(INDEX_TYPECODE)
+            for row_number in sorted_row_numbers(
+                file_path,
+                col_index,
+                col_type,
+                descending,
+                row_count=row_count,
+                memory_budget=memory_budget,
+                directory=os.path.dirname(file_path),
+            ):
+                buffer.append(row_number)
+                if len(buffer) >= BUFFER_ROWS:
+                    buffer.tofile(fh)
+                    buffer = array(INDEX_TYPECODE)
+            buffer.tofile(fh)
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    return path
+
+
+def read_sort_index(
+    file_path: str,
+    col_index: int,
+    descending: bool,
+    content_hash: Optional[str],
+    start: int,
+    stop: int,
+) -> Optional[array]:
+    """Reads positions `start` to `stop` of the sorted row order
+
+    Returns:
+        An `array` of data row numbers, or None when there is no index or it
+        was built for different content
+    """
+    path = sort_index_path(file_path, col_index, descending)
+    rows = array(INDEX_TYPECODE)
+    try:
+        with open(path, "rb") as fh:
+            header = fh.read(HEADER_SIZE)
+            if header != _header(content_hash):
+                return None
+            count = (os.fstat(fh.fileno()).st_size - HEADER_SIZE) // ITEM_SIZE
+            stop = min(stop, count)
+            if start < stop:
+                fh.seek(HEADER_SIZE + start * ITEM_SIZE)
+                rows.fromfile(fh, stop - start)
+    except FileNotFoundError:
+        return None
+    return rows
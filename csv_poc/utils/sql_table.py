@@ -0,0 +1,263 @@
+"""Per-file SQL table for ad hoc read-only queries
+
+With `SQL_TABLES` enabled every stored CSV file gets its own SQLite database
+next to it (`<path>.sql.db`) holding one table, `data`: a column per CSV
+column plus `_row`, the data row number, as its primary key. Values are
+stored as they are exported (see `typed_value()`): empty values are NULL and
+numbers are stored as numbers.
+
+Rows are inserted with `executemany()` in batches inside a single
+transaction, and the column indexes are only built once every row is in,
+which is far cheaper than keeping them up to date row by row.
+"""
+import os
+import sqlite3
+import time
+from typing import List, Sequence
+
+from csv_poc.utils.exc import InvalidMetadataException
+from csv_poc.utils.values import typed_value
+
+TABLE_SUFFIX = ".sql.db"
+TABLE_NAME = "data"
+ROW_COLUMN = "_row"
+SQL_TYPES = {"number": "NUMERIC", "datetime": "TEXT", "text": "TEXT"}
+# virtual machine instructions between two checks of the query deadline
+PROGRESS_STEPS = 10000
+# statements a query may consist of, everything else (writes, PRAGMA,
+# ATTACH, ...) is refused by the authorizer
+ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+}
+
+
+def table_path(file_path: str) -> str:
+    """Location of the SQL table for a given CSV file"""
+    return f"{file_path}{TABLE_SUFFIX}"
+
+
+def remove_table(file_path: str) -> None:
+    """Deletes the SQL table of a file, if there is one"""
+    if os.path.exists(table_path(file_path)):
+        os.remove(table_path(file_path))
+
+
+def quote(name: str) -> str:
+    """Quotes an SQL identifier"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_column_names(header: Sequence[str]) -> List[str]:
+    """SQL column names for a CSV header
+
+    Names are kept as they are, but SQLite compares them without regard to
+    case, so duplicates (and names clashing with `_row`) get a numeric
+    suffix. Empty names become `column_<index>`.
+    """
+    taken = {ROW_COLUMN}
+    names = []
+    for idx, name in enumerate(header):
+        name = name.strip() or f"column_{idx}"
+        candidate, n = name, 2
+        while candidate.lower() in taken:
+            candidate, n = f"{name}_{n}", n + 1
+        taken.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+
+class SqlTableWriter(object):
+    """Batched loader for the SQL table of a file
+
+    Everything happens in a single transaction that is committed by
+    `close()` or discarded by `abort()`. A new table is created without
+    indexes; `close()` builds them once all rows have been inserted.
+
+    Args:
+        file_path: Path of the CSV file the table belongs to
+        header: CSV column names. Ignored when `append` is set.
+        col_types: Type of every column. Ignored when `append` is set, the
+          types recorded when the table was created are used instead.
+        append: Extend an existing table instead of replacing it
+        max_indexes: Number of columns (from the left) that get an index
+        batch_size: Number of rows buffered between inserts
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        header: Sequence[str] = (),
+        col_types: Sequence[str] = (),
+        append: bool = False,
+        max_indexes: int = 32,
+        batch_size: int = 5000,
+    ):
+        self.file_path = file_path
+        self.append = append
+        path = table_path(file_path)
+        if not append:
+            remove_table(file_path)
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        if append:
+            self.names, self.col_types = _table_columns(self._conn)
+        else:
+            # a failed load deletes the database, so it needs no journal
+            self._conn.execute("PRAGMA journal_mode = OFF")
+            self._conn.execute("PRAGMA synchronous = OFF")
+            self.names = sql_column_names(header)
+            self.col_types = list(col_types)
+        self._conn.execute("BEGIN")
+        if not append:
+            self._create()
+        self.max_indexes = max_indexes
+        self._insert = (
+            f"INSERT INTO {TABLE_NAME} VALUES "
+            f"(?{', ?' * len(self.col_types)})"
+        )
+        self._batch = []
+        self._batch_size = batch_size
+
+    def _create(self) -> None:
+        columns = ", ".join(
+            f"{quote(name)} {SQL_TYPES.get(col_type, 'TEXT')}"
+            for name, col_type in zip(self.names, self.col_types)
+        )
+        self._conn.execute(
+            "CREATE TABLE meta (col_index INTEGER NOT NULL, "
+            "sql_name TEXT NOT NULL, col_type TEXT NOT NULL)"
+        )
+        self._conn.executemany(
+            "INSERT INTO meta VALUES (?, ?, ?)",
+            [
+                (idx, name, col_type)
+                for idx, (name, col_type) in enumerate(
+                    zip(self.names, self.col_types)
+                )
+            ],
+        )
+        self._conn.execute(
+            f"CREATE TABLE {TABLE_NAME} "
+            f"({ROW_COLUMN} INTEGER PRIMARY KEY, {columns})"
+        )
+
+    def add(self, row_number: int, row: List[str]) -> None:
+        self._batch.append(
+            (row_number,)
+            + tuple(
+                typed_value(col_type, value)
+                for col_type, value in zip(self.col_types, row)
+            )
+        )
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._batch:
+            self._conn.executemany(self._insert, self._batch)
+            self._batch = []
+
+    def close(self) -> None:
+        self.flush()
+        if not self.append:
+            for idx, name in enumerate(self.names[: self.max_indexes]):
+                self._conn.execute(
+                    f"CREATE INDEX ix_{idx} ON {TABLE_NAME} ({quote(name)})"
+                )
+            self._conn.execute("ANALYZE")
+        self._conn.execute("COMMIT")
+        self._conn.close()
+
+    def abort(self) -> None:
+        try:
+            self._conn.execute("ROLLBACK")
+        finally:
+            self._conn.close()
+        if not self.append:
+            remove_table(self.file_path)
+
+
+def _table_columns(conn: sqlite3.Connection):
+    rows = conn.execute(
+        "SELECT sql_name, col_type FROM meta ORDER BY col_index"
+    ).fetchall()
+    return [name for name, _ in rows], [col_type for _, col_type in rows]
+
+
+def _authorize(action, arg1, arg2, database, trigger) -> int:
+    if action in ALLOWED_ACTIONS:
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+def run_query(
+    file_path: str,
+    sql: str,
+    params: Sequence = (),
+    limit: int = 100,
+    timeout: float = 5.0,
+) -> dict:
+    """Runs a read-only query against the SQL table of a file
+
+    The database is opened read-only and an authorizer only lets SELECT
+    statements through. A progress handler aborts the query once it has run
+    for `timeout` seconds, and at most `limit` rows are fetched.
+
+    Args:
+        file_path: Path of the stored CSV file
+        sql: A single SELECT statement, e.g.
+          `SELECT "Tactic", count(*) FROM data GROUP BY 1`
+        params: Values for the statement's `?` placeholders
+        limit: Maximum number of rows returned
+        timeout: Seconds the query may run for
+
+    Returns:
+        A dictionary with the result's `columns`, its `rows` and whether the
+        rows were `truncated` at `limit`
+
+    Raises:
+        InvalidMetadataException: The file has no SQL table, the statement
+          is invalid, not allowed or took too long
+    """
+    path = table_path(file_path)
+    if not os.path.exists(path):
+        raise InvalidMetadataException(
+            message="This file has no SQL table", data=None
+        )
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.set_authorizer(_authorize)
+    deadline = time.monotonic() + timeout
+    conn.set_progress_handler(
+        lambda: time.monotonic() > deadline, PROGRESS_STEPS
+    )
+    try:
+        cursor = conn.execute(sql, params)
+        if cursor.description is None:
+            raise InvalidMetadataException(
+                message="Only SELECT statements are allowed", data=sql
+            )
+        rows = cursor.fetchmany(limit + 1)
+        columns = [description[0] for description in cursor.description]
+    except sqlite3.OperationalError as oe:
+        if time.monotonic() > deadline:
+            raise InvalidMetadataException(
+                message=f"Query took longer than {timeout} seconds", data=sql
+            )
+        raise InvalidMetadataException(message=f"Invalid query: {oe}", data=sql)
+    except (sqlite3.Error, sqlite3.Warning) as e:
+        raise InvalidMetadataException(message=f"Invalid query: {e}", data=sql)
+    finally:
+        conn.close()
+    return {
+        "columns": columns,
+        "rows": [
+            [
+                value.hex() if isinstance(value, bytes) else value
+                for value in row
+            ]
+            for row in rows[:limit]
+        ],
+        "truncated": len(rows) > limit,
+    }
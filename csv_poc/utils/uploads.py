@@ -0,0 +1,265 @@
+"""Resumable uploads sent as numbered parts
+
+A client opens an upload session by announcing the file name, its total size
+and a part size. Part `n` always starts at byte `(n - 1) * part_size`, so parts
+can be sent in any order and in parallel and each one is written straight to
+its place in a single sparse data file: there is no assembly step that copies
+the parts together. A part is acknowledged by a small marker file that is only
+written once all of its bytes are on disk, so a part whose transfer was cut off
+is simply sent again.
+
+Sessions are directories under `UPLOAD_SESSION_FOLDER`:
+
+  <upload id>/session.json   name, size and part size
+  <upload id>/data           the file being assembled
+  <upload id>/parts/<n>      size and SHA-256 of part n, once received
+
+Part writes hold a shared lock on `session.json` and committing holds an
+exclusive one, so the data file can not change while it is handed to ingest.
+Expiry takes the exclusive lock too, and never removes a session in use.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, NamedTuple
+
+from csv_poc.utils.exc import InvalidMetadataException, UploadNotFoundException
+
+UPLOAD_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class UploadSession(NamedTuple):
+    """An upload session as stored in its `session.json`"""
+
+    id: str
+    directory: str
+    name: str
+    size: int
+    part_size: int
+    created: float
+
+    @property
+    def data_path(self) -> str:
+        return os.path.join(self.directory, "data")
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.size // self.part_size))
+
+    def part_length(self, part_number: int) -> int:
+        """Number of bytes expected for a part (the last one may be shorter)"""
+        if part_number < self.part_count:
+            return self.part_size
+        return self.size - self.part_size * (self.part_count - 1)
+
+
+def _marker_path(session: UploadSession, part_number: int) -> str:
+    return os.path.join(session.directory, "parts", str(part_number))
+
+
+def create_session(
+    folder: str, name: str, size: int, part_size: int
+) -> UploadSession:
+    """Creates a session with an empty (sparse) data file of the final size"""
+    upload_id = uuid.uuid4().hex
+    directory = os.path.join(folder, upload_id)
+    os.makedirs(os.path.join(directory, "parts"))
+    session = UploadSession(
+        upload_id, directory, name, size, part_size, time.time()
+    )
+    with open(session.data_path, "wb") as fh:
+        fh.truncate(size)
+    with open(os.path.join(directory, "session.json"), "w") as fh:
+        json.dump(
+            {
+                "name": name,
+                "size": size,
+                "part_size": part_size,
+                "created": session.created,
+            },
+            fh,
+        )
+    return session
+
+
+def load_session(folder: str, upload_id: str) -> UploadSession:
+    """Reads a session from disk
+
+    Raises:
+        UploadNotFoundException: No session with this ID
+    """
+    path = os.path.join(folder, upload_id, "session.json")
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id) or not os.path.exists(path):
+        raise UploadNotFoundException(
+            message=f"Upload {upload_id} could not be found!", data=None
+        )
+    with open(path) as fh:
+        stored = json.load(fh)
+    return UploadSession(
+        id=upload_id, directory=os.path.dirname(path), **stored
+    )
+
+
+@contextmanager
+def session_lock(session: UploadSession, exclusive: bool = False):
+    """Shared lock for writing parts, exclusive lock for committing
+
+    Raises:
+        UploadNotFoundException: The session was removed in the meantime
+    """
+    try:
+        fh = open(os.path.join(session.directory, "session.json"), "rb")
+    except FileNotFoundError:
+        raise UploadNotFoundException(
+            message=f"Upload {session.id} could not be found!", data=None
+        )
+    with fh:
+        fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            # committed or aborted while we were waiting for the lock
+            if not os.path.exists(fh.name):
+                raise UploadNotFoundException(
+                    message=f"Upload {session.id} could not be found!",
+                    data=None,
+                )
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def received_parts(session: UploadSession) -> Dict[int, dict]:
+    """Acknowledged parts, by part number"""
+    parts = {}
+    for entry in os.listdir(os.path.join(session.directory, "parts")):
+        if entry.isdigit():
+            with open(os.path.join(session.directory, "parts", entry)) as fh:
+                parts[int(entry)] = json.load(fh)
+    return parts
+
+
+def write_part(
+    session: UploadSession,
+    part_number: int,
+    stream: BinaryIO,
+    chunk_size: int = 1024 * 1024,
+) -> dict:
+    """Writes one part at its offset in the data file and acknowledges it
+
+    Sending a part again overwrites it, so retries are safe.
+
+    Args:
+        session: Session the part belongs to
+        part_number: One-based number of the part
+        stream: Binary stream with exactly the part's bytes
+
+    Returns:
+        The acknowledgement: `part_number`, `size` and `sha256` of the part
+
+    Raises:
+        InvalidMetadataException: Unknown part number or wrong part length
+        UploadNotFoundException: The session was committed or removed
+    """
+    if not 1 <= part_number <= session.part_count:
+        raise InvalidMetadataException(
+            message=f"Part number must be between 1 and {session.part_count}",
+            data=part_number,
+        )
+    expected = session.part_length(part_number)
+    offset = session.part_size * (part_number - 1)
+    digest, written = hashlib.sha256(), 0
+
+    marker = _marker_path(session, part_number)
+    with session_lock(session):
+        # a part that is being sent again is not acknowledged until it is
+        # complete once more
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+        fd = os.open(session.data_path, os.O_WRONLY)
+        try:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                if written + len(chunk) > expected:
+                    written = expected + 1
+                    break
+                digest.update(chunk)
+                view = memoryview(chunk)
+                while view:
+                    done = os.pwrite(fd, view, offset + written)
+                    view, written = view[done:], written + done
+            if written == expected:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        if written != expected:
+            raise InvalidMetadataException(
+                message=f"Part {part_number} must be exactly {expected} bytes",
+                data={"part_number": part_number, "expected": expected},
+            )
+
+        ack = {
+            "part_number": part_number,
+            "size": written,
+            "sha256": digest.hexdigest(),
+        }
+        staging = f"{marker}.{uuid.uuid4().hex}.tmp"
+        with open(staging, "w") as fh:
+            json.dump(ack, fh)
+        os.replace(staging, marker)
+    return ack
+
+
+def remove_session(session: UploadSession) -> None:
+    shutil.rmtree(session.directory, ignore_errors=True)
+
+
+def _last_active(directory: str) -> float:
+    # a new marker updates the mtime of `parts/`
+    return max(
+        os.path.getmtime(os.path.join(directory, "session.json")),
+        os.path.getmtime(os.path.join(directory, "parts")),
+    )
+
+
+def expire_sessions(folder: str, max_age: float) -> int:
+    """Removes sessions that saw no activity for `max_age` seconds
+
+    A session is only removed while holding its exclusive lock, like a
+    commit. Sessions whose lock is held (a part is being written or the
+    upload is being committed) are in use and skipped.
+
+    Returns:
+        The number of sessions removed
+    """
+    if not os.path.isdir(folder):
+        return 0
+    removed, cutoff = 0, time.time() - max_age
+    for entry in os.listdir(folder):
+        directory = os.path.join(folder, entry)
+        try:
+            if _last_active(directory) >= cutoff:
+                continue
+            fh = open(os.path.join(directory, "session.json"), "rb")
+        except OSError:
+            continue
+        with fh:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            try:
+                # a part may have been acknowledged before we got the lock
+                if _last_active(directory) < cutoff:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                pass
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+    return removed
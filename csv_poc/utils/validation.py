@@ -0,0 +1,311 @@
+"""Full-file validation of stored CSV files against their column types
+
+Column types are guessed from the first data row, and the statistics kept at
+ingest simply skip values that do not fit. Validation reads every row again
+and reports, per column, how many values contradict the column's type along
+with the first few rows holding them.
+
+The rows are split into record-aligned chunks using the row index (so no
+chunk starts in the middle of a quoted field) and the chunks are checked in
+a process pool. This happens in the background, after the upload has been
+answered: `BackgroundValidator` runs one validation at a time per web worker
+in a thread that hands the chunks to the pool. The report is stored next to
+the CSV file (`<path>.validation`) along with the content hash it was made
+for, so a report that predates an append is recognized as stale.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from flask import Flask, current_app
+
+from csv_poc.utils.file import iter_records, value_key
+from csv_poc.utils.row_index import indexed_rows, lookup_offsets
+
+VALIDATION_SUFFIX = ".validation"
+
+# column types that values can contradict
+CHECKED_TYPES = ("number", "datetime")
+
+
+def report_path(file_path: str) -> str:
+    """Location of the validation report for a given CSV file"""
+    return f"{file_path}{VALIDATION_SUFFIX}"
+
+
+class ChunkReport(NamedTuple):
+    """Result of `validate_chunk()`, one entry per column"""
+
+    violations: List[int]
+    # `(row number, byte offset)` of the first offending rows
+    examples: List[List[Tuple[int, int]]]
+
+
+def validate_chunk(
+    file_path: str,
+    col_types: Sequence[str],
+    offset: int,
+    first_row: int,
+    rows: int,
+    limit: int,
+) -> ChunkReport:
+    """Checks `rows` consecutive rows starting at byte `offset`
+
+    Runs in a worker process, so it only takes plain arguments.
+
+    Args:
+        file_path: Path of the CSV file
+        col_types: Type of every column
+        offset: Byte offset of the first row of the chunk
+        first_row: Row number of the first row of the chunk
+        rows: Number of rows in the chunk
+        limit: Examples kept per column
+    """
+    checked = [
+        (idx, col_type)
+        for idx, col_type in enumerate(col_types)
+        if col_type in CHECKED_TYPES
+    ]
+    violations = [0] * len(col_types)
+    examples = [[] for _ in col_types]
+    with open(file_path, "rb") as fh:
+        records = iter_records(fh, offset)
+        for row_number in range(first_row, first_row + rows):
+            record = next(records, None)
+            if record is None:
+                break
+            row_offset, row = record
+            for idx, col_type in checked:
+                if idx >= len(row):
+                    continue
+                value = row[idx]
+                if value == "" or value_key(col_type, value) is not None:
+                    continue
+                violations[idx] += 1
+                if len(examples[idx]) < limit:
+                    examples[idx].append((row_number, row_offset))
+    return ChunkReport(violations=violations, examples=examples)
+
+
+def chunk_bounds(
+    file_path: str, row_count: int, chunk_rows: int
+) -> List[Tuple[int, int, int]]:
+    """Splits the data rows into chunks of at most `chunk_rows` rows
+
+    Returns:
+        `(offset, first_row, rows)` for every chunk
+    """
+    row_count = min(row_count, indexed_rows(file_path))
+    starts = list(range(0, row_count, chunk_rows))
+    if not starts:
+        return []
+    offsets = lookup_offsets(file_path, starts)
+    return [
+        (offset, start, min(chunk_rows, row_count - start))
+        for offset, start in zip(offsets, starts)
+    ]
+
+
+def validate_file(
+    file_path: str,
+    columns: Sequence[Tuple[str, str]],
+    row_count: int,
+    content_hash: Optional[str],
+    executor: ProcessPoolExecutor = None,
+    chunk_rows: int = 100000,
+    limit: int = 10,
+) -> dict:
+    """Validates a whole file and stores the report next to it
+
+    Args:
+        file_path: Path of the CSV file
+        columns: `(col_name, col_type)` pairs in column order
+        row_count: Number of data rows to check
+        content_hash: Content hash of the file, stored with the report
+        executor: Pool the chunks are spread over; they are checked in this
+          process when omitted
+        chunk_rows: Rows per chunk
+        limit: Offending rows listed per column
+
+    Returns:
+        The report
+    """
+    started = time.perf_counter()
+    col_types = [col_type for _, col_type in columns]
+    bounds = chunk_bounds(file_path, row_count, chunk_rows)
+    args = [
+        (file_path, col_types, offset, first_row, rows, limit)
+        for offset, first_row, rows in bounds
+    ]
+    if executor is None:
+        chunks = [validate_chunk(*arg) for arg in args]
+    else:
+        futures = [executor.submit(validate_chunk, *arg) for arg in args]
+        chunks = [future.result() for future in futures]
+
+    report_columns = []
+    for idx, (col_name, col_type) in enumerate(columns):
+        # chunks are in file order, so the first examples come first
+        examples = [
+            example for chunk in chunks for example in chunk.examples[idx]
+        ][:limit]
+        report_columns.append(
+            {
+                "col_index": idx,
+                "col_name": col_name,
+                "col_type": col_type,
+                "violations": sum(chunk.violations[idx] for chunk in chunks),
+                "rows": [row for row, _ in examples],
+                "offsets": [offset for _, offset in examples],
+            }
+        )
+    report = {
+        "status": "complete",
+        "content_hash": content_hash,
+        "row_count": sum(rows for _, _, rows in bounds),
+        "valid": not any(column["violations"] for column in report_columns),
+        "duration": round(time.perf_counter() - started, 3),
+        "columns": report_columns,
+    }
+    write_report(file_path, report)
+    return report
+
+
+def write_report(file_path: str, report: dict) -> None:
+    """Replaces the stored report in one step"""
+    staging = f"{report_path(file_path)}.{os.getpid()}.tmp"
+    with open(staging, "w") as fh:
+        json.dump(report, fh)
+    os.replace(staging, report_path(file_path))
+
+
+def load_report(file_path: str) -> Optional[dict]:
+    """The stored report, None if the file has not been validated"""
+    try:
+        with open(report_path(file_path)) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+class BackgroundValidator(object):
+    """Validates files in the background, one at a time
+
+    Args:
+        app: Application whose logger is used
+        workers: Processes the chunks of a file are spread over (0: check
+          them in the background thread itself)
+        chunk_rows: Rows per chunk
+        limit: Offending rows listed per column
+    """
+
+    def __init__(self, app: Flask, workers: int, chunk_rows: int, limit: int):
+        self.app = app
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.limit = limit
+        self._thread = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="validation"
+        )
+        self._pool = None
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers and self._pool is None:
+            # forking a threaded web worker is not safe, so the pool's
+            # processes are forked from a clean server process instead
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return self._pool
+
+    def _run(self, file_path, columns, row_count, content_hash) -> dict:
+        with self.app.app_context():
+            try:
+                report = validate_file(
+                    file_path,
+                    columns,
+                    row_count,
+                    content_hash,
+                    executor=self._executor(),
+                    chunk_rows=self.chunk_rows,
+                    limit=self.limit,
+                )
+                self.app.logger.debug(
+                    f"Validated {file_path} in {report['duration']}s"
+                )
+                return report
+            except Exception as e:
+                self.app.logger.error(f"Validation of {file_path} failed: {e}")
+                report = {
+                    "status": "failed",
+                    "content_hash": content_hash,
+                    "error": str(e),
+                }
+                if os.path.exists(file_path):
+                    write_report(file_path, report)
+                return report
+
+    def is_pending(self, file_path: str) -> bool:
+        """Whether a validation of the file is queued or running"""
+        with self._lock:
+            future = self._pending.get(file_path)
+            return future is not None and not future.done()
+
+    def submit(
+        self,
+        file_path: str,
+        columns: Sequence[Tuple[str, str]],
+        row_count: int,
+        content_hash: Optional[str],
+    ) -> Future:
+        """Queues a validation, unless one of the file is already queued
+
+        See `validate_file()` for the arguments.
+        """
+        with self._lock:
+            future = self._pending.get(file_path)
+            if future is not None and not future.done():
+                return future
+            future = self._thread.submit(
+                self._run, file_path, list(columns), row_count, content_hash
+            )
+            self._pending[file_path] = future
+        # a future that is already done runs the callback right away, so it
+        # must not be added while holding the lock
+        future.add_done_callback(lambda done: self._forget(file_path, done))
+        return future
+
+    def _forget(self, file_path: str, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(file_path) is future:
+                del self._pending[file_path]
+
+    def wait(self, file_path: str, timeout: float = None) -> Optional[dict]:
+        """Waits for the queued validation of a file, if there is one"""
+        with self._lock:
+            future = self._pending.get(file_path)
+        return None if future is None else future.result(timeout)
+
+
+def background_validator() -> BackgroundValidator:
+    """The current app's validator, created from its config on first use"""
+    validator = current_app.extensions.get("validator")
+    if validator is None:
+        config = current_app.config
+        validator = current_app.extensions.setdefault(
+            "validator",
+            BackgroundValidator(
+                current_app._get_current_object(),
+                workers=config["VALIDATION_WORKERS"],
+                chunk_rows=config["VALIDATION_CHUNK_ROWS"],
+                limit=config["VALIDATION_EXAMPLES"],
+            ),
+        )
+    return validator
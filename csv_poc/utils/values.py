@@ -0,0 +1,21 @@
+"""Conversions of raw CSV values for JSON output"""
+
+
+def typed_value(col_type: str, value: str):
+    """Converts a raw CSV value for JSON output
+
+    Empty values become `None` and numbers become `int`/`float`. Dates are
+    kept as they appear in the file. Values that do not fit the column's type
+    are returned unchanged.
+    """
+    if value == "":
+        return None
+    if col_type == "number":
+        try:
+            number = float(value)
+        except ValueError:
+            return value
+        if number.is_integer() and "." not in value:
+            return int(number)
+        return number
+    return value
@@ -9,14 +9,30 @@ from csv_poc.extensions import db as _db
 TEST_DIR = Path(__file__).parent
 
 
+@pytest.fixture(scope="session")
+def storage(tmp_path_factory):
+    """Directory for everything the app stores on disk during a test run"""
+    return tmp_path_factory.mktemp("storage")
+
+
 @pytest.fixture(autouse=True)
-def app():
+def app(storage):
     """Creates an app instance to test with.
 
+    Uploads, upload sessions, cached results and ingest locks go to a
+    temporary directory of the test session, never into the repository.
+
     Yields:
         A Flask app instance inside a test context.
     """
     _app = create_app(config_obj="tests.testing_settings")
+    upload_folder = storage / "uploads"
+    _app.config.update(
+        UPLOAD_FOLDER=str(upload_folder),
+        UPLOAD_SESSION_FOLDER=str(upload_folder / ".sessions"),
+        RESULT_CACHE_FOLDER=str(upload_folder / ".cache"),
+        INGEST_LOCK_FOLDER=str(storage / "ingest_locks"),
+    )
 
     with _app.app_context():
         # _app.config.update(
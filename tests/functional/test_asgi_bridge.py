@@ -0,0 +1,91 @@
+"""Functional tests for serving the app through the ASGI bridge"""
+import asyncio
+import json
+import os
+
+from csv_poc.utils.asgi import AsyncWsgiBridge
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, "..", os.pardir)
+
+
+def call(bridge, method, path, body=b"", headers=None, chunk_size=64):
+    """Drives a single HTTP request through the bridge
+
+    The body is delivered in small chunks to mimic a slow client.
+    """
+    chunks = [
+        body[i : i + chunk_size] for i in range(0, len(body), chunk_size)
+    ] or [b""]
+    messages = [
+        {
+            "type": "http.request",
+            "body": chunk,
+            "more_body": i < len(chunks) - 1,
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [
+            (k.lower().encode(), v.encode()) for k, v in (headers or {}).items()
+        ],
+        "server": ("server", 80),
+    }
+    asyncio.run(bridge(scope, receive, send))
+    status = sent[0]["status"]
+    payload = b"".join(m.get("body", b"") for m in sent[1:])
+    return status, payload
+
+
+class TestAsyncWsgiBridge:
+    def test_get_file_list(self, app, db):
+        bridge = AsyncWsgiBridge(app, max_workers=2)
+        status, payload = call(bridge, "GET", "/api/v1/files")
+        assert status == 200
+        assert json.loads(payload) == []
+
+    def test_streamed_upload(self, app, db):
+        bridge = AsyncWsgiBridge(app, max_workers=2, spool_threshold=128)
+        with open(os.path.join(PROJECT_ROOT, "sample.csv"), "rb") as f:
+            content = f.read()
+        boundary = "testboundary"
+        body = (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; '
+            'filename="asgi_sample.csv"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        status, payload = call(
+            bridge,
+            "POST",
+            "/api/v1/files",
+            body=body,
+            headers={
+                "Content-Type": f"multipart/form-data; boundary={boundary}",
+                "Content-Length": str(len(body)),
+            },
+        )
+        assert status == 201
+        assert json.loads(payload)["name"] == "asgi_sample.csv"
+
+    def test_payload_too_large(self, app, db):
+        bridge = AsyncWsgiBridge(app, max_workers=2)
+        status, _ = call(
+            bridge,
+            "POST",
+            "/api/v1/files",
+            headers={"Content-Length": str(app.config["MAX_CONTENT_LENGTH"] + 1)},
+        )
+        assert status == 413
@@ -0,0 +1,51 @@
+"""Functional tests for the columns namespace"""
+from flask import url_for
+
+from csv_poc.database.models import Column, File
+
+
+class TestColumnSearch:
+    def create_files(self):
+        for n, names in enumerate((["Investment", "year"], ["investor_id"])):
+            file = File.create(name=f"file{n}.csv", path=f"path{n}")
+            for idx, col_name in enumerate(names):
+                Column.create(col_index=idx, col_name=col_name, file_id=file.id)
+
+    def test_prefix_search(self, app, db, client):
+        self.create_files()
+        response = client.get(
+            url_for("api_v1.column_search"), query_string={"name": "invest*"}
+        )
+        assert response.status_code == 200
+        assert response.get_json() == [
+            {
+                "file_id": 1,
+                "file_name": "file0.csv",
+                "col_index": 0,
+                "col_name": "Investment",
+                "col_type": "text",
+            },
+            {
+                "file_id": 2,
+                "file_name": "file1.csv",
+                "col_index": 0,
+                "col_name": "investor_id",
+                "col_type": "text",
+            },
+        ]
+
+    def test_exact_name(self, app, db, client):
+        self.create_files()
+        response = client.get(
+            url_for("api_v1.column_search"), query_string={"name": "YEAR"}
+        )
+        assert response.status_code == 200
+        assert [c["file_id"] for c in response.get_json()] == [1]
+
+    def test_only_prefix_patterns(self, app, db, client):
+        for name in ("*vest", "in*st*", "*"):
+            response = client.get(
+                url_for("api_v1.column_search"), query_string={"name": name}
+            )
+            assert response.status_code == 400
+            assert response.get_json()["data"] == name
@@ -0,0 +1,64 @@
+"""Functional tests for the custom CLI commands"""
+import os
+
+from csv_poc.api.v1.files_dao import FileDAO
+from csv_poc.database.models import Column, File
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, "..", os.pardir)
+
+
+class TestImportDir:
+    def make_tree(self, root):
+        with open(os.path.join(PROJECT_ROOT, "sample.csv"), "rb") as f:
+            content = f.read()
+        (root / "2021").mkdir()
+        (root / "2021" / "jan.csv").write_bytes(content)
+        (root / "feb.csv").write_bytes(content)
+        (root / "notes.txt").write_text("not a csv")
+
+    def test_import_and_skip_unchanged(self, app, db, runner, tmp_path):
+        source = tmp_path / "source"
+        source.mkdir()
+        self.make_tree(source)
+
+        result = runner.invoke(args=["import-dir", str(source), "-w", "2"])
+        assert result.exit_code == 0, result.output
+        assert "Imported 2, replaced 0, unchanged 0, failed 0" in result.output
+        names = sorted(file.name for file in File.query.all())
+        assert names == ["2021_jan.csv", "feb.csv"]
+        assert Column.query.count() == 14
+        assert all(file.row_count == 4 for file in File.query.all())
+        assert all(file.column_count == 7 for file in File.query.all())
+
+        result = runner.invoke(args=["import-dir", str(source), "-w", "2"])
+        assert "Imported 0, replaced 0, unchanged 2, failed 0" in result.output
+
+    def test_replace_changed_file(self, app, db, runner, tmp_path):
+        source = tmp_path / "source"
+        source.mkdir()
+        self.make_tree(source)
+        runner.invoke(args=["import-dir", str(source), "-w", "1"])
+
+        (source / "feb.csv").write_text("a,b\n1,2\n")
+        result = runner.invoke(args=["import-dir", str(source), "-w", "1"])
+        assert "Imported 0, replaced 1, unchanged 1, failed 0" in result.output
+        file = File.query.filter_by(name="feb.csv").one()
+        assert file.row_count == 1
+        assert [c.col_name for c in file.columns] == ["a", "b"]
+
+    def test_imported_files_can_be_queried(self, app, db, runner, tmp_path):
+        assert app.config["SQL_TABLES"]
+        source = tmp_path / "source"
+        source.mkdir()
+        self.make_tree(source)
+        runner.invoke(args=["import-dir", str(source), "-w", "2"])
+        file = File.query.filter_by(name="feb.csv").one()
+        rows = FileDAO.query_file(file.id, "SELECT count(*) FROM data")["rows"]
+        assert rows == [[4]]
+
+        # replacing the file keeps a table, holding the new content
+        (source / "feb.csv").write_text("a,b\n1,2\n")
+        runner.invoke(args=["import-dir", str(source), "-w", "2"])
+        rows = FileDAO.query_file(file.id, "SELECT a, b FROM data")["rows"]
+        assert rows == [[1, 2]]
@@ -0,0 +1,59 @@
+"""Functional tests for the debug namespace"""
+import os
+import tracemalloc
+
+from flask import url_for
+
+from csv_poc.app import create_app
+from csv_poc.extensions import db as _db
+from tests import testing_settings
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, "..", os.pardir)
+
+
+class TestMemoryProfiling:
+    def test_disabled_by_default(self, app, db, client):
+        response = client.get(url_for("api_v1.debug_memory"))
+        assert response.status_code == 404
+
+    def test_upload_phases_are_profiled(self, tmp_path):
+        config = {
+            key: getattr(testing_settings, key)
+            for key in dir(testing_settings)
+            if key.isupper()
+        }
+        config.update(MEMORY_PROFILING=True, UPLOAD_FOLDER=str(tmp_path))
+        app = create_app(type("ProfilingConfig", (), config))
+        try:
+            with app.app_context():
+                _db.create_all()
+                client = app.test_client()
+                with open(os.path.join(PROJECT_ROOT, "sample.csv"), "rb") as f:
+                    response = client.post(
+                        url_for("api_v1.get_file_list"),
+                        data={"file": f},
+                        content_type="multipart/form-data",
+                    )
+                assert response.status_code == 201
+
+                response = client.get(
+                    url_for("api_v1.debug_memory"), query_string={"limit": 10}
+                )
+                assert response.status_code == 200
+                records = response.get_json()
+                phases = [r["name"] for r in records if r["kind"] == "phase"]
+                assert phases[-4:] == [
+                    "save",
+                    "parse_columns",
+                    "commit",
+                    "to_dict",
+                ]
+                upload = [r for r in records if r["kind"] == "request"][-1]
+                assert upload["name"] == "POST /api/v1/files"
+                assert upload["peak_bytes"] >= max(
+                    r["peak_bytes"] for r in records if r["kind"] == "phase"
+                )
+                _db.drop_all()
+        finally:
+            tracemalloc.stop()
@@ -1,8 +1,13 @@
+import io
+import json
+
 from flask import url_for
 import mock
 import os
+import shutil
 
 from csv_poc.database.models import File
+from csv_poc.utils.admission import ingest_gate
 from csv_poc.utils.exc import DatabaseOpsException
 
 HERE = os.path.abspath(os.path.dirname(__file__))
@@ -166,3 +171,504 @@ class TestFileNamespace:
             resp_json = response.get_json()
             assert response.status_code == 400
             assert resp_json["message"] is not None
+
+    def test_upload_file_ragged(self, app, db, client, tmp_path):
+        app.config["UPLOAD_FOLDER"] = str(tmp_path)
+        response = client.post(
+            url_for("api_v1.get_file_list"),
+            data={"file": (io.BytesIO(b"a,b\n1,2\n3\n"), "ragged.csv")},
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 400
+        message = response.get_json()["message"]
+        assert message == "Row 2 has 1 fields, expected 2"
+        # neither a row nor anything on disk is kept
+        assert File.query.filter_by(name="ragged.csv").count() == 0
+        assert os.listdir(tmp_path) == []
+
+    def test_append_rows(self, app, db, client):
+        file_path = os.path.join(PROJECT_ROOT, "sample.csv")
+        with open(file_path, "rb") as file:
+            response = client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": file},
+                content_type="multipart/form-data",
+            )
+        file_id = response.get_json()["id"]
+        response = client.post(
+            url_for("api_v1.file_rows", file_id=file_id),
+            data=b"3/1/2019,3/2/2019,Events,External,Service,7,100\n",
+            content_type="text/csv",
+        )
+        assert response.status_code == 200
+        assert response.get_json()["row_count"] == 5
+
+    def test_append_rows_missing_file(self, app, db, client):
+        response = client.post(
+            url_for("api_v1.file_rows", file_id=100),
+            data=b"1,2\n",
+            content_type="text/csv",
+        )
+        assert response.status_code == 404
+
+    def upload_sample(self, client):
+        file_path = os.path.join(PROJECT_ROOT, "sample.csv")
+        with open(file_path, "rb") as file:
+            response = client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": file},
+                content_type="multipart/form-data",
+            )
+        return response.get_json()["id"]
+
+    def test_sorted_rows(self, app, db, client):
+        file_id = self.upload_sample(client)
+        url = url_for("api_v1.file_rows", file_id=file_id)
+        response = client.get(
+            url, query_string={"sort": "Start Date:desc", "per_page": 3}
+        )
+        assert response.status_code == 200
+        page = response.get_json()
+        assert (page["sort"], page["row_count"]) == ("Start Date:desc", 4)
+        assert [row["row"] for row in page["rows"]] == [3, 2, 0]
+        assert page["rows"][0]["values"]["Pay Type"] == "Passive sponsorship"
+        response = client.get(
+            url,
+            query_string={"sort": "Start Date:desc", "per_page": 3, "page": 2},
+        )
+        assert [row["row"] for row in response.get_json()["rows"]] == [1]
+
+        # appended rows are part of the next sort
+        client.post(
+            url,
+            data=b"1/1/2019,3/2/2019,Events,External,Service,7,100\n",
+            content_type="text/csv",
+        )
+        response = client.get(url, query_string={"sort": "Start Date:desc"})
+        assert [row["row"] for row in response.get_json()["rows"]] == [
+            4,
+            3,
+            2,
+            0,
+            1,
+        ]
+        # unsorted rows come in file order
+        response = client.get(url, query_string={"page": 2, "per_page": 2})
+        assert [row["row"] for row in response.get_json()["rows"]] == [2, 3]
+
+    def test_sorted_rows_invalid(self, app, db, client):
+        file_id = self.upload_sample(client)
+        url = url_for("api_v1.file_rows", file_id=file_id)
+        response = client.get(url, query_string={"sort": "Missing:desc"})
+        assert response.status_code == 400
+        response = client.get(url, query_string={"page": 5})
+        assert response.status_code == 404
+        response = client.get(
+            url_for("api_v1.file_rows", file_id=12345),
+            query_string={"sort": "Tactic"},
+        )
+        assert response.status_code == 404
+
+    def test_export_projected_ndjson(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_export", file_id=file_id),
+            query_string={"columns": "Tactic,Pay Type", "format": "ndjson"},
+        )
+        assert response.status_code == 200
+        assert response.is_streamed
+        lines = response.get_data(as_text=True).splitlines()
+        assert len(lines) == 4
+        assert json.loads(lines[0]) == {"Tactic": "Events", "Pay Type": "Service"}
+
+    def test_export_csv(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_export", file_id=file_id),
+            query_string={"columns": "Attendance"},
+        )
+        assert response.mimetype == "text/csv"
+        assert response.get_data(as_text=True).split() == [
+            "Attendance",
+            "15",
+            "65",
+            "10",
+            "75",
+        ]
+
+    def test_export_unknown_column(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_export", file_id=file_id),
+            query_string={"columns": "nope", "format": "json"},
+        )
+        assert response.status_code == 400
+        assert response.get_json()["data"] == ["nope"]
+
+    def test_search_file(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_search", file_id=file_id),
+            query_string={"q": "sponsorship"},
+        )
+        assert response.status_code == 200
+        rows = response.get_json()["rows"]
+        assert [row["row"] for row in rows] == [1, 3]
+        assert rows[0]["values"]["Pay Type"] == "Sponsorship"
+        assert rows[1]["values"]["Attendance"] == "75"
+
+    def test_search_invalid_query(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_search", file_id=file_id),
+            query_string={"q": '"unbalanced'},
+        )
+        assert response.status_code == 400
+
+    def test_search_invalid_limit(self, app, db, client):
+        file_id = self.upload_sample(client)
+        for limit in (-1, 0, 1001):
+            response = client.get(
+                url_for("api_v1.file_search", file_id=file_id),
+                query_string={"q": "sponsorship", "limit": limit},
+            )
+            assert response.status_code == 400
+
+    def test_column_values(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for(
+                "api_v1.column_values", file_id=file_id, col_name="Pay Type"
+            )
+        )
+        assert response.status_code == 200
+        resp_json = response.get_json()
+        assert resp_json["encoded"] is True
+        assert resp_json["values"][0] == {"value": "Service", "count": 2}
+
+    def test_column_values_cached_until_append(self, app, db, client):
+        file_id = self.upload_sample(client)
+        url = url_for(
+            "api_v1.column_values", file_id=file_id, col_name="Pay Type"
+        )
+        first = client.get(url).get_json()
+        assert client.get(url).get_json() == first
+
+        prefix = File.get_by_id(file_id).content_hash[:16]
+
+        def entries():
+            folder = app.config["RESULT_CACHE_FOLDER"]
+            return [name for name in os.listdir(folder) if prefix in name]
+
+        assert entries()
+        client.post(
+            url_for("api_v1.file_rows", file_id=file_id),
+            data=b"3/1/2019,3/2/2019,Events,External,Service,7,100\n",
+            content_type="text/csv",
+        )
+        assert not entries()
+        values = client.get(url).get_json()["values"]
+        assert values[0] == {"value": "Service", "count": 3}
+
+    def test_column_values_not_encoded(self, app, db, client):
+        # Attendance has 4 distinct values and overflows the dictionary
+        app.config["DICTIONARY_MAX_VALUES"] = 3
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for(
+                "api_v1.column_values", file_id=file_id, col_name="Attendance"
+            )
+        )
+        assert response.get_json()["encoded"] is False
+        assert len(response.get_json()["values"]) == 4
+
+    def test_export_filtered(self, app, db, client):
+        file_id = self.upload_sample(client)
+        for columns in ("Tactic,Pay Type", "Attendance"):
+            response = client.get(
+                url_for("api_v1.file_export", file_id=file_id),
+                query_string={
+                    "columns": columns,
+                    "where": "Pay Type=Service",
+                    "format": "json",
+                },
+            )
+            assert response.status_code == 200
+            assert len(response.get_json()) == 2
+
+    def test_sample_file(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_sample", file_id=file_id),
+            query_string={"n": 2},
+        )
+        assert response.status_code == 200
+        resp_json = response.get_json()
+        assert resp_json["row_count"] == 4
+        assert len(resp_json["rows"]) == 2
+        assert set(resp_json["rows"][0]["values"]) == {
+            "Start Date",
+            "End Date",
+            "Tactic",
+            "Event Type",
+            "Pay Type",
+            "Attendance",
+            "Investment",
+        }
+
+    def test_column_values_approximate(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for(
+                "api_v1.column_values", file_id=file_id, col_name="Pay Type"
+            ),
+            query_string={"approximate": "true"},
+        )
+        resp_json = response.get_json()
+        assert resp_json["approximate"] is True
+        assert resp_json["sample_size"] == 4
+        assert resp_json["values"][0] == {
+            "value": "Service",
+            "count": 2,
+            "error": 0.0,
+        }
+
+    def test_get_file_with_preview(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.get_file", file_id=file_id),
+            query_string={"include": "preview"},
+        )
+        assert response.status_code == 200
+        resp_json = response.get_json()
+        assert resp_json["id"] == file_id
+        assert len(resp_json["columns"]) == 7
+        assert len(resp_json["preview"]) == 4
+        assert resp_json["preview"][0]["Tactic"] == "Events"
+
+    def test_preview_includes_appended_rows(self, app, db, client):
+        file_id = self.upload_sample(client)
+        client.post(
+            url_for("api_v1.file_rows", file_id=file_id),
+            data=b"3/1/2019,3/2/2019,Print,External,Service,7,\n",
+            content_type="text/csv",
+        )
+        response = client.get(
+            url_for("api_v1.get_file", file_id=file_id),
+            query_string={"include": "preview"},
+        )
+        preview = response.get_json()["preview"]
+        assert len(preview) == 5
+        assert preview[-1]["Tactic"] == "Print"
+        assert preview[-1]["Investment"] is None
+
+    def test_get_file_unknown_include(self, app, db, client):
+        response = client.get(
+            url_for("api_v1.get_file", file_id=1),
+            query_string={"include": "nope"},
+        )
+        assert response.status_code == 400
+
+    def test_join_files(self, app, db, client, tmp_path):
+        app.config["UPLOAD_FOLDER"] = str(tmp_path / "uploads")
+        file_id = self.upload_sample(client)
+        tactics = tmp_path / "tactics.csv"
+        tactics.write_text("Tactic,Owner\nEvents,Marketing\nDigital,Web\n")
+        with open(tactics, "rb") as file:
+            response = client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": (file, "tactics.csv")},
+                content_type="multipart/form-data",
+            )
+        other_id = response.get_json()["id"]
+
+        response = client.get(
+            url_for("api_v1.file_join", file_id=other_id, other_id=file_id),
+            query_string={"on": "Tactic", "how": "left", "format": "json"},
+        )
+        assert response.status_code == 200
+        rows = response.get_json()
+        assert len(rows) == 5
+        assert {"Tactic": "Digital", "Owner": "Web"}.items() <= rows[-1].items()
+        assert rows[-1]["Pay Type"] is None
+
+        response = client.get(
+            url_for("api_v1.file_join", file_id=file_id, other_id=other_id),
+            query_string={"on": "Pay Type", "other_on": "Tactic"},
+        )
+        assert response.status_code == 200
+        assert response.get_data() == b""
+
+        for file in File.query.filter(File.id.in_([file_id, other_id])):
+            for column in file.columns:
+                column.delete(commit=False)
+            file.delete(commit=False)
+        db.session.commit()
+        shutil.rmtree(app.config["UPLOAD_FOLDER"])
+
+    def test_join_unknown_column(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.file_join", file_id=file_id, other_id=file_id),
+            query_string={"on": "nope"},
+        )
+        assert response.status_code == 400
+
+    def test_column_histogram(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for(
+                "api_v1.column_histogram",
+                file_id=file_id,
+                col_name="Start Date",
+            ),
+            query_string={"bins": 2, "method": "quantile"},
+        )
+        assert response.status_code == 200
+        resp_json = response.get_json()
+        assert resp_json["column"] == "Start Date"
+        assert resp_json["count"] == 4
+        assert resp_json["bins"][0]["start"] == "2017-02-01"
+        assert sum(b["count"] for b in resp_json["bins"]) == 4
+
+    def test_column_histogram_text_column(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for(
+                "api_v1.column_histogram", file_id=file_id, col_name="Tactic"
+            )
+        )
+        assert response.status_code == 400
+
+    def test_numeric_columns(self, app, db, client):
+        file_id = self.upload_sample(client)
+        detail = client.get(url_for("api_v1.get_file", file_id=file_id))
+        columns = detail.get_json()["columns"]
+        types = {c["col_name"]: c["col_type"] for c in columns}
+        assert types["Attendance"] == types["Investment"] == "number"
+
+        # sorted by value, not as text ("10000" < "3567" as strings)
+        url = url_for("api_v1.file_rows", file_id=file_id)
+        client.post(
+            url,
+            data=b"1/1/2019,3/2/2019,Events,External,Service,7,10000\n",
+            content_type="text/csv",
+        )
+        response = client.get(url, query_string={"sort": "Investment:desc"})
+        assert [row["row"] for row in response.get_json()["rows"]] == [
+            4,
+            3,
+            2,
+            1,
+            0,
+        ]
+
+        response = client.get(
+            url_for(
+                "api_v1.column_histogram",
+                file_id=file_id,
+                col_name="Investment",
+            ),
+            query_string={"bins": 2},
+        )
+        assert response.status_code == 200
+        assert [b["count"] for b in response.get_json()["bins"]] == [4, 1]
+
+    def test_upload_turned_away_when_busy(self, app, db, client):
+        app.config.update(INGEST_MAX_CONCURRENT=1, INGEST_QUEUE_SIZE=0)
+        with ingest_gate().slot():
+            file_path = os.path.join(PROJECT_ROOT, "sample.csv")
+            with open(file_path, "rb") as file:
+                response = client.post(
+                    url_for("api_v1.get_file_list"),
+                    data={"file": file},
+                    content_type="multipart/form-data",
+                )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "10"
+        assert File.query.count() == 0
+        # accepted again once the running ingest is done
+        assert self.upload_sample(client) == 1
+
+    def test_batch_schemas(self, app, db, client):
+        first = self.upload_sample(client)
+        second = File.create(name="empty.csv", path="empty.csv").id
+        response = client.get(
+            url_for("api_v1.get_file_list"),
+            query_string={
+                "ids": f"{second},999,{first},{second}",
+                "include": "columns",
+            },
+        )
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [f["id"] for f in data] == [second, first]
+        assert data[0]["columns"] == []
+        detail = client.get(url_for("api_v1.get_file", file_id=first))
+        assert data[1] == detail.get_json()
+
+    def test_batch_without_columns(self, app, db, client):
+        file_id = self.upload_sample(client)
+        response = client.get(
+            url_for("api_v1.get_file_list"), query_string={"ids": str(file_id)}
+        )
+        data = response.get_json()
+        assert [f["id"] for f in data] == [file_id]
+        assert set(data[0]) == {
+            "id",
+            "name",
+            "row_count",
+            "byte_size",
+            "column_count",
+        }
+
+    def test_file_sizes(self, app, db, client):
+        file_id = self.upload_sample(client)
+        expected = {"row_count": 4, "byte_size": 297, "column_count": 7}
+        listed = client.get(url_for("api_v1.get_file_list")).get_json()
+        detail = client.get(url_for("api_v1.get_file", file_id=file_id))
+        for data in (listed[0], detail.get_json()):
+            assert {key: data[key] for key in expected} == expected
+
+    def test_batch_invalid_ids(self, app, db, client):
+        response = client.get(
+            url_for("api_v1.get_file_list"), query_string={"ids": "1,two"}
+        )
+        assert response.status_code == 400
+
+    def test_files_with_same_schema(self, app, db, client, tmp_path):
+        first = self.upload_sample(client)
+        other = tmp_path / "other_layout.csv"
+        other.write_text("Tactic,Investment\nEvents,1\n")
+        with open(other, "rb") as fh:
+            client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": (fh, "other_layout.csv")},
+                content_type="multipart/form-data",
+            )
+        copy = tmp_path / "copy.csv"
+        with open(os.path.join(PROJECT_ROOT, "sample.csv"), "rb") as fh:
+            copy.write_bytes(fh.read())
+        with open(copy, "rb") as fh:
+            second = client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": (fh, "copy.csv")},
+                content_type="multipart/form-data",
+            ).get_json()
+
+        response = client.get(
+            url_for("api_v1.get_file_list"), query_string={"schema_of": first}
+        )
+        assert response.status_code == 200
+        assert [f["id"] for f in response.get_json()] == [first, second["id"]]
+
+        response = client.get(
+            url_for("api_v1.get_file_list"),
+            query_string={"fingerprint": second["schema_fingerprint"]},
+        )
+        assert [f["id"] for f in response.get_json()] == [first, second["id"]]
+
+        response = client.get(
+            url_for("api_v1.get_file_list"), query_string={"schema_of": 999}
+        )
+        assert response.status_code == 404
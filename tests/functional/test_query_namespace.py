@@ -0,0 +1,71 @@
+"""Functional tests for SQL queries against stored files"""
+from flask import url_for
+
+
+class TestFileQuery:
+    def upload(self, client, tmp_path, name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        with open(path, "rb") as fh:
+            return client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": (fh, name)},
+                content_type="multipart/form-data",
+            ).get_json()
+
+    def test_query(self, app, db, client, tmp_path):
+        data = self.upload(
+            client,
+            tmp_path,
+            "query.csv",
+            "Tactic,Investment\nEvents,10\nEvents,5\nWeb,1\n",
+        )
+        url = url_for("api_v1.file_query", file_id=data["id"])
+        response = client.post(
+            url,
+            json={
+                "sql": 'SELECT "Tactic", count(*) AS n FROM data '
+                "WHERE _row >= ? GROUP BY 1 ORDER BY 1",
+                "params": [0],
+            },
+        )
+        assert response.status_code == 200
+        assert response.get_json() == {
+            "columns": ["Tactic", "n"],
+            "rows": [["Events", 2], ["Web", 1]],
+            "truncated": False,
+        }
+
+        # appended rows are added to the table
+        client.post(
+            url_for("api_v1.file_rows", file_id=data["id"]),
+            data="Print,7\n",
+            content_type="text/csv",
+        )
+        response = client.post(
+            url, json={"sql": "SELECT _row, Tactic FROM data", "limit": 2}
+        )
+        assert response.get_json()["rows"] == [[0, "Events"], [1, "Events"]]
+        assert response.get_json()["truncated"] is True
+        response = client.post(url, json={"sql": "SELECT count(*) FROM data"})
+        assert response.get_json()["rows"] == [[4]]
+
+    def test_invalid_query(self, app, db, client, tmp_path):
+        data = self.upload(client, tmp_path, "invalid.csv", "a,b\n1,2\n")
+        url = url_for("api_v1.file_query", file_id=data["id"])
+        for body in (
+            {"sql": "DELETE FROM data"},
+            {"sql": "SELECT missing FROM data"},
+            {"sql": "SELECT a FROM data", "limit": 1000},
+        ):
+            assert client.post(url, json=body).status_code == 400
+        assert client.post(url, json={"sql": "SELECT a FROM data"}).get_json()[
+            "rows"
+        ] == [[1]]
+
+    def test_unknown_file(self, app, db, client):
+        response = client.post(
+            url_for("api_v1.file_query", file_id=12345),
+            json={"sql": "SELECT 1"},
+        )
+        assert response.status_code == 404
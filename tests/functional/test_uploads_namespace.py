@@ -0,0 +1,107 @@
+"""Functional tests for resumable uploads"""
+import os
+
+from flask import url_for
+
+from csv_poc.database.models import File
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+PROJECT_ROOT = os.path.join(HERE, "..", os.pardir)
+
+
+class TestUploadNamespace:
+    def sample(self):
+        with open(os.path.join(PROJECT_ROOT, "sample.csv"), "rb") as fh:
+            return fh.read()
+
+    def open_upload(self, client, content, part_size=128):
+        response = client.post(
+            url_for("api_v1.uploads"),
+            json={
+                "name": "parts.csv",
+                "size": len(content),
+                "part_size": part_size,
+            },
+        )
+        assert response.status_code == 201
+        return response.get_json()
+
+    def put_part(self, client, upload, content, n):
+        start = (n - 1) * upload["part_size"]
+        return client.put(
+            url_for(
+                "api_v1.upload_part", upload_id=upload["id"], part_number=n
+            ),
+            data=content[start : start + upload["part_size"]],
+            content_type="application/octet-stream",
+        )
+
+    def test_upload_in_parts_and_commit(self, app, db, client):
+        content = self.sample()
+        upload = self.open_upload(client, content)
+        assert upload["missing"] == list(range(1, upload["part_count"] + 1))
+
+        # every part but the first, newest first
+        for n in range(upload["part_count"], 1, -1):
+            assert self.put_part(client, upload, content, n).status_code == 200
+
+        response = client.post(
+            url_for("api_v1.upload_commit", upload_id=upload["id"])
+        )
+        assert response.status_code == 409
+        assert response.get_json()["data"] == {"missing": [1]}
+
+        # resume: ask what is missing, send it, commit
+        status = client.get(url_for("api_v1.upload", upload_id=upload["id"]))
+        assert status.get_json()["missing"] == [1]
+        assert self.put_part(client, upload, content, 1).status_code == 200
+        response = client.post(
+            url_for("api_v1.upload_commit", upload_id=upload["id"])
+        )
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data["name"] == "parts.csv"
+        assert [c["col_name"] for c in data["columns"]][:2] == [
+            "Start Date",
+            "End Date",
+        ]
+        with open(data["path"], "rb") as fh:
+            assert fh.read() == content
+        assert File.get_by_id(data["id"]).byte_size == len(content)
+
+        # the session is gone once committed
+        status = client.get(url_for("api_v1.upload", upload_id=upload["id"]))
+        assert status.status_code == 404
+
+    def test_wrong_part_length(self, app, db, client):
+        content = self.sample()
+        upload = self.open_upload(client, content)
+        response = client.put(
+            url_for(
+                "api_v1.upload_part", upload_id=upload["id"], part_number=1
+            ),
+            data=b"too short",
+        )
+        assert response.status_code == 400
+        assert response.get_json()["data"]["expected"] == 128
+
+    def test_open_upload_validation(self, app, db, client):
+        response = client.post(
+            url_for("api_v1.uploads"), json={"name": "parts.txt", "size": 10}
+        )
+        assert response.status_code == 400
+        response = client.post(
+            url_for("api_v1.uploads"),
+            json={
+                "name": "parts.csv",
+                "size": app.config["UPLOAD_MAX_SIZE"] + 1,
+            },
+        )
+        assert response.status_code == 400
+
+    def test_abort_upload(self, app, db, client):
+        upload = self.open_upload(client, self.sample())
+        url = url_for("api_v1.upload", upload_id=upload["id"])
+        assert client.delete(url).status_code == 204
+        assert client.get(url).status_code == 404
+        assert client.delete(url).status_code == 404
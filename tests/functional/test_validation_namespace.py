@@ -0,0 +1,63 @@
+"""Functional tests for the validation report of stored files"""
+from flask import url_for
+
+from csv_poc.database.models import File
+from csv_poc.utils.validation import background_validator
+
+
+class TestFileValidation:
+    def upload(self, client, tmp_path, name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        with open(path, "rb") as fh:
+            return client.post(
+                url_for("api_v1.get_file_list"),
+                data={"file": (fh, name)},
+                content_type="multipart/form-data",
+            ).get_json()
+
+    def test_validated_after_upload(self, app, db, client, tmp_path):
+        data = self.upload(
+            client,
+            tmp_path,
+            "validated.csv",
+            "Start Date,Tactic\n2/1/2017,Events\nsoon,Events\n3/1/2017,Ads\n",
+        )
+        background_validator().wait(data["path"], timeout=10)
+        response = client.get(
+            url_for("api_v1.file_validation", file_id=data["id"])
+        )
+        assert response.status_code == 200
+        report = response.get_json()
+        assert (report["status"], report["valid"]) == ("complete", False)
+        assert report["row_count"] == 3
+        assert report["columns"][0]["violations"] == 1
+        assert report["columns"][0]["rows"] == [1]
+
+        # appending makes the report outdated until validated again
+        client.post(
+            url_for("api_v1.file_rows", file_id=data["id"]),
+            data="4/1/2017,Events\n",
+            content_type="text/csv",
+        )
+        background_validator().wait(data["path"], timeout=10)
+        report = client.get(
+            url_for("api_v1.file_validation", file_id=data["id"])
+        ).get_json()
+        assert report["row_count"] == 4
+        assert report["columns"][0]["rows"] == [1]
+
+    def test_missing_report_is_queued(self, app, db, client, tmp_path):
+        path = tmp_path / "imported.csv"
+        path.write_text("a,b\n1,2\n")
+        file = File.create(name="imported.csv", path=str(path))
+        url = url_for("api_v1.file_validation", file_id=file.id)
+        response = client.get(url)
+        assert response.status_code == 202
+        assert response.get_json()["status"] == "pending"
+        background_validator().wait(str(path), timeout=10)
+        assert client.get(url).status_code == 200
+
+    def test_unknown_file(self, app, db, client):
+        response = client.get(url_for("api_v1.file_validation", file_id=99))
+        assert response.status_code == 404
@@ -1,5 +1,6 @@
 """Configuration for testing"""
 import os
+import tempfile
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 PROJECT_ROOT = os.path.join(HERE, os.pardir)
@@ -7,17 +8,52 @@ TEST_PATH = os.path.join(PROJECT_ROOT, "tests")
 
 TESTING = True
 DEBUG = False
-UPLOAD_FOLDER = os.path.join(PROJECT_ROOT, "tmp/uploads")
+# the `app` fixture moves the folders below into the test session's temporary
+# directory
+STORAGE = os.path.join(tempfile.gettempdir(), "csv_poc_tests")
+UPLOAD_FOLDER = os.path.join(STORAGE, "uploads")
 ALLOWED_EXTENSIONS = {"csv"}
 MAX_CONTENT_LENGTH = 16 * 1000 * 1000
+FULL_TEXT_SEARCH = True
+DICTIONARY_MAX_VALUES = 256
+SAMPLE_SIZE = 1000
+PREVIEW_ROWS = 50
+JOIN_MEMORY_BUDGET = 64 * 1024 * 1024
+SORT_MEMORY_BUDGET = 512
+RESULT_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, ".cache")
+RESULT_CACHE_MAX_BYTES = 1024 * 1024
+SQL_TABLES = True
+SQL_TABLE_MAX_INDEXES = 32
+SQL_QUERY_MAX_ROWS = 100
+SQL_QUERY_TIMEOUT = 1.0
+UPLOAD_SESSION_FOLDER = os.path.join(UPLOAD_FOLDER, ".sessions")
+UPLOAD_MAX_SIZE = 1024 * 1024
+UPLOAD_PART_SIZE = 64 * 1024
+UPLOAD_MAX_PARTS = 100
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+INGEST_MAX_CONCURRENT = 2
+INGEST_MAX_CONCURRENT_HOST = 0
+INGEST_LOCK_FOLDER = os.path.join(STORAGE, "ingest_locks")
+INGEST_QUEUE_SIZE = 4
+INGEST_QUEUE_TIMEOUT = 30
+INGEST_RETRY_AFTER = 10
+VALIDATION_WORKERS = 0
+VALIDATION_CHUNK_ROWS = 2
+VALIDATION_EXAMPLES = 3
 SERVER_NAME = "server"
+LAZY_STARTUP = False
 
 # Database Settings
 SQLALCHEMY_DATABASE_URI = "sqlite://"
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+SQLITE_JOURNAL_MODE = "WAL"
+SQLITE_SYNCHRONOUS = "NORMAL"
+SQLITE_BUSY_TIMEOUT = 5000
+SQLITE_MMAP_SIZE = 0
 
 # Logging
 LOG_TO_STDOUT = True
+MEMORY_PROFILING = False
 
 # Swagger / RestX Settings
 SWAGGER_UI_DOC_EXPANSION = "list"
@@ -0,0 +1,75 @@
+"""Unit tests for ingest admission control"""
+import threading
+
+import pytest
+
+from csv_poc.utils.admission import IngestGate
+from csv_poc.utils.exc import IngestBusyException
+
+
+def make_gate(tmp_path, **kwargs):
+    settings = dict(
+        per_worker=1,
+        per_host=0,
+        lock_folder=str(tmp_path),
+        queue_size=0,
+        timeout=5,
+        retry_after=7,
+    )
+    settings.update(kwargs)
+    return IngestGate(**settings)
+
+
+class TestIngestGate:
+    def test_turned_away_when_queue_full(self, tmp_path):
+        gate = make_gate(tmp_path)
+        with gate.slot():
+            with pytest.raises(IngestBusyException) as busy:
+                with gate.slot():
+                    pass
+        assert busy.value.data == {"retry_after": 7}
+        # the slot is free again
+        with gate.slot():
+            pass
+
+    def test_queued_request_waits_for_a_slot(self, tmp_path):
+        gate = make_gate(tmp_path, queue_size=1)
+        started, finished = threading.Event(), []
+
+        def queued():
+            started.set()
+            with gate.slot():
+                finished.append(True)
+
+        with gate.slot():
+            thread = threading.Thread(target=queued)
+            thread.start()
+            started.wait()
+            while gate.waiting == 0:
+                pass
+            # one waiter fills the queue, the next one is turned away
+            with pytest.raises(IngestBusyException):
+                with gate.slot():
+                    pass
+            assert not finished
+        thread.join()
+        assert finished == [True]
+
+    def test_queue_timeout(self, tmp_path):
+        gate = make_gate(tmp_path, queue_size=1, timeout=0.1)
+        with gate.slot():
+            with pytest.raises(IngestBusyException):
+                with gate.slot():
+                    pass
+        assert gate.waiting == 0
+
+    def test_host_limit_is_shared_between_gates(self, tmp_path):
+        # two gates stand in for two worker processes on the same host
+        first = make_gate(tmp_path, per_worker=0, per_host=1)
+        second = make_gate(tmp_path, per_worker=0, per_host=1)
+        with first.slot():
+            with pytest.raises(IngestBusyException):
+                with second.slot():
+                    pass
+        with second.slot():
+            pass
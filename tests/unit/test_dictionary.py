@@ -0,0 +1,81 @@
+"""Unit tests for dictionary-encoded columns"""
+import os
+
+from csv_poc.utils.dictionary import (
+    DictionaryEncoder,
+    codes_path,
+    count_values,
+    decode_rows,
+    dictionary_path,
+    load_dictionary,
+)
+
+ROWS = [
+    ["Events", "2/1/2017", "Service"],
+    ["Digital", "2/7/2017", "Sponsorship"],
+    ["Events", "2/14/2017", "Service"],
+]
+
+
+def encode(path, rows, indices=(0, 2), max_values=256, append=False):
+    encoder = DictionaryEncoder(
+        path, indices=indices, max_values=max_values, append=append
+    )
+    for row_number, row in enumerate(rows):
+        encoder.add(row_number, row)
+    return encoder
+
+
+class TestDictionaryEncoder:
+    def test_encode_and_decode(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        encode(path, ROWS).close()
+        dictionary = load_dictionary(path, rows=3)
+        assert dictionary.columns == [0, 2]
+        assert dictionary.values == [
+            ["Events", "Digital"],
+            ["Service", "Sponsorship"],
+        ]
+        assert os.path.getsize(codes_path(path)) == 6
+        assert list(decode_rows(path, dictionary, [2, 0])) == [
+            ("Service", "Events"),
+            ("Sponsorship", "Digital"),
+            ("Service", "Events"),
+        ]
+        assert list(
+            decode_rows(path, dictionary, [2], where=(0, "Events"))
+        ) == [("Service",), ("Service",)]
+        assert count_values(path, dictionary, 0) == {"Events": 2, "Digital": 1}
+
+    def test_stale_encoding_is_ignored(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        encode(path, ROWS).close()
+        assert load_dictionary(path, rows=4) is None
+
+    def test_overflowing_column_is_dropped(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        encode(path, ROWS, indices=(0, 1, 2), max_values=2).close()
+        dictionary = load_dictionary(path, rows=3)
+        assert dictionary.columns == [0, 2]
+        assert list(decode_rows(path, dictionary, [0, 2]))[1] == (
+            "Digital",
+            "Sponsorship",
+        )
+
+    def test_append_and_abort(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        encode(path, ROWS).close()
+
+        encode(path, [["Print", "", "Service"]], append=True).abort()
+        assert load_dictionary(path, rows=3).values[0] == ["Events", "Digital"]
+
+        encode(path, [["Print", "", "Service"]], append=True).close()
+        dictionary = load_dictionary(path, rows=4)
+        assert dictionary.values[0] == ["Events", "Digital", "Print"]
+        assert list(decode_rows(path, dictionary, [0]))[-1] == ("Print",)
+
+    def test_all_columns_dropped(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        encode(path, ROWS, indices=(1,), max_values=1).close()
+        assert not os.path.exists(dictionary_path(path))
+        assert not os.path.exists(codes_path(path))
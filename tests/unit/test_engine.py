@@ -0,0 +1,37 @@
+"""Unit tests for engine configuration helpers"""
+from sqlalchemy import create_engine, text
+
+from csv_poc.database.engine import configure_sqlite, pool_options
+
+
+class TestPoolOptions:
+    def test_sqlite_has_no_pool_sizing(self):
+        assert pool_options({"SQLALCHEMY_DATABASE_URI": "sqlite://"}) == {}
+
+    def test_postgres_pool_sizing(self):
+        options = pool_options(
+            {
+                "SQLALCHEMY_DATABASE_URI": "postgresql://foo:bar@db/dev",
+                "DATABASE_POOL_SIZE": 20,
+            }
+        )
+        assert options["pool_size"] == 20
+        assert options["pool_pre_ping"] is True
+
+
+class TestConfigureSqlite:
+    config = {
+        "SQLITE_JOURNAL_MODE": "WAL",
+        "SQLITE_SYNCHRONOUS": "NORMAL",
+        "SQLITE_BUSY_TIMEOUT": 1234,
+        "SQLITE_MMAP_SIZE": 0,
+    }
+
+    def test_pragmas_applied_on_connect(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        configure_sqlite(engine, self.config)
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            # NORMAL == 1
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
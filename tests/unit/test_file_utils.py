@@ -1,6 +1,13 @@
 """Unit tests for file utilities"""
+import io
 
-from csv_poc.utils.file import guess_column_type, parse_columns
+from csv_poc.utils.file import (
+    ColumnStats,
+    guess_column_type,
+    iter_records,
+    parse_columns,
+    schema_fingerprint,
+)
 from csv_poc.database.models import File, Column
 
 
@@ -15,6 +22,12 @@ class TestGuessColumnType:
     def test_guess_number_success(self):
         assert guess_column_type(2022) == "number"
 
+    def test_guess_number_from_text(self):
+        assert guess_column_type("3567") == "number"
+        assert guess_column_type("-1.5e3") == "number"
+        assert guess_column_type("nan") == "text"
+        assert guess_column_type("Infinity") == "text"
+
     def test_guess_text_success(self):
         assert guess_column_type("foobar") == "text"
 
@@ -33,3 +46,68 @@ class TestParseColumns:
         parse_columns(file_path=self.test_file_path, file_id=self.test_file.id)
         # make sure the new columns are placed in the session but not saved
         assert len(db.session.identity_map.values()) > 0
+
+
+class TestIterRecords:
+    def test_offsets(self):
+        data = b"a,b\r\n1,2\r\n\r\n3,4"
+        records = list(iter_records(io.BytesIO(data)))
+        assert records == [(0, ["a", "b"]), (5, ["1", "2"]), (12, ["3", "4"])]
+
+    def test_quoted_newline(self):
+        data = b'a,b\n"multi\nline",2\n3,4\n'
+        records = list(iter_records(io.BytesIO(data)))
+        assert records[1] == (4, ["multi\nline", "2"])
+        assert records[2] == (19, ["3", "4"])
+
+    def test_start_offset(self):
+        data = b"a,b\n1,2\n3,4\n"
+        records = list(iter_records(io.BytesIO(data), offset=8))
+        assert records == [(8, ["3", "4"])]
+
+
+class TestColumnStats:
+    def test_datetime_min_max(self):
+        stats = ColumnStats("datetime")
+        for value in ("2/1/2017", "12/1/2016", "", "1/15/2018"):
+            stats.add(value)
+        assert stats.as_dict() == {
+            "col_type": "datetime",
+            "null_count": 1,
+            "min_value": "12/1/2016",
+            "max_value": "1/15/2018",
+        }
+
+    def test_resume_from_stored_values(self):
+        stats = ColumnStats("number", 2, "5", "10")
+        stats.add("7")
+        stats.add("11")
+        assert stats.min_value == "5"
+        assert stats.max_value == "11"
+        assert stats.null_count == 2
+
+    def test_contradicting_value_widens(self):
+        stats = ColumnStats("datetime", 0, "1/1/2017", "2/1/2017")
+        stats.add("1/5/2017", check_type=True)
+        assert stats.col_type == "datetime"
+        stats.add("not a date", check_type=True)
+        assert stats.col_type == "text"
+        assert stats.widened
+        assert stats.min_value == stats.max_value == "not a date"
+
+
+class TestSchemaFingerprint:
+    def test_same_layout_same_fingerprint(self):
+        layout = [("Tactic", "text"), ("Investment", "number")]
+        assert schema_fingerprint(layout) == schema_fingerprint(iter(layout))
+
+    def test_order_names_and_types_matter(self):
+        layout = [("Tactic", "text"), ("Investment", "number")]
+        fingerprint = schema_fingerprint(layout)
+        assert schema_fingerprint(layout[::-1]) != fingerprint
+        assert schema_fingerprint([layout[0], ("Invest", "number")]) != (
+            fingerprint
+        )
+        assert schema_fingerprint([layout[0], ("Investment", "text")]) != (
+            fingerprint
+        )
@@ -5,10 +5,19 @@ from werkzeug.datastructures import FileStorage
 
 from csv_poc.database.models import File
 from csv_poc.api.v1.files_dao import FileDAO
+import io
 import mock
 import os
+import sqlalchemy
 
-from csv_poc.utils.exc import DatabaseOpsException, InvalidFileTypeException
+from csv_poc.utils.exc import (
+    DatabaseOpsException,
+    FileNotFoundException,
+    InvalidFileTypeException,
+    UnreadableFileException,
+)
+from csv_poc.utils.importer import ImportTask, run_import_task
+from csv_poc.utils.row_index import INDEX_SUFFIX, indexed_rows, read_offsets
 
 
 HERE = os.path.abspath(os.path.dirname(__file__))
@@ -53,9 +62,124 @@ class TestAddFile:
         except DatabaseOpsException as dbe:
             assert dbe.message == "File already exists"
 
+    def test_duplicate_keeps_stored_file(self, app):
+        file = FileDAO.add_file(
+            file_storage=FileStorage(io.BytesIO(b"a,b\n1,2\n"), "dup.csv")
+        )
+        try:
+            FileDAO.add_file(
+                file_storage=FileStorage(io.BytesIO(b"x,y,z\n"), "dup.csv")
+            )
+            assert False, "expected DatabaseOpsException"
+        except DatabaseOpsException as dbe:
+            assert dbe.message == "File already exists"
+        with open(file["path"], "rb") as stored:
+            assert stored.read() == b"a,b\n1,2\n"
+        # the rejected upload leaves nothing behind
+        folder = app.config["UPLOAD_FOLDER"]
+        assert not [
+            name for name in os.listdir(folder) if name.endswith(".tmp")
+        ]
+
     def test_add_success(self):
         file_path = os.path.join(PROJECT_ROOT, "sample.csv")
         with open(file_path, "rb") as file:
             file_storage = FileStorage(file)
             file = FileDAO.add_file(file_storage=file_storage)
             assert "sample.csv" in file["name"]
+
+
+class TestAppendRows:
+    def add_sample(self):
+        file_path = os.path.join(PROJECT_ROOT, "sample.csv")
+        with open(file_path, "rb") as file:
+            return FileDAO.add_file(file_storage=FileStorage(file))
+
+    def test_append_success(self):
+        file = self.add_sample()
+        assert File.get_by_id(file["id"]).row_count == 4
+        data = io.BytesIO(b"1/1/2019,1/2/2019,Events,Internal,Service,5,1\n")
+        rv = FileDAO.append_rows(file["id"], data)
+        assert rv["row_count"] == 5
+        assert indexed_rows(file["path"]) == 5
+
+        # the new offset points at the appended row
+        offset = read_offsets(file["path"], 4, 5)[0]
+        with open(file["path"], "rb") as stored:
+            stored.seek(offset)
+            assert stored.readline().startswith(b"1/1/2019,")
+
+        columns = {c["col_name"]: c for c in rv["columns"]}
+        assert columns["End Date"]["max_value"] == "1/2/2019"
+
+    def test_append_skips_header_and_widens(self):
+        file = self.add_sample()
+        fingerprint = File.get_by_id(file["id"]).schema_fingerprint
+        data = io.BytesIO(
+            b"Start Date,End Date,Tactic,Event Type,Pay Type,Attendance,"
+            b"Investment\nsoon,1/2/2019,Events,Internal,Service,5,1\n"
+        )
+        rv = FileDAO.append_rows(file["id"], data)
+        assert rv["row_count"] == 5
+        columns = {c["col_name"]: c for c in rv["columns"]}
+        assert columns["Start Date"]["col_type"] == "text"
+        # the widened column changes the layout
+        assert rv["schema_fingerprint"] not in (None, fingerprint)
+
+    def test_append_bad_width(self):
+        file = self.add_sample()
+        size = os.path.getsize(file["path"])
+        try:
+            FileDAO.append_rows(file["id"], io.BytesIO(b"1,2,3\n"))
+            assert False, "expected UnreadableFileException"
+        except UnreadableFileException:
+            pass
+        assert os.path.getsize(file["path"]) == size
+        assert indexed_rows(file["path"]) == 4
+
+    def test_append_missing_file(self):
+        try:
+            FileDAO.append_rows(100, io.BytesIO(b""))
+            assert False, "expected FileNotFoundException"
+        except FileNotFoundException as fnf:
+            assert fnf.data is None
+
+
+class TestSaveImports:
+    def scan(self, tmp_path, content):
+        source = tmp_path / "source.csv"
+        source.write_bytes(content)
+        stored = tmp_path / "stored.csv"
+        stored.write_bytes(b"old,content\n1,2\n")
+        task = ImportTask(
+            source=str(source), name="stored.csv", destination=str(stored)
+        )
+        result = run_import_task(task)
+        assert result.status == "scanned"
+        # nothing is moved into place before the batch is saved
+        assert stored.read_bytes() == b"old,content\n1,2\n"
+        return result, str(stored)
+
+    def test_installed_after_commit(self, db, tmp_path):
+        result, stored = self.scan(tmp_path, b"a,b\n1,2\n3,4\n")
+        counts = FileDAO.save_imports([result])
+        assert counts["imported"] == 1
+        with open(stored, "rb") as fh:
+            assert fh.read() == b"a,b\n1,2\n3,4\n"
+        assert indexed_rows(stored) == 2
+        assert not os.path.exists(result.staging)
+        assert not os.path.exists(result.staging + INDEX_SUFFIX)
+
+    def test_discarded_on_failure(self, db, tmp_path):
+        result, stored = self.scan(tmp_path, b"a,b\n1,2\n3,4\n")
+        locked = sqlalchemy.exc.OperationalError("COMMIT", {}, Exception())
+        try:
+            with mock.patch.object(db.session, "commit", side_effect=locked):
+                FileDAO.save_imports([result])
+            assert False, "expected DatabaseOpsException"
+        except DatabaseOpsException:
+            pass
+        with open(stored, "rb") as fh:
+            assert fh.read() == b"old,content\n1,2\n"
+        assert not os.path.exists(result.staging)
+        assert not os.path.exists(result.staging + INDEX_SUFFIX)
@@ -0,0 +1,44 @@
+"""Unit tests for column histograms"""
+from array import array
+
+from csv_poc.utils.histogram import (
+    equal_width_bins,
+    histogram,
+    quantile_bins,
+    typed_column,
+)
+
+
+class TestHistogram:
+    def test_equal_width_bins(self):
+        edges, counts = equal_width_bins(array("d", [0, 1, 2, 5, 9, 10]), 5)
+        assert edges == [0, 2, 4, 6, 8, 10]
+        assert counts == [2, 1, 1, 0, 2]
+
+    def test_equal_width_single_value(self):
+        assert equal_width_bins(array("d", [3, 3]), 4) == ([3, 3], [2])
+
+    def test_quantile_bins(self):
+        values = array("d", [5, 1, 2, 3, 4, 6, 7, 8])
+        edges, counts = quantile_bins(values, 4)
+        assert edges == [1, 3, 5, 7, 8]
+        assert counts == [2, 2, 2, 2]
+
+    def test_quantile_bins_merge_duplicate_edges(self):
+        edges, counts = quantile_bins(array("d", [1] * 9 + [2]), 4)
+        assert edges == [1, 2]
+        assert counts == [10]
+        assert quantile_bins(array("d", [1, 2, 2, 2]), 2) == ([1, 2, 2], [1, 3])
+
+    def test_typed_datetime_column(self, tmp_path):
+        path = tmp_path / "dates.csv"
+        path.write_text("when,n\n2/1/2017,1\n,2\n2/30/2017,3\n2/3/2017,4\n")
+        values, missing = typed_column(str(path), 0, "datetime")
+        assert len(values) == 2
+        assert missing == 2
+
+        result = histogram(str(path), 0, "datetime", bins=2)
+        assert result["bins"] == [
+            {"start": "2017-02-01", "end": "2017-02-02", "count": 1},
+            {"start": "2017-02-02", "end": "2017-02-03", "count": 1},
+        ]
@@ -0,0 +1,66 @@
+"""Unit tests for the hash join"""
+import os
+
+import pytest
+
+from csv_poc.utils.join import JoinSide, hash_join
+
+PEOPLE = "id,name\n1,ann\n2,bob\n3,cid\n,nobody\n"
+ORDERS = "order,person,total\n10,1,5\n11,1,7\n12,3,1\n13,4,9\n14,,2\n"
+
+
+@pytest.fixture
+def files(tmp_path):
+    people, orders = tmp_path / "people.csv", tmp_path / "orders.csv"
+    people.write_text(PEOPLE)
+    orders.write_text(ORDERS)
+    return (
+        JoinSide(str(people), [0], 2, os.path.getsize(people)),
+        JoinSide(str(orders), [1], 3, os.path.getsize(orders)),
+    )
+
+
+def joined(left, right, **kwargs):
+    return sorted(
+        (tuple(left_row), tuple(right_row))
+        for left_row, right_row in hash_join(left, right, **kwargs)
+    )
+
+
+class TestHashJoin:
+    def test_inner(self, files):
+        people, orders = files
+        assert joined(people, orders) == [
+            (("1", "ann"), ("10", "1", "5")),
+            (("1", "ann"), ("11", "1", "7")),
+            (("3", "cid"), ("12", "3", "1")),
+        ]
+        # building on the other side gives the same pairs
+        assert joined(orders, people) == sorted(
+            (right, left) for left, right in joined(people, orders)
+        )
+
+    def test_left_join_keeps_unmatched_rows(self, files):
+        people, orders = files
+        # people is the smaller, build side here
+        assert joined(people, orders, how="left")[:3] == [
+            (("", "nobody"), ("", "", "")),
+            (("1", "ann"), ("10", "1", "5")),
+            (("1", "ann"), ("11", "1", "7")),
+        ]
+        assert (("2", "bob"), ("", "", "")) in joined(
+            people, orders, how="left"
+        )
+        # orders is the larger, probe side here
+        rows = joined(orders, people, how="left")
+        assert len(rows) == 5
+        assert (("13", "4", "9"), ("", "")) in rows
+        assert (("14", "", "2"), ("", "")) in rows
+
+    @pytest.mark.parametrize("how", ["inner", "left"])
+    def test_spilled_join_matches_in_memory_join(self, files, how):
+        people, orders = files
+        for left, right in ((people, orders), (orders, people)):
+            assert joined(left, right, how=how, memory_budget=1) == joined(
+                left, right, how=how
+            )
@@ -0,0 +1,85 @@
+"""Unit tests for the load test helpers"""
+import json
+import os
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pytest
+
+from csv_poc.utils.loadtest import (
+    Sample,
+    parse_mix,
+    run_load,
+    server_env,
+    summarize,
+)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def fake_api(environ, start_response):
+    if environ["REQUEST_METHOD"] == "POST":
+        environ["wsgi.input"].read(int(environ["CONTENT_LENGTH"]))
+        start_response("201 CREATED", [("Content-Type", "application/json")])
+        return [json.dumps({"id": 1}).encode()]
+    start_response("200 OK", [("Content-Type", "application/json")])
+    return [b"[]"]
+
+
+class TestLoadTest:
+    def test_parse_mix(self):
+        assert parse_mix("upload=1, list=10,detail") == {
+            "upload": 1,
+            "list": 10,
+            "detail": 1,
+        }
+        with pytest.raises(ValueError):
+            parse_mix("delete=1")
+        with pytest.raises(ValueError):
+            parse_mix("list=0")
+
+    def test_summarize(self):
+        samples = [Sample("list", 200, n / 1000) for n in range(1, 101)]
+        samples.append(Sample("upload", 500, 0.5))
+        rows = {row["operation"]: row for row in summarize(samples, 2.0)}
+        assert set(rows) == {"list", "upload", "all"}
+        assert rows["list"]["rps"] == 50
+        assert rows["list"]["p50"] == pytest.approx(51)
+        assert rows["list"]["p99"] == pytest.approx(100)
+        assert rows["upload"]["errors"] == rows["all"]["errors"] == 1
+
+    def test_run_load(self):
+        server = make_server(
+            "127.0.0.1", 0, fake_api, handler_class=QuietHandler
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            samples = run_load(
+                f"http://127.0.0.1:{server.server_port}",
+                {"upload": 1, "list": 1, "detail": 1},
+                concurrency=2,
+                duration=0.3,
+                payload=b"a,b\n1,2\n",
+            )
+        finally:
+            server.shutdown()
+        assert samples
+        assert {s.operation for s in samples} <= {"upload", "list", "detail"}
+        assert all(s.status in (200, 201) for s in samples)
+
+    def test_server_env_stays_in_workdir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("INGEST_LOCK_FOLDER", "/var/lock/csv_poc")
+        monkeypatch.setenv("RESULT_CACHE_FOLDER", "/srv/csv_poc/.cache")
+        env = server_env(str(tmp_path), {"SQL_TABLES": "True"})
+        for key in (
+            "UPLOAD_FOLDER",
+            "UPLOAD_SESSION_FOLDER",
+            "RESULT_CACHE_FOLDER",
+            "INGEST_LOCK_FOLDER",
+        ):
+            assert env[key].startswith(str(tmp_path) + os.sep)
+        assert env["SQL_TABLES"] == "True"
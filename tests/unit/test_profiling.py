@@ -0,0 +1,29 @@
+"""Unit tests for memory profiling"""
+import tracemalloc
+
+from csv_poc.utils.profiling import memory_phase, memory_profiles
+
+
+class TestMemoryPhase:
+    def test_noop_when_not_tracing(self, app):
+        before = len(memory_profiles())
+        with memory_phase("idle"):
+            pass
+        assert len(memory_profiles()) == before
+
+    def test_records_peak_and_sites(self, app):
+        tracemalloc.start()
+        try:
+            with memory_phase("outer"):
+                with memory_phase("inner"):
+                    blob = [bytes(1024) for _ in range(1000)]
+                del blob
+        finally:
+            tracemalloc.stop()
+        inner, outer = memory_profiles(2)
+        assert (inner["name"], outer["name"]) == ("inner", "outer")
+        assert inner["peak_bytes"] >= 1000 * 1024
+        # the peak of a nested phase counts towards the enclosing one
+        assert outer["peak_bytes"] >= inner["peak_bytes"]
+        assert outer["retained_bytes"] < inner["retained_bytes"]
+        assert inner["top"][0]["site"].endswith("test_profiling.py:19")
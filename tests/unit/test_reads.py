@@ -0,0 +1,124 @@
+"""Unit tests for the Core read path"""
+from sqlalchemy import event
+
+from csv_poc.api.v1.files_dao import DETAIL_FIELDS
+from csv_poc.database.models import Column, File
+from csv_poc.database.reads import (
+    columns_by_file,
+    find_columns,
+    file_page,
+    file_record,
+    file_records,
+    file_summaries,
+)
+
+
+def create_file(name, column_names=()):
+    file = File.create(name=name, path=f"/path/to/{name}")
+    for idx, col_name in enumerate(column_names):
+        Column.create(
+            col_index=idx,
+            col_name=col_name,
+            col_type="number",
+            file_id=file.id,
+            min_value="1",
+            max_value="9",
+        )
+    return file
+
+
+class TestReads:
+    def test_file_page(self, db):
+        for n in range(5):
+            create_file(f"file{n}.csv")
+        File.get_by_id(3).update(row_count=7, byte_size=80, column_count=2)
+        page = file_page(db.session, page=2, per_page=2)
+        assert [record._asdict() for record in page] == [
+            {
+                "id": 3,
+                "name": "file2.csv",
+                "row_count": 7,
+                "byte_size": 80,
+                "column_count": 2,
+            },
+            {
+                "id": 4,
+                "name": "file3.csv",
+                "row_count": None,
+                "byte_size": None,
+                "column_count": 0,
+            },
+        ]
+        assert file_page(db.session, page=4, per_page=2) == []
+
+    def test_file_record_matches_orm_serialization(self, db):
+        file = create_file("wide.csv", ["a", "b", "c"])
+        expected = file.to_dict(show=DETAIL_FIELDS)
+        db.session.expunge_all()
+        assert file_record(db.session, file.id).to_dict() == expected
+        assert file_record(db.session, file.id + 1) is None
+
+    def test_columns_by_file(self, db):
+        first = create_file("first.csv", ["a", "b"])
+        second = create_file("second.csv")
+        grouped = columns_by_file(db.session, [first.id, second.id])
+        assert [c.col_name for c in grouped[first.id]] == ["a", "b"]
+        assert grouped[second.id] == []
+        assert columns_by_file(db.session, []) == {}
+
+    def test_file_records_in_requested_order(self, db):
+        first = create_file("first.csv", ["a"])
+        second = create_file("second.csv", ["b", "c"])
+        records = file_records(db.session, [second.id, 99, first.id])
+        assert [r.name for r in records] == ["second.csv", "first.csv"]
+        assert [c.col_name for c in records[0].columns] == ["b", "c"]
+        summaries = file_summaries(db.session, [second.id, first.id])
+        assert [(s.id, s.name) for s in summaries] == [
+            (second.id, "second.csv"),
+            (first.id, "first.csv"),
+        ]
+
+    def test_find_columns_by_prefix(self, db):
+        first = create_file("first.csv", ["Investment", "revenue"])
+        second = create_file("second.csv", ["inventory", "INVESTOR", "invest"])
+        matches = find_columns(db.session, "invest", page=1, per_page=10)
+        assert [(m.file_name, m.col_name) for m in matches] == [
+            ("second.csv", "invest"),
+            ("first.csv", "Investment"),
+            ("second.csv", "INVESTOR"),
+        ]
+        assert matches[0]._asdict() == {
+            "file_id": second.id,
+            "file_name": "second.csv",
+            "col_index": 2,
+            "col_name": "invest",
+            "col_type": "number",
+        }
+        assert matches[1].file_id == first.id
+        page = find_columns(db.session, "invest", page=2, per_page=2)
+        assert [m.col_name for m in page] == ["INVESTOR"]
+        exact = find_columns(db.session, "Invest", 1, 10, prefix=False)
+        assert [m.file_id for m in exact] == [second.id]
+        assert find_columns(db.session, "x", 1, 10) == []
+
+    def test_find_columns_uses_name_index(self, db):
+        create_file("first.csv", ["invest"])
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, many):
+            statements.append((statement, parameters))
+
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            find_columns(db.session, "invest", 1, 10)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        statement, parameters = statements[-1]
+        plan = db.session.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+        details = [row[-1] for row in plan]
+        assert any("ix_columns_col_name_lower" in d for d in details)
+        # rows come out of the index in order, no separate sort
+        assert not any("TEMP B-TREE" in d for d in details)
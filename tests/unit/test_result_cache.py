@@ -0,0 +1,97 @@
+"""Unit tests for the disk cache of derived results"""
+import os
+
+import pytest
+
+from csv_poc.utils.result_cache import ResultCache, request_digest
+
+HASH = "a" * 64
+OTHER = "b" * 64
+
+
+class TestResultCache:
+    def test_key(self, tmp_path):
+        cache = ResultCache(str(tmp_path), 1024)
+        key = cache.key([HASH], {"bins": 10, "method": "equal"})
+        assert key == cache.key([HASH], {"method": "equal", "bins": 10})
+        assert key != cache.key([OTHER], {"bins": 10, "method": "equal"})
+        assert key != cache.key([HASH], {"bins": 11, "method": "equal"})
+        assert cache.key([HASH, None], {}) is None
+        assert ResultCache(str(tmp_path), 0).key([HASH], {}) is None
+        assert request_digest({"a": [1, 2]}) != request_digest({"a": [2, 1]})
+
+    def test_get_or_compute(self, tmp_path):
+        cache = ResultCache(str(tmp_path), 1024)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"values": [1, 2]}
+
+        key = cache.key([HASH], {"values": 0})
+        assert cache.get_or_compute(key, compute) == {"values": [1, 2]}
+        assert cache.get_or_compute(key, compute) == {"values": [1, 2]}
+        assert len(calls) == 1
+        # another cache on the same folder (another worker) shares the entry
+        other = ResultCache(str(tmp_path), 1024)
+        assert other.get_or_compute(key, compute) == {"values": [1, 2]}
+        assert len(calls) == 1
+        # without a key nothing is stored
+        assert cache.get_or_compute(None, compute) == {"values": [1, 2]}
+        assert len(calls) == 2
+        assert len(os.listdir(tmp_path)) == 1
+
+    def test_stream(self, tmp_path):
+        cache = ResultCache(str(tmp_path), 1024)
+        key = cache.key([HASH], {"export": [0]})
+        assert b"".join(cache.stream(key, iter([b"a,b\n", b"1,2\n"]))) == (
+            b"a,b\n1,2\n"
+        )
+        untouched = iter([b"never read"])
+        assert b"".join(cache.stream(key, untouched)) == b"a,b\n1,2\n"
+        assert next(untouched) == b"never read"
+
+    def test_stream_not_stored(self, tmp_path):
+        cache = ResultCache(str(tmp_path), 8)
+        key = cache.key([HASH], {"export": [0]})
+        # too big for the budget
+        assert b"".join(cache.stream(key, iter([b"12345", b"67890"]))) == (
+            b"1234567890"
+        )
+        # cut short by the client
+        body = cache.stream(key, iter([b"123", b"456"]))
+        assert next(body) == b"123"
+        body.close()
+
+        # failed while producing
+        def failing():
+            yield b"1"
+            raise ValueError("broken")
+
+        with pytest.raises(ValueError):
+            b"".join(cache.stream(key, failing()))
+        assert os.listdir(tmp_path) == []
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResultCache(str(tmp_path), 30)
+        keys = [cache.key([HASH], {"n": n}) for n in range(3)]
+        for age, key in enumerate(keys):
+            cache.get_or_compute(key, lambda: "x" * 8)
+            os.utime(tmp_path / key, (1000 + age, 1000 + age))
+        # a hit makes the oldest entry the most recently used
+        assert cache.get_or_compute(keys[0], lambda: "fresh") == "x" * 8
+        cache.get_or_compute(cache.key([HASH], {"n": 3}), lambda: "x" * 8)
+        assert not os.path.exists(tmp_path / keys[1])
+        assert os.path.exists(tmp_path / keys[0])
+        assert os.path.exists(tmp_path / keys[2])
+
+    def test_invalidate(self, tmp_path):
+        cache = ResultCache(str(tmp_path), 1024)
+        single = cache.key([HASH], {"values": 0})
+        joined = cache.key([OTHER, HASH], {"join": [0]})
+        unrelated = cache.key([OTHER], {"values": 0})
+        for key in (single, joined, unrelated):
+            cache.get_or_compute(key, lambda: [])
+        assert cache.invalidate(HASH) == 2
+        assert os.listdir(tmp_path) == [unrelated]
+        assert cache.invalidate(None) == 0
@@ -0,0 +1,50 @@
+"""Unit tests for the reservoir row sample"""
+import random
+
+from csv_poc.utils.sample import (
+    ReservoirSampler,
+    estimate_counts,
+    load_sample,
+)
+
+
+def fill(path, rows, size=None, append=False, start=0):
+    sampler = ReservoirSampler(
+        path, size=size, append=append, rng=random.Random(42)
+    )
+    for row_number in range(start, start + rows):
+        sampler.add(row_number, ["a" if row_number % 4 else "b"])
+    sampler.close()
+
+
+class TestReservoirSampler:
+    def test_small_file_is_kept_whole(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        fill(path, 10, size=20)
+        sample = load_sample(path, rows=10)
+        assert [row for row, _ in sample.rows] == list(range(10))
+        assert estimate_counts(sample, 0) == [
+            {"value": "a", "count": 7, "error": 0.0},
+            {"value": "b", "count": 3, "error": 0.0},
+        ]
+
+    def test_sample_size_and_spread(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        fill(path, 10000, size=500)
+        sample = load_sample(path, rows=10000)
+        rows = [row for row, _ in sample.rows]
+        assert len(rows) == len(set(rows)) == 500
+        # rows are drawn from the whole file, not just its head
+        assert max(rows) > 9000
+        estimate = estimate_counts(sample, 0)[0]
+        assert estimate["value"] == "a"
+        assert abs(estimate["count"] - 7500) <= 2 * estimate["error"]
+
+    def test_append_continues_sample(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        fill(path, 1000, size=100)
+        fill(path, 1000, append=True, start=1000)
+        assert load_sample(path, rows=1000) is None
+        sample = load_sample(path, rows=2000)
+        assert len(sample.rows) == 100
+        assert any(row >= 1000 for row, _ in sample.rows)
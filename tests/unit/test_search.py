@@ -0,0 +1,53 @@
+"""Unit tests for the full-text search index"""
+import pytest
+
+from csv_poc.utils.exc import InvalidMetadataException
+from csv_poc.utils.search import SearchIndexWriter, search_rows
+
+
+class TestSearchIndex:
+    def write_index(self, path, rows):
+        writer = SearchIndexWriter(path, indices=[0, 2])
+        for row_number, row in enumerate(rows):
+            writer.add(row_number, row)
+        writer.close()
+
+    def test_search_indexed_columns(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        self.write_index(
+            path,
+            [
+                ["Events", "spring", "Service"],
+                ["Digital", "summer", "Sponsorship"],
+                ["Events", "spring", "Passive sponsorship"],
+            ],
+        )
+        assert search_rows(path, "sponsorship") == [1, 2]
+        assert search_rows(path, "events", limit=1) == [0]
+        # column 1 is not indexed
+        assert search_rows(path, "spring") == []
+
+    def test_append_and_abort(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        self.write_index(path, [["alpha", "", "beta"]])
+
+        writer = SearchIndexWriter(path, append=True)
+        assert writer.indices == [0, 2]
+        writer.add(1, ["gamma", "", ""])
+        writer.abort()
+        assert search_rows(path, "gamma") == []
+
+        writer = SearchIndexWriter(path, append=True)
+        writer.add(1, ["gamma", "", ""])
+        writer.close()
+        assert search_rows(path, "gamma") == [1]
+
+    def test_invalid_query(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        self.write_index(path, [["alpha", "", "beta"]])
+        with pytest.raises(InvalidMetadataException):
+            search_rows(path, '"unbalanced')
+
+    def test_missing_index(self, tmp_path):
+        with pytest.raises(InvalidMetadataException):
+            search_rows(str(tmp_path / "nothing.csv"), "alpha")
@@ -0,0 +1,114 @@
+"""Unit tests for sorting file rows by a column"""
+import os
+import random
+import threading
+
+import pytest
+
+from csv_poc.utils.sort_index import (
+    build_sort_index,
+    read_sort_index,
+    remove_sort_indexes,
+    sort_index_path,
+    sorted_row_numbers,
+)
+
+
+@pytest.fixture
+def numbers(tmp_path):
+    rng = random.Random(7)
+    values = [str(rng.randint(0, 50)) for _ in range(500)]
+    values[10:13] = ["", "n/a", "nan"]
+    path = tmp_path / "numbers.csv"
+    path.write_text(
+        "id,value\n"
+        + "".join(f"{n},{value}\n" for n, value in enumerate(values))
+    )
+    return str(path), values
+
+
+def expected(values, descending):
+    present = [
+        (float(value), row)
+        for row, value in enumerate(values)
+        if value not in ("", "n/a", "nan")
+    ]
+    # stable sort: equal values keep their file order in both directions
+    present.sort(key=lambda pair: pair[0], reverse=descending)
+    return [row for _, row in present] + [10, 11, 12]
+
+
+class TestSortedRowNumbers:
+    @pytest.mark.parametrize("descending", [False, True])
+    @pytest.mark.parametrize("memory_budget", [200, 5000, 1024 * 1024])
+    def test_order(self, numbers, tmp_path, descending, memory_budget):
+        path, values = numbers
+        rows = sorted_row_numbers(
+            path,
+            1,
+            "number",
+            descending=descending,
+            memory_budget=memory_budget,
+            directory=str(tmp_path),
+        )
+        assert list(rows) == expected(values, descending)
+        # the spilled runs are cleaned up
+        assert sorted(os.listdir(tmp_path)) == ["numbers.csv"]
+
+    def test_dates_and_row_count(self, tmp_path):
+        path = tmp_path / "dates.csv"
+        path.write_text("day\n2/14/2017\n12/1/2016\n\n2/1/2017\n1/1/2018\n")
+        rows = sorted_row_numbers(str(path), 0, "datetime", row_count=3)
+        assert list(rows) == [1, 2, 0]
+
+
+class TestSortIndex:
+    def test_build_and_read(self, numbers):
+        path, values = numbers
+        build_sort_index(path, 1, "number", True, "abc", len(values), 300)
+        order = expected(values, True)
+        assert list(read_sort_index(path, 1, True, "abc", 0, 5)) == order[:5]
+        assert list(read_sort_index(path, 1, True, "abc", 495, 600)) == (
+            order[495:]
+        )
+        assert list(read_sort_index(path, 1, True, "abc", 600, 700)) == []
+        # built for other content, or never built
+        assert read_sort_index(path, 1, True, "def", 0, 5) is None
+        assert read_sort_index(path, 1, False, "abc", 0, 5) is None
+
+    def test_remove(self, numbers):
+        path, values = numbers
+        for descending in (False, True):
+            build_sort_index(path, 1, "number", descending, None, 10)
+        first = sorted(range(10), key=lambda row: float(values[row]))
+        assert list(read_sort_index(path, 1, False, None, 0, 10)) == first
+        remove_sort_indexes(path)
+        assert not os.path.exists(sort_index_path(path, 1, False))
+        assert not os.path.exists(sort_index_path(path, 1, True))
+        assert os.path.exists(path)
+
+    def test_concurrent_builds(self, numbers):
+        path, values = numbers
+        errors = []
+
+        def build():
+            try:
+                build_sort_index(path, 1, "number", False, "abc", 500, 300)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=build) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert list(read_sort_index(path, 1, False, "abc", 0, 500)) == (
+            expected(values, False)
+        )
+        # no staging files are left behind
+        assert sorted(os.listdir(os.path.dirname(path))) == [
+            "numbers.csv",
+            os.path.basename(sort_index_path(path, 1, False)),
+        ]
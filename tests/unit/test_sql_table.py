@@ -0,0 +1,121 @@
+"""Unit tests for the per-file SQL table"""
+import sqlite3
+
+import pytest
+
+from csv_poc.utils.exc import InvalidMetadataException
+from csv_poc.utils.sql_table import (
+    SqlTableWriter,
+    run_query,
+    sql_column_names,
+    table_path,
+)
+
+
+def load(path, rows, append=False, first_row=0):
+    if append:
+        writer = SqlTableWriter(path, append=True, batch_size=2)
+    else:
+        writer = SqlTableWriter(
+            path,
+            ["Tactic", "tactic", "", "Investment"],
+            ["text", "text", "datetime", "number"],
+            max_indexes=2,
+            batch_size=2,
+        )
+    for row_number, row in enumerate(rows, start=first_row):
+        writer.add(row_number, row)
+    return writer
+
+
+ROWS = [
+    ["Events", "a", "2/1/2017", "3567"],
+    ["Events", "b", "", "3874.5"],
+    ["Web", "c", "2/14/2017", ""],
+]
+
+
+class TestSqlTable:
+    def test_column_names(self):
+        assert sql_column_names(["a", "A", "_row", " ", "a_2"]) == [
+            "a",
+            "A_2",
+            "_row_2",
+            "column_3",
+            "a_2_2",
+        ]
+
+    def test_load_and_query(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        load(path, ROWS).close()
+        result = run_query(
+            path,
+            'SELECT "Tactic", count(*), sum("Investment") FROM data '
+            "GROUP BY 1 ORDER BY 1",
+        )
+        assert result == {
+            "columns": ["Tactic", "count(*)", 'sum("Investment")'],
+            "rows": [["Events", 2, 7441.5], ["Web", 1, None]],
+            "truncated": False,
+        }
+        result = run_query(
+            path, "SELECT _row, column_2 FROM data WHERE tactic_2 > ?", ["a"]
+        )
+        assert result["rows"] == [[1, None], [2, "2/14/2017"]]
+
+        conn = sqlite3.connect(table_path(path))
+        indexes = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).fetchall()
+        conn.close()
+        assert sorted(indexes) == [("ix_0",), ("ix_1",)]
+
+    def test_append_and_abort(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        load(path, ROWS).close()
+        load(path, [["Print", "d", "", "1"]], append=True, first_row=3).close()
+        load(path, [["Lost", "e", "", "2"]], append=True, first_row=4).abort()
+        result = run_query(path, "SELECT count(*), max(_row) FROM data")
+        assert result["rows"] == [[4, 3]]
+
+        # an aborted new table leaves nothing behind
+        other = str(tmp_path / "other.csv")
+        load(other, ROWS).abort()
+        with pytest.raises(InvalidMetadataException):
+            run_query(other, "SELECT 1")
+
+    def test_limit(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        load(path, ROWS).close()
+        result = run_query(path, "SELECT _row FROM data", limit=2)
+        assert result["rows"] == [[0], [1]]
+        assert result["truncated"] is True
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "DELETE FROM data",
+            "DROP TABLE data",
+            "PRAGMA table_info(data)",
+            "ATTACH DATABASE 'other.db' AS other",
+            "SELECT 1; DELETE FROM data",
+            "SELECT nothing FROM data",
+        ],
+    )
+    def test_only_selects(self, tmp_path, sql):
+        path = str(tmp_path / "data.csv")
+        load(path, ROWS).close()
+        with pytest.raises(InvalidMetadataException):
+            run_query(path, sql)
+        assert run_query(path, "SELECT count(*) FROM data")["rows"] == [[3]]
+
+    def test_timeout(self, tmp_path):
+        path = str(tmp_path / "data.csv")
+        load(path, ROWS).close()
+        endless = (
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+            "SELECT count(*) FROM n"
+        )
+        with pytest.raises(InvalidMetadataException) as exc:
+            run_query(path, endless, timeout=0.2)
+        assert "longer than 0.2 seconds" in exc.value.message
@@ -0,0 +1,95 @@
+"""Unit tests for resumable uploads"""
+import io
+import os
+import threading
+
+import pytest
+
+from csv_poc.utils.exc import InvalidMetadataException, UploadNotFoundException
+from csv_poc.utils.uploads import (
+    create_session,
+    expire_sessions,
+    load_session,
+    received_parts,
+    session_lock,
+    write_part,
+)
+
+CONTENT = b"".join(b"%d,row %d\n" % (n, n) for n in range(1000))
+
+
+class TestUploadSession:
+    def parts(self, part_size):
+        return {
+            n + 1: CONTENT[offset : offset + part_size]
+            for n, offset in enumerate(range(0, len(CONTENT), part_size))
+        }
+
+    def test_parallel_parts_in_any_order(self, tmp_path):
+        session = create_session(str(tmp_path), "a.csv", len(CONTENT), 1000)
+        parts = self.parts(1000)
+        assert session.part_count == len(parts)
+
+        threads = [
+            threading.Thread(
+                target=write_part, args=(session, n, io.BytesIO(parts[n]))
+            )
+            for n in reversed(parts)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(received_parts(session)) == sorted(parts)
+        with open(session.data_path, "rb") as fh:
+            assert fh.read() == CONTENT
+
+    def test_resume_after_interrupted_part(self, tmp_path):
+        session = create_session(str(tmp_path), "a.csv", len(CONTENT), 4096)
+        parts = self.parts(4096)
+        ack = write_part(session, 1, io.BytesIO(parts[1]))
+        assert ack["size"] == 4096
+
+        # the connection drops halfway through part 2
+        with pytest.raises(InvalidMetadataException):
+            write_part(session, 2, io.BytesIO(parts[2][:100]))
+        reloaded = load_session(str(tmp_path), session.id)
+        assert sorted(received_parts(reloaded)) == [1]
+
+        for n in range(2, reloaded.part_count + 1):
+            write_part(reloaded, n, io.BytesIO(parts[n]))
+        with open(session.data_path, "rb") as fh:
+            assert fh.read() == CONTENT
+
+    def test_part_length_and_number_are_checked(self, tmp_path):
+        session = create_session(str(tmp_path), "a.csv", 10, 4)
+        assert session.part_length(3) == 2
+        with pytest.raises(InvalidMetadataException):
+            write_part(session, 3, io.BytesIO(b"abc"))
+        with pytest.raises(InvalidMetadataException):
+            write_part(session, 4, io.BytesIO(b"ab"))
+        assert received_parts(session) == {}
+
+    def test_unknown_and_expired_sessions(self, tmp_path):
+        with pytest.raises(UploadNotFoundException):
+            load_session(str(tmp_path), "../../etc")
+        session = create_session(str(tmp_path), "a.csv", 10, 4)
+        assert expire_sessions(str(tmp_path), max_age=60) == 0
+        old = os.path.getmtime(session.data_path) - 120
+        for name in ("session.json", "parts"):
+            os.utime(os.path.join(session.directory, name), (old, old))
+        assert expire_sessions(str(tmp_path), max_age=60) == 1
+        with pytest.raises(UploadNotFoundException):
+            load_session(str(tmp_path), session.id)
+
+    def test_sessions_in_use_do_not_expire(self, tmp_path):
+        session = create_session(str(tmp_path), "a.csv", 10, 4)
+        old = os.path.getmtime(session.data_path) - 120
+        for name in ("session.json", "parts"):
+            os.utime(os.path.join(session.directory, name), (old, old))
+        # a part is being written
+        with session_lock(session):
+            assert expire_sessions(str(tmp_path), max_age=60) == 0
+        assert os.path.exists(session.data_path)
+        assert expire_sessions(str(tmp_path), max_age=60) == 1
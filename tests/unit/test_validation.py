@@ -0,0 +1,72 @@
+"""Unit tests for the background validation of stored files"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from csv_poc.utils.file import scan_file
+from csv_poc.utils.validation import (
+    BackgroundValidator,
+    chunk_bounds,
+    load_report,
+    validate_file,
+)
+
+COLUMNS = [("Start Date", "datetime"), ("Tactic", "text")]
+
+
+def write_file(tmp_path, rows):
+    path = tmp_path / "data.csv"
+    lines = ["Start Date,Tactic"] + [f"{date},Events" for date in rows]
+    path.write_text("\n".join(lines) + "\n")
+    scan_file(str(path))
+    return str(path)
+
+
+class TestValidation:
+    def test_chunks_are_record_aligned(self, tmp_path):
+        path = tmp_path / "data.csv"
+        path.write_text('a,b\n1,"x\ny"\n2,z\n3,w\n')
+        scan_file(str(path))
+        assert chunk_bounds(str(path), 3, 2) == [(4, 0, 2), (16, 2, 1)]
+
+    def test_report_across_chunks(self, tmp_path):
+        rows = ["2/1/2017", "soon", "", "later", "2/2/2017", "never", "x"]
+        path = write_file(tmp_path, rows)
+        report = validate_file(
+            path, COLUMNS, len(rows), "hash", chunk_rows=2, limit=3
+        )
+        assert report == load_report(path)
+        assert report["status"] == "complete"
+        assert (report["row_count"], report["valid"]) == (7, False)
+        dates, tactics = report["columns"]
+        assert dates["violations"] == 4
+        # first offending rows in file order, even across chunks
+        assert dates["rows"] == [1, 3, 5]
+        assert dates["offsets"] == [34, 54, 83]
+        assert tactics["violations"] == 0
+        assert tactics["rows"] == []
+
+    def test_process_pool(self, tmp_path):
+        rows = ["2/1/2017", "soon"] * 50
+        path = write_file(tmp_path, rows)
+        context = multiprocessing.get_context("forkserver")
+        with ProcessPoolExecutor(2, mp_context=context) as executor:
+            report = validate_file(
+                path, COLUMNS, len(rows), None, executor, chunk_rows=7
+            )
+        assert report["columns"][0]["violations"] == 50
+        assert report["columns"][0]["rows"][:3] == [1, 3, 5]
+
+    def test_background_validator(self, app, tmp_path):
+        path = write_file(tmp_path, ["2/1/2017", "soon"])
+        validator = BackgroundValidator(app, workers=0, chunk_rows=1, limit=5)
+        future = validator.submit(path, COLUMNS, 2, "hash")
+        # a validation that is already queued is not queued twice
+        assert validator.submit(path, COLUMNS, 2, "hash") is future
+        assert future.result(timeout=10)["columns"][0]["rows"] == [1]
+        assert not validator.is_pending(path)
+
+        # failures are reported instead of leaving the file pending forever
+        os.remove(path)
+        failed = validator.submit(path, COLUMNS, 2, "hash").result(10)
+        assert failed["status"] == "failed"